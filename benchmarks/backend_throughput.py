@@ -0,0 +1,147 @@
+"""Tracking write and dashboard read throughput, SQLite vs. PostgreSQL.
+
+Runs the same workload against each backend through the ``TrackingBackend``
+interface: a bulk inventory, then a stream of nickname and role changes
+issued by ``--concurrency`` tasks (as discord.py dispatches gateway events),
+then the dashboard reads the API serves. SQLite always runs against a temp
+file; PostgreSQL only with ``--postgres-dsn``, which must point at a
+throwaway database (its tracking tables are emptied first).
+
+The rows column of the read table should agree between backends; ties in
+search and leaderboard ordering may differ.
+
+Usage: python -m benchmarks.backend_throughput [--members 5000] [--events 5000] [--postgres-dsn postgresql://...]
+"""
+import argparse
+import asyncio
+import dataclasses
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fakes import make_guild, make_members
+from src.database.backend import TrackingBackend, create_backend
+
+
+async def _write_events(db: TrackingBackend, guild, members, events: int, concurrency: int) -> float:
+    rng = random.Random(3)
+    regular = guild.roles[1:]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        position = rng.randrange(len(members))
+        before = members[position]
+        if index % 2:
+            after = dataclasses.replace(before, nick=f"Nick {index}")
+            call = db.log_nickname_change(before, after)
+        else:
+            role = rng.choice(regular)
+            roles = [r for r in before.roles if r is not role] if role in before.roles else before.roles + [role]
+            after = dataclasses.replace(before, roles=roles)
+            call = db.log_role_change(before, after)
+        members[position] = after
+        async with semaphore:
+            await call
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(events)))
+    await db.flush()
+    return time.perf_counter() - started
+
+
+def _reads(guild, members):
+    user_ids = [member.id for member in members[:50]]
+    role_id = guild.roles[1].id
+    return [
+        ('server_stats', lambda db: db.get_server_stats(guild.id)),
+        ('recent_changes', lambda db: db.get_recent_changes(guild.id, limit=50)),
+        ('daily_activity', lambda db: db.get_daily_activity(guild.id)),
+        ('weekly_activity', lambda db: db.get_weekly_activity(guild.id)),
+        ('leaderboard', lambda db: db.get_leaderboard(guild.id, limit=50)),
+        ('search', lambda db: db.search_users('user12', guild_id=guild.id, limit=20)),
+        ('guild_users(role)', lambda db: db.get_guild_users(guild.id, role_id=role_id)),
+        ('roles_bulk', lambda db: db.get_current_roles_bulk(guild.id, user_ids)),
+        ('user_stats', lambda db: db.get_user_stats(members[0].id)),
+        ('users_stats', lambda db: db.get_users_stats(user_ids, guild.id)),
+        ('database_stats', lambda db: db.get_database_stats()),
+    ]
+
+
+async def _time_read(db: TrackingBackend, read, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await read(db)
+        samples.append((time.perf_counter() - started) * 1000)
+    rows = len(result) if isinstance(result, (list, dict)) else 1
+    return statistics.median(samples), max(samples), rows
+
+
+async def _empty_postgres(dsn: str):
+    import asyncpg
+    from src.database.postgres import SCHEMA
+    conn = await asyncpg.connect(dsn)
+    try:
+        tables = [
+            statement.split('EXISTS', 1)[1].split('(', 1)[0].strip()
+            for statement in SCHEMA if 'CREATE TABLE' in statement
+        ]
+        await conn.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY")
+    finally:
+        await conn.close()
+
+
+async def _run(name: str, db: TrackingBackend, args):
+    guild = make_guild(1, args.roles)
+    members = make_members(guild, args.members, args.roles_per_member)
+    results = {}
+    await db.initialize()
+    try:
+        started = time.perf_counter()
+        await db.inventory_guild(guild, members)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<9} inventory {len(members):>6} members in {elapsed:6.2f}s ({len(members) / elapsed:8.0f} members/s)")
+
+        elapsed = await _write_events(db, guild, members, args.events, args.concurrency)
+        print(f"{name:<9} tracking  {args.events:>6} events  in {elapsed:6.2f}s ({args.events / elapsed:8.0f} events/s)")
+
+        for label, read in _reads(guild, members):
+            results[label] = await _time_read(db, read, args.repeat)
+    finally:
+        await db.close()
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--roles', type=int, default=40)
+    parser.add_argument('--roles-per-member', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--postgres-dsn', help="throwaway PostgreSQL database to compare against")
+    args = parser.parse_args()
+
+    backends = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        backends['sqlite'] = await _run('sqlite', create_backend(url='', path=str(Path(tmp) / 'tracking.db')), args)
+    if args.postgres_dsn:
+        await _empty_postgres(args.postgres_dsn)
+        backends['postgres'] = await _run('postgres', create_backend(url=args.postgres_dsn), args)
+
+    header = f"{'read':<18}" + ''.join(f" {name + ' p50':>14} {'max':>9} {'rows':>6}" for name in backends)
+    print(header)
+    for label in backends['sqlite']:
+        line = f"{label:<18}"
+        for results in backends.values():
+            p50, worst, rows = results[label]
+            line += f" {p50:12.2f}ms {worst:7.2f}ms {rows:>6}"
+        print(line)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
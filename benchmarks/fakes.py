@@ -0,0 +1,96 @@
+"""Minimal stand-ins for the discord.py objects the Database layer reads."""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+
+@dataclass
+class FakeColor:
+    value: int
+
+
+@dataclass
+class FakePermissions:
+    value: int = 0
+
+
+@dataclass
+class FakeAsset:
+    url: str
+
+
+@dataclass(eq=False)
+class FakeGuild:
+    id: int
+    name: str = "Benchmark Guild"
+    roles: List['FakeRole'] = field(default_factory=list)
+
+    def get_role(self, role_id: int) -> Optional['FakeRole']:
+        return self._by_id.get(role_id)
+
+    @property
+    def _by_id(self) -> Dict[int, 'FakeRole']:
+        return {role.id: role for role in self.roles}
+
+
+@dataclass(eq=False)
+class FakeRole:
+    id: int
+    guild: FakeGuild
+    name: str
+    color: FakeColor
+    position: int
+    permissions: FakePermissions = field(default_factory=FakePermissions)
+    hoist: bool = False
+    mentionable: bool = False
+
+    def is_default(self) -> bool:
+        return self.id == self.guild.id
+
+
+@dataclass(eq=False)
+class FakeMember:
+    id: int
+    guild: FakeGuild
+    name: str
+    display_name: str
+    nick: Optional[str]
+    roles: List[FakeRole]
+    joined_at: datetime
+    created_at: datetime
+    display_avatar: FakeAsset
+    discriminator: str = "0"
+    bot: bool = False
+
+
+def make_guild(guild_id: int, role_count: int) -> FakeGuild:
+    """A guild with an @everyone role plus ``role_count`` regular roles"""
+    guild = FakeGuild(id=guild_id)
+    guild.roles.append(FakeRole(guild_id, guild, "@everyone", FakeColor(0), 0))
+    for i in range(1, role_count + 1):
+        guild.roles.append(FakeRole(guild_id + i, guild, f"Role {i}", FakeColor(i * 997 % 0xFFFFFF), i))
+    return guild
+
+
+def make_members(guild: FakeGuild, count: int, roles_per_member: int, seed: int = 0) -> List[FakeMember]:
+    """``count`` members, each holding @everyone plus ``roles_per_member`` random roles"""
+    rng = random.Random(seed)
+    regular = guild.roles[1:]
+    joined = datetime(2022, 1, 1)
+    members = []
+    for i in range(count):
+        user_id = 10_000_000 + i
+        held = rng.sample(regular, min(roles_per_member, len(regular)))
+        members.append(FakeMember(
+            id=user_id,
+            guild=guild,
+            name=f"user{i}",
+            display_name=f"User {i}",
+            nick=f"Nick {i}" if i % 3 == 0 else None,
+            roles=[guild.roles[0]] + held,
+            joined_at=joined + timedelta(minutes=i),
+            created_at=joined - timedelta(days=i % 900),
+            display_avatar=FakeAsset(f"https://cdn.discordapp.com/embed/avatars/{i % 5}.png"),
+        ))
+    return members
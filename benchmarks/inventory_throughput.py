@@ -0,0 +1,64 @@
+"""Startup inventory throughput: per-member writes vs. the bulk path.
+
+The legacy path is what ``initial_inventory`` used to do for every member
+(``upsert_guild_member`` plus ``_log_initial_role`` per role); the bulk path is
+``Database.inventory_guild``. Both run against a fresh temp database and then
+once more against the already-inventoried data, as on a reconnect.
+
+Usage: python -m benchmarks.inventory_throughput [--members 8000] [--legacy-members 500]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fakes import make_guild, make_members
+from src.database.database import Database
+
+
+async def _legacy(db: Database, guild, members):
+    for role in guild.roles[1:]:
+        await db.upsert_role(role)
+    for member in members:
+        await db.upsert_guild_member(member)
+        for role in member.roles[1:]:
+            await db._log_initial_role(member, role)
+
+
+async def _bulk(db: Database, guild, members):
+    await db.inventory_guild(guild, members)
+
+
+async def _run(name: str, inventory, guild, members):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / 'tracking.db'))
+        await db.initialize()
+        try:
+            for label in ('cold', 'warm'):
+                started = time.perf_counter()
+                await inventory(db, guild, members)
+                elapsed = time.perf_counter() - started
+                print(f"{name:<7} {label:<5} {len(members):>6} members in {elapsed:7.2f}s "
+                      f"({len(members) / elapsed:9.0f} members/s)")
+        finally:
+            await db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=8000)
+    parser.add_argument('--legacy-members', type=int, default=500,
+                        help="the legacy path is slow; time it on a smaller sample")
+    parser.add_argument('--roles', type=int, default=60)
+    parser.add_argument('--roles-per-member', type=int, default=4)
+    args = parser.parse_args()
+
+    guild = make_guild(1, args.roles)
+    members = make_members(guild, args.members, args.roles_per_member)
+    await _run('legacy', _legacy, guild, members[:args.legacy_members])
+    await _run('bulk', _bulk, guild, members)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,234 @@
+"""Database benchmark suite on a synthetic guild, with baseline comparison.
+
+Generates a guild at the chosen scale (``synthetic.SCALES``, fields
+overridable) into a temp SQLite file, then times every ``Database`` read
+method and the hot write paths: ``log_role_change``, ``log_nickname_change``,
+``upsert_guild_member`` and ``inventory_guild`` (cold, right after the
+import, and warm, where fingerprints skip every member). Reads run first,
+``--repeat`` times each; writes run once over ``--writes`` operations,
+flushed, and are reported per operation.
+
+``--output`` writes the results as JSON. ``--baseline`` compares against an
+earlier output: a case regresses when it is more than ``--tolerance`` slower
+and at least ``--min-delta-ms`` slower in absolute terms, and the script
+exits with status 1. Baselines only compare on the same machine and scale;
+``baselines/small.json`` is the ``small`` scale on the reference machine.
+
+Usage: python -m benchmarks.suite [--scale small] [--output results.json] [--baseline benchmarks/baselines/small.json]
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.synthetic import SCALES, Scale, generate, make_guild_members, scale_from
+from src.database.database import Database
+
+
+def _reads(guild, members, newest_ts: int):
+    member = members[0]
+    user_ids = [m.id for m in members[:200]]
+    role = guild.roles[1]
+    today = datetime.utcnow().date()
+    return [
+        ('get_user_stats', lambda db: db.get_user_stats(member.id)),
+        ('get_user_profile', lambda db: db.get_user_profile(member.id)),
+        ('get_users_stats(200)', lambda db: db.get_users_stats(user_ids, guild.id)),
+        ('get_server_stats', lambda db: db.get_server_stats(guild.id)),
+        ('get_server_stats(90d)', lambda db: db.get_server_stats(guild.id, today - timedelta(days=90), today)),
+        ('get_recent_changes', lambda db: db.get_recent_changes(guild.id, limit=50)),
+        ('get_recent_changes(page)', lambda db: db.get_recent_changes(guild.id, limit=50, before=(newest_ts // 2, 0))),
+        ('get_role_history', lambda db: db.get_role_history(member.id, guild.id)),
+        ('get_daily_activity', lambda db: db.get_daily_activity(guild.id)),
+        ('get_daily_activity(365d)', lambda db: db.get_daily_activity(guild.id, today - timedelta(days=365), today)),
+        ('get_weekly_activity', lambda db: db.get_weekly_activity(guild.id)),
+        ('get_database_stats', lambda db: db.get_database_stats()),
+        ('get_current_roles', lambda db: db.get_current_roles(member.id, guild.id)),
+        ('get_current_roles_bulk(200)', lambda db: db.get_current_roles_bulk(guild.id, user_ids)),
+        ('search_users(name)', lambda db: db.search_users('user12', guild_id=guild.id)),
+        ('search_users(role)', lambda db: db.search_users('Role 1', guild_id=guild.id, role_id=role.id)),
+        ('get_guild_users', lambda db: db.get_guild_users(guild.id)),
+        ('get_guild_users(role)', lambda db: db.get_guild_users(guild.id, role_id=role.id)),
+        ('get_roles', lambda db: db.get_roles(guild.id, [r.id for r in guild.roles[:20]])),
+        ('get_leaderboard', lambda db: db.get_leaderboard(guild.id, limit=50)),
+        ('get_landing_stats', lambda db: db.get_landing_stats(guild.id)),
+        ('check_leaderboard', lambda db: db.check_leaderboard(guild.id)),
+        ('get_scheduled_messages', lambda db: db.get_scheduled_messages(guild.id)),
+        ('get_messages_to_send', lambda db: db.get_messages_to_send()),
+        ('get_user_game_profiles', lambda db: db.get_user_game_profiles(member.id)),
+        ('get_news_posts', lambda db: db.get_news_posts()),
+        ('get_clan_achievements', lambda db: db.get_clan_achievements()),
+        ('export_user_data', lambda db: _drain(db.export_user_data(member.id))),
+    ]
+
+
+async def _drain(rows) -> list:
+    return [row async for row in rows]
+
+
+async def _time_read(db: Database, read, repeat: int) -> dict:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await read(db)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'kind': 'read',
+        'ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'rows': len(result) if isinstance(result, (list, dict)) else 1,
+    }
+
+
+async def _time_writes(db: Database, operations) -> dict:
+    started = time.perf_counter()
+    for operation in operations:
+        await operation
+    await db.flush()
+    elapsed = time.perf_counter() - started
+    count = max(len(operations), 1)
+    return {
+        'kind': 'write',
+        'ms': round(elapsed * 1000 / count, 4),
+        'total_ms': round(elapsed * 1000, 1),
+        'operations': len(operations),
+    }
+
+
+async def _writes(db: Database, guild, members, count: int) -> dict:
+    rng = random.Random(11)
+    regular = guild.roles[1:]
+    results = {}
+
+    operations = []
+    for _ in range(count):
+        before = rng.choice(members)
+        role = rng.choice(regular)
+        roles = [r for r in before.roles if r is not role] if role in before.roles else before.roles + [role]
+        operations.append(db.log_role_change(before, dataclasses.replace(before, roles=roles)))
+    results['log_role_change'] = await _time_writes(db, operations)
+
+    operations = []
+    for index in range(count):
+        before = rng.choice(members)
+        operations.append(db.log_nickname_change(before, dataclasses.replace(before, nick=f"Bench {index}")))
+    results['log_nickname_change'] = await _time_writes(db, operations)
+
+    # A changed nickname each time, so the row cache does not skip the upsert
+    results['upsert_guild_member'] = await _time_writes(db, [
+        db.upsert_guild_member(dataclasses.replace(rng.choice(members), nick=f"Upsert {index}"))
+        for index in range(count)
+    ])
+
+    results['inventory_guild(cold)'] = await _time_writes(db, [db.inventory_guild(guild, members)])
+    results['inventory_guild(warm)'] = await _time_writes(db, [db.inventory_guild(guild, members)])
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Cases slower than the baseline by more than ``tolerance`` and ``min_delta_ms``"""
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        # Writes are per operation; the absolute floor applies to the whole case
+        scale = current.get('operations', 1)
+        delta = (current['ms'] - previous['ms']) * scale
+        if current['ms'] > previous['ms'] * (1 + tolerance) and delta >= min_delta_ms:
+            regressions.append((name, previous['ms'], current['ms']))
+    return regressions
+
+
+def _print(results: dict, baseline: dict = None):
+    print(f"{'case':<30} {'kind':<6} {'ms':>11} {'baseline':>11} {'change':>8}")
+    for name, result in results['results'].items():
+        previous = (baseline or {}).get('results', {}).get(name)
+        line = f"{name:<30} {result['kind']:<6} {result['ms']:11.3f}"
+        if previous:
+            change = (result['ms'] / previous['ms'] - 1) * 100 if previous['ms'] else 0.0
+            line += f" {previous['ms']:11.3f} {change:+7.1f}%"
+        print(line)
+
+
+async def run(scale: Scale, repeat: int, writes: int, seed: int, database: Path = None) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = database or Path(tmp) / 'tracking.db'
+        started = time.perf_counter()
+        if not path.exists():
+            counts = await generate(path, scale, seed)
+            print(f"Generated {counts} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        guild, members = make_guild_members(scale, seed)
+        results = {}
+        db = Database(str(path))
+        await db.initialize()
+        try:
+            async with db.reader() as conn:
+                cursor = await conn.execute("SELECT COALESCE(MAX(ts), 0) FROM events")
+                newest_ts = (await cursor.fetchone())[0]
+            for name, read in _reads(guild, members, newest_ts):
+                results[name] = await _time_read(db, read, repeat)
+            results.update(await _writes(db, guild, members, writes))
+        finally:
+            await db.close()
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'scale': dataclasses.asdict(scale),
+            'repeat': repeat,
+            'writes': writes,
+            'seed': seed,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': f"{platform.system()} {platform.machine()}",
+        },
+        'results': results,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for field in dataclasses.fields(Scale):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=int, help=f"override the preset's {field.name}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--writes', type=int, default=2000, help="operations per write case")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', type=Path, help="reuse (or keep) the generated file at this path")
+    parser.add_argument('--output', type=Path, help="write the results as JSON")
+    parser.add_argument('--baseline', type=Path, help="JSON output of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="allowed slowdown, as a fraction")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    scale = scale_from(args.scale, **{field.name: getattr(args, field.name) for field in dataclasses.fields(Scale)})
+    results = await run(scale, args.repeat, args.writes, args.seed, args.database)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + '\n')
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    _print(results, baseline)
+    if baseline is None:
+        return 0
+    if baseline['meta']['scale'] != results['meta']['scale']:
+        print("warning: the baseline was recorded at a different scale", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before:.3f}ms -> {after:.3f}ms")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
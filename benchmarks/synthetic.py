@@ -0,0 +1,222 @@
+"""Synthetic guild history written straight into a SQLite tracking database.
+
+The schema comes from ``Database.initialize``; the rows are then bulk-inserted
+with plain ``sqlite3`` (no write queue, no per-event statements), so even the
+``large`` scale fills in minutes. Members, roles and ids match
+``fakes.make_guild`` / ``fakes.make_members`` for the same scale and seed, so
+benchmarks can replay write paths against the generated guild. History is
+spread uniformly over the last ``days`` days and every change is mirrored into
+the event log, as the bot does; daily rollups and table counters are kept by
+the schema's triggers, search documents and leaderboard scores are built once
+at the end.
+"""
+import json
+import random
+import sqlite3
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from benchmarks.fakes import FakeGuild, FakeMember, make_guild, make_members
+from src.database.database import REFRESH_SEARCH_DOC_SQL, Database
+from src.database.timestamps import to_epoch_ms
+
+GUILD_ID = 1_000_000
+
+BATCH_SIZE = 50_000
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    roles: int
+    role_changes: int
+    nickname_changes: int
+    username_changes: int
+    join_leave_events: int
+    roles_per_member: int = 5
+    days: int = 365
+
+
+SCALES = {
+    'small': Scale(users=2_000, roles=50, role_changes=100_000, nickname_changes=10_000,
+                   username_changes=1_000, join_leave_events=2_000),
+    'medium': Scale(users=20_000, roles=200, role_changes=1_000_000, nickname_changes=100_000,
+                    username_changes=10_000, join_leave_events=20_000),
+    'large': Scale(users=100_000, roles=500, role_changes=10_000_000, nickname_changes=1_000_000,
+                   username_changes=100_000, join_leave_events=100_000),
+}
+
+
+def scale_from(name: str, **overrides) -> Scale:
+    """A preset with any non-None fields replaced"""
+    return replace(SCALES[name], **{key: value for key, value in overrides.items() if value is not None})
+
+
+def make_guild_members(scale: Scale, seed: int = 0) -> tuple:
+    """The fake guild and members a generated database describes"""
+    guild = make_guild(GUILD_ID, scale.roles)
+    return guild, make_members(guild, scale.users, scale.roles_per_member, seed)
+
+
+def _batches(rows: Iterator[tuple]) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn: sqlite3.Connection, sql: str, rows: Iterator[tuple]):
+    for batch in _batches(rows):
+        conn.executemany(sql, batch)
+
+
+class _History:
+    """Random history rows paired with their event-log entries"""
+
+    def __init__(self, guild: FakeGuild, members: List[FakeMember], scale: Scale, now: datetime, seed: int):
+        self.rng = random.Random(seed + 1)
+        self.guild = guild
+        self.members = members
+        self.regular = guild.roles[1:]
+        self.start_ms = to_epoch_ms(now - timedelta(days=scale.days))
+        self.end_ms = to_epoch_ms(now)
+
+    def _pick(self) -> tuple:
+        ts = self.rng.randrange(self.start_ms, self.end_ms)
+        changed_at = datetime.utcfromtimestamp(ts / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        return self.rng.choice(self.members), ts, changed_at
+
+    def role_changes(self, count: int) -> Iterator[tuple]:
+        for _ in range(count):
+            member, ts, changed_at = self._pick()
+            role = self.rng.choice(self.regular)
+            action = self.rng.choice(('added', 'removed'))
+            yield (
+                (self.guild.id, member.id, role.id, action, changed_at, ts),
+                ('role', self.guild.id, member.id, json.dumps({'role_id': role.id, 'action': action}), ts),
+            )
+
+    def nickname_changes(self, count: int) -> Iterator[tuple]:
+        for index in range(count):
+            member, ts, changed_at = self._pick()
+            old, new = f"Nick {index}", f"Nick {index + 1}"
+            yield (
+                (self.guild.id, member.id, old, new, changed_at, ts),
+                ('nickname', self.guild.id, member.id, json.dumps({'old': old, 'new': new}), ts),
+            )
+
+    def username_changes(self, count: int) -> Iterator[tuple]:
+        for index in range(count):
+            member, ts, changed_at = self._pick()
+            old, new = f"old{index}", member.name
+            yield (
+                (member.id, old, new, changed_at, ts),
+                ('username', self.guild.id, member.id, json.dumps({'old': old, 'new': new}), ts),
+            )
+
+    def join_leave_events(self, count: int) -> Iterator[tuple]:
+        for _ in range(count):
+            member, ts, changed_at = self._pick()
+            event_type = self.rng.choice(('join', 'leave'))
+            yield (
+                (self.guild.id, member.id, event_type, changed_at, ts),
+                (event_type, self.guild.id, member.id, None, ts),
+            )
+
+
+def _fill(path: Path, guild: FakeGuild, members: List[FakeMember], scale: Scale, seed: int) -> Dict[str, int]:
+    now = datetime.utcnow().replace(microsecond=0)
+    history = _History(guild, members, scale, now, seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        conn.executemany("""
+            INSERT INTO roles (role_id, guild_id, name, color, position, permissions, is_hoisted, is_mentionable)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (role.id, guild.id, role.name, role.color.value, role.position, str(role.permissions.value),
+             role.hoist, role.mentionable)
+            for role in guild.roles
+        ])
+        _insert(conn, """
+            INSERT INTO users (user_id, username, discriminator, display_name, avatar_url, created_at, last_seen, is_bot)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            (member.id, member.name, member.discriminator, member.display_name, member.display_avatar.url,
+             member.created_at, now, member.bot)
+            for member in members
+        ))
+        # One member in twenty has left the guild
+        _insert(conn, """
+            INSERT INTO guild_members (guild_id, user_id, joined_at, nickname, is_active)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            (guild.id, member.id, member.joined_at, member.nick, index % 20 != 19)
+            for index, member in enumerate(members)
+        ))
+        _insert(conn, """
+            INSERT INTO member_roles (guild_id, user_id, role_id, since) VALUES (?, ?, ?, ?)
+        """, (
+            (guild.id, member.id, role.id, member.joined_at)
+            for member in members for role in member.roles if not role.is_default()
+        ))
+        _insert(conn, """
+            INSERT INTO role_changes (guild_id, user_id, role_id, action, changed_at, ts)
+            VALUES (?, ?, ?, 'initial', ?, ?)
+        """, (
+            (guild.id, member.id, role.id, member.joined_at, to_epoch_ms(member.joined_at))
+            for member in members for role in member.roles if not role.is_default()
+        ))
+
+        tables = [
+            ('role_changes', "guild_id, user_id, role_id, action, changed_at, ts", history.role_changes(scale.role_changes)),
+            ('nickname_changes', "guild_id, user_id, old_nickname, new_nickname, changed_at, ts",
+             history.nickname_changes(scale.nickname_changes)),
+            ('username_changes', "user_id, old_username, new_username, changed_at, ts",
+             history.username_changes(scale.username_changes)),
+            ('join_leave_events', "guild_id, user_id, event_type, timestamp, ts",
+             history.join_leave_events(scale.join_leave_events)),
+        ]
+        for table, columns, rows in tables:
+            placeholders = ', '.join('?' * len(columns.split(',')))
+            for batch in _batches(rows):
+                conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", [row for row, _ in batch])
+                conn.executemany(
+                    "INSERT INTO events (type, guild_id, user_id, payload, ts) VALUES (?, ?, ?, ?, ?)",
+                    [event for _, event in batch]
+                )
+
+        _insert(conn, REFRESH_SEARCH_DOC_SQL, ((guild.id, member.id) for member in members))
+        conn.commit()
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('users', 'roles', 'member_roles', 'role_changes', 'nickname_changes',
+                          'username_changes', 'join_leave_events', 'events')
+        }
+    finally:
+        conn.close()
+    return counts
+
+
+async def generate(path: Path, scale: Scale, seed: int = 0) -> Dict[str, int]:
+    """Create a tracking database at ``path`` holding a synthetic guild; returns row counts"""
+    db = Database(str(path))
+    await db.initialize()
+    await db.close()
+
+    guild, members = make_guild_members(scale, seed)
+    counts = _fill(path, guild, members, scale, seed)
+
+    db = Database(str(path))
+    await db.initialize()
+    try:
+        await db.rebuild_leaderboard(guild.id)
+    finally:
+        await db.close()
+    return counts
@@ -0,0 +1,108 @@
+"""Role history range queries: text timestamps vs. indexed epoch milliseconds.
+
+Fills ``role_changes`` with a year of history across several guilds. About a
+tenth of the rows use the ``isoformat()`` spelling (``T`` separator), as rows
+written from Python used to. Each query selects one guild's last 30 days:
+
+* text: ``guild_id = ? AND changed_at BETWEEN ? AND ?``, where only the
+  guild prefix of an index helps, decoded with ``datetime.fromisoformat`` per
+  row (the old read path)
+* epoch: ``guild_id = ? AND ts BETWEEN ? AND ?`` on ``idx_role_changes_guild_ts``,
+  timed once returning raw integers and once decoded with ``from_epoch_ms``
+
+The row counts show the text comparison going wrong on the mixed spellings.
+
+Usage: python -m benchmarks.timestamp_range [--rows 500000] [--guilds 10] [--repeat 20]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.database.database import Database
+from src.database.timestamps import from_epoch_ms, to_epoch_ms
+
+TEXT_SQL = """
+    SELECT role_id, action, changed_at FROM role_changes
+    WHERE guild_id = ? AND changed_at BETWEEN ? AND ?
+"""
+
+EPOCH_SQL = """
+    SELECT role_id, action, ts FROM role_changes
+    WHERE guild_id = ? AND ts BETWEEN ? AND ?
+"""
+
+
+async def _fill(db: Database, rows: int, guilds: int, now: datetime):
+    rng = random.Random(7)
+    batch = []
+    for index in range(rows):
+        changed_at = now - timedelta(seconds=rng.randrange(365 * 86400))
+        text = changed_at.isoformat() if index % 10 == 0 else changed_at.strftime('%Y-%m-%d %H:%M:%S')
+        batch.append((
+            rng.randrange(guilds) + 1,
+            rng.randrange(50000) + 1,
+            rng.randrange(60) + 1,
+            rng.choice(('added', 'removed')),
+            text,
+            to_epoch_ms(changed_at),
+        ))
+    async with db.writer() as conn:
+        await conn.executemany("""
+            INSERT INTO role_changes (guild_id, user_id, role_id, action, changed_at, ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, batch)
+        await conn.execute("ANALYZE")
+        await conn.commit()
+
+
+async def _time(db: Database, sql: str, params: tuple, decode, repeat: int):
+    samples = []
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        async with db.reader() as conn:
+            cursor = await conn.execute(sql, params)
+            rows = await cursor.fetchall()
+        if decode is not None:
+            rows = [(role_id, action, decode(value)) for role_id, action, value in rows]
+        samples.append((time.perf_counter() - started) * 1000)
+        count = len(rows)
+    return statistics.median(samples), max(samples), count
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--guilds', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    now = datetime.utcnow().replace(microsecond=0)
+    start, end = now - timedelta(days=30), now
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / 'tracking.db'))
+        await db.initialize()
+        try:
+            started = time.perf_counter()
+            await _fill(db, args.rows, args.guilds, now)
+            print(f"Inserted {args.rows} role changes in {time.perf_counter() - started:.1f}s")
+            cases = [
+                ('text + fromisoformat', TEXT_SQL, (1, str(start), str(end)), datetime.fromisoformat),
+                ('epoch, raw', EPOCH_SQL, (1, to_epoch_ms(start), to_epoch_ms(end)), None),
+                ('epoch + from_epoch_ms', EPOCH_SQL, (1, to_epoch_ms(start), to_epoch_ms(end)), from_epoch_ms),
+            ]
+            print(f"{'read path':<24} {'p50':>9} {'max':>9} {'rows':>7}")
+            for name, sql, params, decode in cases:
+                p50, worst, count = await _time(db, sql, params, decode, args.repeat)
+                print(f"{name:<24} {p50:7.2f}ms {worst:7.2f}ms {count:>7}")
+        finally:
+            await db.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
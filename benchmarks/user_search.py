@@ -0,0 +1,83 @@
+"""User search latency: the old LIKE join vs. the trigram FTS5 index.
+
+The legacy query is what ``/api/users/search`` used to run: ``LIKE '%q%'`` on
+four columns across users x guild_members x role_changes x roles with
+DISTINCT. The FTS path is ``Database.search_users``. Both run against the same
+inventoried guild, so role history holds one 'initial' row per held role.
+
+Usage: python -m benchmarks.user_search [--members 50000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fakes import make_guild, make_members
+from src.database.database import Database
+
+QUERIES = ['user4242', 'Nick 1234', 'Role 17', 'ser99', 'zzzz-no-match']
+
+LEGACY_SQL = """
+    SELECT DISTINCT u.user_id, u.username, u.display_name, u.avatar_url,
+                    u.last_seen, gm.nickname, gm.joined_at
+    FROM users u
+    JOIN guild_members gm ON u.user_id = gm.user_id
+    LEFT JOIN role_changes rc ON u.user_id = rc.user_id AND rc.guild_id = gm.guild_id
+    LEFT JOIN roles r ON rc.role_id = r.role_id
+    WHERE gm.guild_id = ? AND gm.is_active = 1
+    AND (u.username LIKE ? OR u.display_name LIKE ? OR gm.nickname LIKE ? OR r.name LIKE ?)
+    ORDER BY u.last_seen DESC LIMIT 20
+"""
+
+
+async def _legacy(db: Database, guild_id: int, query: str):
+    async with db.reader() as conn:
+        cursor = await conn.execute(LEGACY_SQL, (guild_id, *[f"%{query}%"] * 4))
+        return await cursor.fetchall()
+
+
+async def _fts(db: Database, guild_id: int, query: str):
+    return await db.search_users(query, guild_id=guild_id)
+
+
+async def _time(search, db: Database, guild_id: int, query: str, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await search(db, guild_id, query)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples), len(rows)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=50000)
+    parser.add_argument('--roles', type=int, default=60)
+    parser.add_argument('--roles-per-member', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    guild = make_guild(1, args.roles)
+    members = make_members(guild, args.members, args.roles_per_member)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / 'tracking.db'))
+        await db.initialize()
+        try:
+            started = time.perf_counter()
+            await db.inventory_guild(guild, members)
+            print(f"Inventoried {len(members)} members in {time.perf_counter() - started:.1f}s "
+                  f"(FTS5 trigram: {'yes' if db.search_fts else 'no'})")
+            print(f"{'query':<16} {'legacy p50':>11} {'max':>9} {'fts p50':>9} {'max':>9} {'rows':>5}")
+            for query in QUERIES:
+                legacy_p50, legacy_max, _ = await _time(_legacy, db, guild.id, query, args.repeat)
+                fts_p50, fts_max, rows = await _time(_fts, db, guild.id, query, args.repeat)
+                print(f"{query:<16} {legacy_p50:9.2f}ms {legacy_max:7.2f}ms "
+                      f"{fts_p50:7.2f}ms {fts_max:7.2f}ms {rows:>5}")
+        finally:
+            await db.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""API read latency while the bot process is writing heavily.
+
+Runs the same workload twice, once with the legacy rollback journal and once
+with the default WAL storage profile. A separate process plays the bot and
+commits large role_changes batches in a loop (like ``initial_inventory`` or
+``cleanup_old_data``) while this process plays the API and times
+``get_user_stats`` / ``get_role_history`` through a read-only Database.
+
+Usage: python -m benchmarks.wal_read_latency [--seconds 10] [--users 5000]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.database.database import Database
+from src.database.pool import StorageProfile
+
+GUILD_ID = 1
+
+
+async def _seed(db: Database, users: int):
+    async with db.writer() as conn:
+        await conn.executemany(
+            "INSERT INTO users (user_id, username, display_name) VALUES (?, ?, ?)",
+            [(uid, f"user{uid}", f"User {uid}") for uid in range(users)],
+        )
+        await conn.executemany(
+            "INSERT INTO roles (role_id, guild_id, name) VALUES (?, ?, ?)",
+            [(rid, GUILD_ID, f"role{rid}") for rid in range(50)],
+        )
+        await conn.executemany(
+            "INSERT INTO role_changes (guild_id, user_id, role_id, action) VALUES (?, ?, ?, 'added')",
+            [(GUILD_ID, uid % users, uid % 50) for uid in range(users * 10)],
+        )
+        await conn.commit()
+
+
+def _writer_process(db_path: str, profile: StorageProfile, users: int, stop_at: float):
+    async def run():
+        db = Database(db_path, pool_size=1, storage=profile)
+        await db.initialize()
+        try:
+            while time.time() < stop_at:
+                async with db.writer() as conn:
+                    await conn.executemany(
+                        "INSERT INTO role_changes (guild_id, user_id, role_id, action) VALUES (?, ?, ?, 'added')",
+                        [(GUILD_ID, random.randrange(users), random.randrange(50)) for _ in range(20000)],
+                    )
+                    await conn.commit()
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+async def _measure(db_path: Path, profile: StorageProfile, seconds: float, users: int) -> dict:
+    db = Database(str(db_path), pool_size=4, storage=profile)
+    await db.initialize()
+    await _seed(db, users)
+    await db.close()
+
+    stop_at = time.time() + seconds
+    writer = multiprocessing.Process(target=_writer_process, args=(str(db_path), profile, users, stop_at))
+    writer.start()
+
+    reader = Database(str(db_path), pool_size=4, storage=profile, read_only=True)
+    await reader.initialize()
+    latencies = []
+    errors = 0
+    try:
+        while time.time() < stop_at:
+            uid = random.randrange(users)
+            started = time.perf_counter()
+            try:
+                await reader.get_user_stats(uid)
+                await reader.get_role_history(uid, GUILD_ID)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        await reader.close()
+        writer.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': statistics.median(latencies),
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1],
+        'max_ms': latencies[-1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=5000)
+    args = parser.parse_args()
+
+    profiles = {
+        'rollback journal': StorageProfile(journal_mode='delete', synchronous='full'),
+        'wal (default)': StorageProfile(),
+    }
+    for name, profile in profiles.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            result = await _measure(Path(tmp) / 'tracking.db', profile, args.seconds, args.users)
+        print(
+            f"{name:<18} requests={result['requests']:<6} errors={result['errors']:<4} "
+            f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms max={result['max_ms']:.2f}ms"
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -56,10 +56,20 @@ export const apiService = {
     return response.data;
   },
 
+  // Stats for many users in one request (ids as strings, up to 500)
+  async getBulkUserStats(userIds, guildId) {
+    const response = await api.post(`/api/servers/${guildId}/users/stats`, {
+      user_ids: userIds.map(String)
+    });
+    return response.data;
+  },
+
   // Recent changes
-  async getRecentChanges(guildId, limit = 20) {
+  async getRecentChanges(guildId, limit = 20, before = null) {
+    const params = { limit };
+    if (before) params.before = before;
     const response = await api.get(`/api/servers/${guildId}/recent-changes`, {
-      params: { limit }
+      params
     });
     return response.data;
   },
@@ -124,6 +134,16 @@ export const apiService = {
     return response.data;
   },
 
+  async getDailyActivity(guildId, start = null, end = null) {
+    const params = {};
+    if (start) params.start = start;
+    if (end) params.end = end;
+    const response = await api.get(`/api/servers/${guildId}/daily-activity`, {
+      params
+    });
+    return response.data;
+  },
+
   // Database stats (admin)
   async getDatabaseStats() {
     const response = await api.get('/api/admin/database-stats');
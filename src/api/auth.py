@@ -164,40 +164,20 @@ async def exchange_discord_code(code: str) -> dict:
 
 async def get_user_guild_member_info(access_token: str, guild_id: str, user_id: str) -> dict:
     """Fetch a user's current roles from the local database."""
-    import aiosqlite
     from .main import db  # deferred import to avoid circular dependency at module load
 
     try:
-        async with aiosqlite.connect(db.db_path) as conn:
-            cursor = await conn.execute(
-                """
-                SELECT rc.role_id, r.name, r.color, r.position
-                FROM role_changes rc
-                INNER JOIN (
-                    SELECT role_id, user_id, MAX(changed_at) as latest_change
-                    FROM role_changes
-                    WHERE user_id = ? AND guild_id = ?
-                    GROUP BY role_id, user_id
-                ) latest ON rc.role_id = latest.role_id
-                           AND rc.user_id = latest.user_id
-                           AND rc.changed_at = latest.latest_change
-                INNER JOIN roles r ON rc.role_id = r.role_id
-                WHERE rc.action IN ('added', 'initial')
-                ORDER BY r.position DESC
-                """,
-                (int(user_id), int(guild_id)),
-            )
-            roles = await cursor.fetchall()
-
-            def _hex(c):
-                return f"#{c:06x}" if c else "#99aab5"
-
-            return {
-                'roles': [
-                    {"role_id": str(r[0]), "role_name": r[1], "color": _hex(r[2]), "position": r[3]}
-                    for r in roles
-                ]
-            }
+        roles = await db.get_current_roles(int(user_id), int(guild_id))
+
+        def _hex(c):
+            return f"#{c:06x}" if c else "#99aab5"
+
+        return {
+            'roles': [
+                {"role_id": str(r["role_id"]), "role_name": r["role_name"], "color": _hex(r["color"]), "position": r["position"]}
+                for r in roles
+            ]
+        }
     except Exception as e:
         logger.error("Error getting user roles for auth: %s", e)
         return {'roles': []}
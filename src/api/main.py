@@ -1,12 +1,13 @@
-from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 import uvicorn
 import os
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 # Rate limiting
@@ -14,7 +15,10 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+from src.database.backend import TrackingBackend, create_backend
 from src.database.database import Database
+from src.database.pool import ReadOnlyDatabaseError
+from src.database.replica import ReplicaSync
 
 # Import auth after database is available
 try:
@@ -95,11 +99,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "Accept"],
+    expose_headers=["X-Replica-Age", "X-Replica-Synced-At"],
 )
 
 # ── Global database instance ──────────────────────────────────────────────────
 db = None
 
+# Optional read replica (API_READ_REPLICA_PATH), refreshed from db by replica_sync
+replica_db = None
+replica_sync = None
+
+
+async def read_database(response: Response) -> TrackingBackend:
+    """Database for read endpoints: the replica when enabled, with its age in the response headers."""
+    if replica_db is None:
+        return db
+    response.headers["X-Replica-Age"] = f"{replica_sync.age():.1f}"
+    response.headers["X-Replica-Synced-At"] = datetime.utcfromtimestamp(replica_sync.synced_at).isoformat() + "Z"
+    return replica_db
+
 # ── Pydantic models ───────────────────────────────────────────────────────────
 
 class UserStats(BaseModel):
@@ -113,6 +131,15 @@ class UserStats(BaseModel):
     last_activity: Optional[datetime]
 
 
+# Upper bound on users per batched stats request
+MAX_STATS_BATCH = 500
+
+
+class UserStatsBatchRequest(BaseModel):
+    # Snowflakes may arrive as strings; JavaScript numbers cannot hold them
+    user_ids: List[int] = Field(..., max_length=MAX_STATS_BATCH)
+
+
 class ServerStats(BaseModel):
     total_users: int
     total_username_changes: int
@@ -136,6 +163,8 @@ class ChangeEvent(BaseModel):
     role_name: Optional[str] = None
     role_color: Optional[int] = None
     action: Optional[str] = None
+    # Pass as ``before`` to fetch the changes that follow this one
+    cursor: Optional[str] = None
 
 
 class RoleChange(BaseModel):
@@ -159,6 +188,15 @@ class WeeklyActivityDay(BaseModel):
     changes: int
 
 
+class DailyActivity(BaseModel):
+    day: date
+    joins: int
+    leaves: int
+    username_changes: int
+    nickname_changes: int
+    role_changes: int
+
+
 class GameProfileRequest(BaseModel):
     game_name: str = Field(..., min_length=1, max_length=80)
     character_name: str = Field(..., min_length=1, max_length=80)
@@ -178,14 +216,38 @@ class AchievementRequest(BaseModel):
 
 @app.on_event("startup")
 async def startup_event():
-    global db
+    global db, replica_db, replica_sync
     if AUTH_AVAILABLE:
         validate_jwt_secret()  # Exits immediately if secret is insecure
 
     db_path = os.getenv('DATABASE_PATH', './data/tracking.db')
-    db = Database(db_path)
+    # The bot owns the SQLite file: it runs the migrations and the write queue
+    db = create_backend(path=db_path, read_only=True)
     await db.initialize()
-    logger.info("API server started and database initialized")
+    logger.info("API server started and database initialized (%s)", type(db).__name__)
+
+    # Heavy dashboard reads can be served from a periodically refreshed copy
+    replica_path = os.getenv('API_READ_REPLICA_PATH', '').strip()
+    if replica_path and not isinstance(db, Database):
+        logger.warning("API_READ_REPLICA_PATH is only supported with the SQLite backend, ignoring it")
+    elif replica_path:
+        replica_sync = ReplicaSync(
+            Path(db_path),
+            Path(replica_path),
+            interval=float(os.getenv('API_READ_REPLICA_INTERVAL', '30')),
+        )
+        try:
+            await replica_sync.sync()
+            # The replica is a copy of the hot file only; archived months stay with the primary
+            replica_db = Database(replica_path, read_only=True, archive_dir=db.archive.directory)
+            await replica_db.initialize()
+        except Exception as e:
+            logger.error("Could not set up the read replica %s, serving reads from the database: %s", replica_path, e)
+            replica_db = None
+            replica_sync = None
+        else:
+            replica_sync.start()
+            logger.info("Serving reads from replica %s (refreshed every %ss)", replica_path, replica_sync.interval)
 
     if AUTH_AVAILABLE:
         import asyncio
@@ -195,6 +257,10 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if replica_sync:
+        await replica_sync.stop()
+    if replica_db:
+        await replica_db.close()
     if db:
         await db.close()
     logger.info("API server shutdown complete")
@@ -204,7 +270,10 @@ async def shutdown_event():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat(), "version": "1.0.0"}
+    health = {"status": "healthy", "timestamp": datetime.utcnow().isoformat(), "version": "1.0.0"}
+    if replica_sync:
+        health["replica"] = replica_sync.snapshot()
+    return health
 
 
 @app.get("/")
@@ -213,18 +282,21 @@ async def root():
 
 
 @app.get("/api/achievements")
-async def get_achievements(game_name: Optional[str] = Query(None, max_length=80)):
+async def get_achievements(
+    game_name: Optional[str] = Query(None, max_length=80),
+    reads: TrackingBackend = Depends(read_database),
+):
     """Public — clan achievements, optionally filtered by game."""
-    return await db.get_clan_achievements(game_name=game_name)
+    return await reads.get_clan_achievements(game_name=game_name)
 
 
 @app.get("/api/landing-stats")
-async def get_landing_stats():
+async def get_landing_stats(reads: TrackingBackend = Depends(read_database)):
     """Public — aggregate stats for the landing page."""
     guild_id = int(REQUIRED_GUILD_ID) if REQUIRED_GUILD_ID else None
     if not guild_id:
         return {"member_count": 0, "role_count": 0, "days_active": 0}
-    return await db.get_landing_stats(guild_id=guild_id)
+    return await reads.get_landing_stats(guild_id=guild_id)
 
 
 # ── Auth endpoints ────────────────────────────────────────────────────────────
@@ -348,10 +420,13 @@ async def get_current_user_info(current_user: AuthUser = Depends(get_current_use
 # ── Admin tracking endpoints (require admin role) ─────────────────────────────
 
 @app.get("/api/admin/database-stats", response_model=DatabaseStats)
-async def get_database_stats(current_user: AuthUser = Depends(require_admin)):
+async def get_database_stats(
+    current_user: AuthUser = Depends(require_admin),
+    reads: TrackingBackend = Depends(read_database),
+):
     """Admin — overall database statistics."""
     try:
-        stats = await db.get_database_stats()
+        stats = await reads.get_database_stats()
         return DatabaseStats(
             user_count=stats.get('user_count', 0),
             username_changes=stats.get('username_changes', 0),
@@ -364,44 +439,58 @@ async def get_database_stats(current_user: AuthUser = Depends(require_admin)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.get("/api/admin/query-metrics")
+async def get_query_metrics(
+    reset: bool = Query(False, description="Clear the metrics after reading them"),
+    current_user: AuthUser = Depends(require_admin),
+):
+    """Admin — call counts, latency histograms, rows and connection-acquire time per database method."""
+    metrics = {"database": db.get_query_metrics()}
+    if replica_db is not None:
+        metrics["replica"] = replica_db.get_query_metrics()
+    if reset:
+        for backend in (db, replica_db):
+            if backend is not None:
+                backend.query_metrics.reset()
+    return metrics
+
+
+@app.get("/api/admin/slow-queries")
+async def get_slow_queries(
+    clear: bool = Query(False, description="Empty the log after reading it"),
+    current_user: AuthUser = Depends(require_admin),
+):
+    """Admin — statements slower than DATABASE_SLOW_QUERY_MS with redacted parameters and query plans."""
+    if not isinstance(db, Database):
+        raise HTTPException(status_code=404, detail="The slow-query log is only available with the SQLite backend")
+    log = {"database": db.get_slow_queries()}
+    if replica_db is not None:
+        log["replica"] = replica_db.get_slow_queries()
+    if clear:
+        for backend in (db, replica_db):
+            if backend is not None:
+                backend.slow_queries.clear()
+    return log
+
+
 # ── Member tracking endpoints (require website access) ───────────────────────
 
+def _user_stats(user_id: int, stats: dict) -> UserStats:
+    return UserStats(user_id=user_id, **stats)
+
+
 @app.get("/api/users/{user_id}/stats", response_model=UserStats)
 async def get_user_stats(
     user_id: str,
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     """Member — statistics for a specific user."""
     try:
-        import aiosqlite
-        async with aiosqlite.connect(db.db_path) as conn:
-            cursor = await conn.execute(
-                "SELECT username, display_name, avatar_url FROM users WHERE user_id = ?",
-                (int(user_id),),
-            )
-            user_data = await cursor.fetchone()
-            if not user_data:
-                cursor = await conn.execute(
-                    "SELECT user_id, nickname FROM guild_members WHERE user_id = ? LIMIT 1",
-                    (int(user_id),),
-                )
-                guild_data = await cursor.fetchone()
-                if guild_data:
-                    user_data = (f"User_{user_id}", guild_data[1] or f"User_{user_id}", None)
-                else:
-                    raise HTTPException(status_code=404, detail="User not found")
-
-        stats = await db.get_user_stats(int(user_id))
-        return UserStats(
-            user_id=int(user_id),
-            username=user_data[0] or f"User_{user_id}",
-            display_name=user_data[1] or user_data[0] or f"User_{user_id}",
-            avatar_url=user_data[2] if len(user_data) > 2 else None,
-            username_changes=stats.get('username_changes', 0),
-            nickname_changes=stats.get('nickname_changes', 0),
-            role_changes=stats.get('role_changes', 0),
-            last_activity=stats.get('last_activity'),
-        )
+        stats = (await reads.get_users_stats([int(user_id)])).get(int(user_id))
+        if stats is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return _user_stats(int(user_id), stats)
     except HTTPException:
         raise
     except Exception as e:
@@ -409,13 +498,34 @@ async def get_user_stats(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/api/servers/{guild_id}/users/stats", response_model=Dict[str, UserStats])
+async def get_bulk_user_stats(
+    guild_id: int,
+    body: UserStatsBatchRequest,
+    current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
+):
+    """Member — statistics for up to MAX_STATS_BATCH users, keyed by user id; counts cover this server."""
+    try:
+        stats_by_user = await reads.get_users_stats(body.user_ids, guild_id)
+        return {str(uid): _user_stats(uid, stats) for uid, stats in stats_by_user.items()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting bulk user stats: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @app.get("/api/servers/{guild_id}/stats", response_model=ServerStats)
 async def get_server_stats(
     guild_id: int,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        stats = await db.get_server_stats(guild_id)
+        stats = await reads.get_server_stats(guild_id, start=start, end=end)
         return ServerStats(
             total_users=stats.get('total_users', 0),
             total_username_changes=stats.get('total_username_changes', 0),
@@ -434,10 +544,13 @@ async def get_server_stats(
 async def get_recent_changes(
     guild_id: int,
     limit: int = Query(10, ge=1, le=100),
+    before: Optional[str] = Query(None, pattern=r'^\d+,\d+$'),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        changes = await db.get_recent_changes(guild_id, limit)
+        cursor = tuple(int(part) for part in before.split(',')) if before else None
+        changes = await reads.get_recent_changes(guild_id, limit, before=cursor)
         return [
             ChangeEvent(
                 type=c['type'],
@@ -452,6 +565,7 @@ async def get_recent_changes(
                 role_name=c.get('role_name'),
                 role_color=c.get('role_color'),
                 action=c.get('action'),
+                cursor=c['cursor'],
             )
             for c in changes
         ]
@@ -465,9 +579,10 @@ async def get_role_history(
     user_id: str,
     guild_id: int = Query(...),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        history = await db.get_role_history(int(user_id), guild_id)
+        history = await reads.get_role_history(int(user_id), guild_id)
         return [
             RoleChange(
                 role_id=h['role_id'],
@@ -486,52 +601,54 @@ async def get_role_history(
 @app.get("/api/servers/{guild_id}/weekly-activity", response_model=List[WeeklyActivityDay])
 async def get_weekly_activity(
     guild_id: int,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        activity_data = await db.get_weekly_activity(guild_id)
+        activity_data = await reads.get_weekly_activity(guild_id, start=start, end=end)
         return [WeeklyActivityDay(name=d['name'], changes=d['changes']) for d in activity_data]
     except Exception as e:
         logger.error("Error getting weekly activity: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.get("/api/servers/{guild_id}/daily-activity", response_model=List[DailyActivity])
+async def get_daily_activity(
+    guild_id: int,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
+):
+    """Per-day joins, leaves and name/role changes between two dates (inclusive, UTC)."""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return await reads.get_daily_activity(guild_id, start=start, end=end)
+    except Exception as e:
+        logger.error("Error getting daily activity: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @app.get("/api/users/{user_id}/current-roles")
 async def get_user_current_roles(
     user_id: str,
     guild_id: int = Query(...),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        import aiosqlite
-        async with aiosqlite.connect(db.db_path) as conn:
-            cursor = await conn.execute(
-                """
-                SELECT rc.role_id, r.name, r.color, r.position
-                FROM role_changes rc
-                INNER JOIN (
-                    SELECT role_id, user_id, MAX(changed_at) as latest_change
-                    FROM role_changes
-                    WHERE user_id = ? AND guild_id = ?
-                    GROUP BY role_id, user_id
-                ) latest ON rc.role_id = latest.role_id
-                           AND rc.user_id = latest.user_id
-                           AND rc.changed_at = latest.latest_change
-                INNER JOIN roles r ON rc.role_id = r.role_id
-                WHERE rc.action IN ('added', 'initial')
-                ORDER BY r.position DESC
-                """,
-                (int(user_id), guild_id),
-            )
-            roles = await cursor.fetchall()
+        roles = await reads.get_current_roles(int(user_id), guild_id)
 
-            def _hex(c):
-                return f"#{c:06x}" if c else "#99aab5"
+        def _hex(c):
+            return f"#{c:06x}" if c else "#99aab5"
 
-            return [
-                {"role_id": str(r[0]), "role_name": r[1], "color": _hex(r[2]), "position": r[3]}
-                for r in roles
-            ]
+        return [
+            {"role_id": str(r["role_id"]), "role_name": r["role_name"], "color": _hex(r["color"]), "position": r["position"]}
+            for r in roles
+        ]
     except Exception as e:
         logger.error("Error getting user current roles: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -542,6 +659,7 @@ async def get_bulk_user_roles(
     guild_id: int,
     user_ids: str = Query(...),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
         user_id_list = [int(uid.strip()) for uid in user_ids.split(',') if uid.strip()]
@@ -550,39 +668,18 @@ async def get_bulk_user_roles(
         if len(user_id_list) > 200:
             raise HTTPException(status_code=400, detail="Too many user IDs (max 200)")
 
-        import aiosqlite
-        async with aiosqlite.connect(db.db_path) as conn:
-            placeholders = ','.join('?' * len(user_id_list))
-            cursor = await conn.execute(
-                f"""
-                SELECT rc.user_id, rc.role_id, r.name, r.color, r.position
-                FROM role_changes rc
-                INNER JOIN (
-                    SELECT role_id, user_id, MAX(changed_at) as latest_change
-                    FROM role_changes
-                    WHERE user_id IN ({placeholders}) AND guild_id = ?
-                    GROUP BY role_id, user_id
-                ) latest ON rc.role_id = latest.role_id
-                           AND rc.user_id = latest.user_id
-                           AND rc.changed_at = latest.latest_change
-                INNER JOIN roles r ON rc.role_id = r.role_id
-                WHERE rc.action IN ('added', 'initial')
-                ORDER BY rc.user_id, r.position DESC
-                """,
-                user_id_list + [guild_id],
-            )
-            rows = await cursor.fetchall()
+        roles_by_user = await reads.get_current_roles_bulk(guild_id, user_id_list)
 
-            def _hex(c):
-                return f"#{c:06x}" if c else "#99aab5"
+        def _hex(c):
+            return f"#{c:06x}" if c else "#99aab5"
 
-            result: dict = {}
-            for row in rows:
-                uid = str(row[0])
-                result.setdefault(uid, []).append(
-                    {"role_id": str(row[1]), "role_name": row[2], "color": _hex(row[3]), "position": row[4]}
-                )
-            return result
+        return {
+            str(uid): [
+                {"role_id": str(r["role_id"]), "role_name": r["role_name"], "color": _hex(r["color"]), "position": r["position"]}
+                for r in roles
+            ]
+            for uid, roles in roles_by_user.items()
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -598,72 +695,20 @@ async def search_users(
     guild_id: int = Query(None),
     role_filter: str = Query(None, max_length=30),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     """Search users — rate-limited to 30 requests/min per IP."""
     try:
-        import aiosqlite
         # Default to the configured guild to prevent unrestricted cross-guild search
         if not guild_id and REQUIRED_GUILD_ID:
             guild_id = int(REQUIRED_GUILD_ID)
-        async with aiosqlite.connect(db.db_path) as conn:
-            if guild_id:
-                base_query = """
-                    SELECT DISTINCT u.user_id, u.username, u.display_name, u.avatar_url,
-                                    u.last_seen, gm.nickname, gm.joined_at
-                    FROM users u
-                    JOIN guild_members gm ON u.user_id = gm.user_id
-                    LEFT JOIN role_changes rc ON u.user_id = rc.user_id AND rc.guild_id = gm.guild_id
-                    LEFT JOIN roles r ON rc.role_id = r.role_id
-                    WHERE gm.guild_id = ? AND gm.is_active = 1
-                """
-                params = [guild_id]
-                if role_filter and role_filter != "all":
-                    base_query += """
-                        AND u.user_id IN (
-                            SELECT DISTINCT rc2.user_id
-                            FROM role_changes rc2
-                            INNER JOIN (
-                                SELECT role_id, user_id, MAX(changed_at) as latest_change
-                                FROM role_changes
-                                WHERE guild_id = ? AND role_id = ?
-                                GROUP BY role_id, user_id
-                            ) latest ON rc2.role_id = latest.role_id
-                                       AND rc2.user_id = latest.user_id
-                                       AND rc2.changed_at = latest.latest_change
-                            WHERE rc2.action IN ('added', 'initial') AND rc2.role_id = ?
-                        )
-                    """
-                    params.extend([guild_id, role_filter, role_filter])
-                base_query += """
-                    AND (u.username LIKE ? OR u.display_name LIKE ? OR gm.nickname LIKE ? OR r.name LIKE ?)
-                    ORDER BY u.last_seen DESC LIMIT 20
-                """
-                params.extend([f"%{q}%"] * 4)
-                cursor = await conn.execute(base_query, params)
-            else:
-                cursor = await conn.execute(
-                    """
-                    SELECT user_id, username, display_name, avatar_url, last_seen,
-                           NULL as nickname, NULL as joined_at
-                    FROM users
-                    WHERE username LIKE ? OR display_name LIKE ?
-                    ORDER BY last_seen DESC LIMIT 20
-                    """,
-                    (f"%{q}%", f"%{q}%"),
-                )
-            users = await cursor.fetchall()
-            return [
-                {
-                    "user_id": str(u[0]),
-                    "username": u[1],
-                    "display_name": u[2],
-                    "avatar_url": u[3],
-                    "last_seen": u[4],
-                    "nickname": u[5],
-                    "joined_at": u[6],
-                }
-                for u in users
-            ]
+        role_id = None
+        if role_filter and role_filter != "all":
+            if not role_filter.isdigit():
+                return []
+            role_id = int(role_filter)
+        users = await reads.search_users(q, guild_id=guild_id, role_id=role_id, limit=20)
+        return [{**u, "user_id": str(u["user_id"])} for u in users]
     except Exception as e:
         logger.error("Error searching users: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -675,50 +720,18 @@ async def get_guild_users(
     active_only: bool = Query(True),
     role_filter: str = Query(None, max_length=30),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        import aiosqlite
-        async with aiosqlite.connect(db.db_path) as conn:
-            query = """
-                SELECT u.user_id, u.username, u.display_name, u.avatar_url, gm.nickname, gm.joined_at
-                FROM users u
-                JOIN guild_members gm ON u.user_id = gm.user_id
-                WHERE gm.guild_id = ?
-            """
-            params = [guild_id]
-            if active_only:
-                query += " AND gm.is_active = TRUE"
-            if role_filter and role_filter != "all":
-                query += """
-                    AND u.user_id IN (
-                        SELECT DISTINCT rc.user_id
-                        FROM role_changes rc
-                        INNER JOIN (
-                            SELECT role_id, user_id, MAX(changed_at) as latest_change
-                            FROM role_changes
-                            WHERE guild_id = ? AND role_id = ?
-                            GROUP BY role_id, user_id
-                        ) latest ON rc.role_id = latest.role_id
-                                   AND rc.user_id = latest.user_id
-                                   AND rc.changed_at = latest.latest_change
-                        WHERE rc.action IN ('added', 'initial') AND rc.role_id = ?
-                    )
-                """
-                params.extend([guild_id, role_filter, role_filter])
-            query += " ORDER BY gm.joined_at DESC"
-            cursor = await conn.execute(query, params)
-            users = await cursor.fetchall()
-            return [
-                {
-                    "user_id": str(u[0]),
-                    "username": u[1],
-                    "display_name": u[2],
-                    "avatar_url": u[3],
-                    "nickname": u[4],
-                    "joined_at": u[5],
-                }
-                for u in users
-            ]
+        role_id = None
+        if role_filter and role_filter != "all":
+            if not role_filter.isdigit():
+                return []
+            role_id = int(role_filter)
+        users = await reads.get_guild_users(guild_id, active_only=active_only, role_id=role_id)
+        for user in users:
+            user["user_id"] = str(user["user_id"])
+        return users
     except Exception as e:
         logger.error("Error getting guild users: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -728,34 +741,26 @@ async def get_guild_users(
 async def get_role_filters(
     guild_id: int,
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     try:
-        import aiosqlite
         filter_roles_env = os.getenv('FILTER_ROLES', '')
         default_filter = os.getenv('DEFAULT_FILTER_ROLE', 'all')
         filters = [{"role_id": "all", "role_name": "All Users", "role_color": "#5865f2"}]
 
         if filter_roles_env:
-            role_ids = [r.strip() for r in filter_roles_env.split(',') if r.strip()]
+            role_ids = [int(r.strip()) for r in filter_roles_env.split(',') if r.strip().isdigit()]
             if role_ids:
-                async with aiosqlite.connect(db.db_path) as conn:
-                    placeholders = ','.join('?' * len(role_ids))
-                    cursor = await conn.execute(
-                        f"SELECT role_id, name, color FROM roles WHERE role_id IN ({placeholders}) AND guild_id = ?",
-                        role_ids + [guild_id],
-                    )
-                    roles_data = await cursor.fetchall()
-
-                    def _hex(c):
-                        return f"#{c:06x}" if c else "#99aab5"
+                def _hex(c):
+                    return f"#{c:06x}" if c else "#99aab5"
 
-                    roles_dict = {
-                        str(r[0]): {"role_id": str(r[0]), "role_name": r[1], "role_color": _hex(r[2])}
-                        for r in roles_data
-                    }
-                    for rid in role_ids:
-                        if rid in roles_dict:
-                            filters.append(roles_dict[rid])
+                roles_dict = {
+                    r['role_id']: {"role_id": str(r['role_id']), "role_name": r['name'], "role_color": _hex(r['color'])}
+                    for r in await reads.get_roles(guild_id, role_ids)
+                }
+                for rid in role_ids:
+                    if rid in roles_dict:
+                        filters.append(roles_dict[rid])
 
         return {"filters": filters, "default_filter": default_filter.strip() or "all"}
     except Exception as e:
@@ -838,8 +843,9 @@ async def get_events(current_user: AuthUser = Depends(require_website_access)):
 async def get_news(
     limit: int = Query(20, ge=1, le=100),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
-    return await db.get_news_posts(limit=limit)
+    return await reads.get_news_posts(limit=limit)
 
 
 # ── Leaderboard endpoint ──────────────────────────────────────────────────────
@@ -848,11 +854,12 @@ async def get_news(
 async def get_leaderboard(
     limit: int = Query(50, ge=1, le=100),
     current_user: AuthUser = Depends(require_website_access),
+    reads: TrackingBackend = Depends(read_database),
 ):
     guild_id = int(REQUIRED_GUILD_ID) if REQUIRED_GUILD_ID else None
     if not guild_id:
         return []
-    return await db.get_leaderboard(guild_id=guild_id, limit=limit)
+    return await reads.get_leaderboard(guild_id=guild_id, limit=limit)
 
 
 # ── Admin achievement endpoints ───────────────────────────────────────────────
@@ -904,6 +911,14 @@ async def not_found_handler(request, exc):
     return JSONResponse(status_code=404, content={"detail": "Endpoint not found"})
 
 
+@app.exception_handler(ReadOnlyDatabaseError)
+async def read_only_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Edits are unavailable: the API opens the SQLite database read-only"},
+    )
+
+
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     return JSONResponse(status_code=500, content={"detail": "Internal server error"})
@@ -1,9 +1,14 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import io
 import logging
+import time
 from datetime import datetime
 
+from src.database.database import Database
+from src.database.export import spool_ndjson_gzip
+
 logger = logging.getLogger(__name__)
 
 class AdminCog(commands.Cog):
@@ -12,6 +17,16 @@ class AdminCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
+    async def _require_sqlite(self, interaction: discord.Interaction) -> bool:
+        """Maintenance commands that work on the SQLite files; tell the admin when they don't apply"""
+        if isinstance(self.bot.db, Database):
+            return True
+        await interaction.response.send_message(
+            "❌ This command is only available with the SQLite backend.",
+            ephemeral=True
+        )
+        return False
+    
     @app_commands.command(name="sync", description="Sync slash commands (Admin only)")
     @app_commands.default_permissions(administrator=True)
     async def sync(self, interaction: discord.Interaction):
@@ -79,6 +94,36 @@ class AdminCog(commands.Cog):
                 inline=False
             )
             
+            if isinstance(self.bot.db, Database):
+                pool = self.bot.db.get_pool_stats()
+                embed.add_field(
+                    name="Connection Pool",
+                    value=f"**Readers:** {pool['idle_readers']}/{pool['readers']} idle\n"
+                          f"**Read wait:** {pool['reader']['avg_wait_ms']}ms avg, {pool['reader']['max_wait_ms']}ms max\n"
+                          f"**Write wait:** {pool['writer']['avg_wait_ms']}ms avg, {pool['writer']['max_wait_ms']}ms max",
+                    inline=False
+                )
+            
+                queue = self.bot.db.get_write_queue_stats()
+                embed.add_field(
+                    name="Write Queue",
+                    value=f"**Depth:** {queue['depth']} (max {queue['max_depth']})\n"
+                          f"**Batches:** {queue['batches']} (avg {queue['avg_batch_size']}, max {queue['max_batch_size']})\n"
+                          f"**Retried:** {queue['retried']} | **Failed:** {queue['failed']} ({queue['dead_lettered']} dead-lettered)\n"
+                          f"**Backpressure waits:** {queue['backpressure_waits']}",
+                    inline=False
+                )
+            
+            upserts = self.bot.db.get_upsert_stats()
+            embed.add_field(
+                name="Upserts",
+                value=f"**Roles:** {upserts['roles']['applied']} applied, {upserts['roles']['skipped']} skipped\n"
+                      f"**Users:** {upserts['users']['applied']} applied, {upserts['users']['skipped']} skipped\n"
+                      f"**Members:** {upserts['members']['applied']} applied, {upserts['members']['skipped']} skipped\n"
+                      f"**Cached rows:** {upserts['users']['size'] + upserts['members']['size']}",
+                inline=False
+            )
+            
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
         except Exception as e:
@@ -93,6 +138,9 @@ class AdminCog(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def cleanup_old_data(self, interaction: discord.Interaction, days: int = 90):
         """Clean up old tracking data"""
+        if not await self._require_sqlite(interaction):
+            return
+        
         if days < 7:
             await interaction.response.send_message(
                 "❌ Minimum retention period is 7 days.",
@@ -101,7 +149,21 @@ class AdminCog(commands.Cog):
             return
         
         try:
-            deleted_count = await self.bot.db.cleanup_old_data(days)
+            # Large cleanups run in batches and can take a while
+            await interaction.response.defer(ephemeral=True)
+            
+            last_update = 0.0
+            
+            async def report(table: str, deleted: int):
+                nonlocal last_update
+                now = time.monotonic()
+                if now - last_update >= 2:
+                    last_update = now
+                    await interaction.edit_original_response(
+                        content=f"🧹 Cleaning up `{table}`: {deleted} rows deleted so far..."
+                    )
+            
+            deleted_count = await self.bot.db.cleanup_old_data(days, progress=report)
             
             embed = discord.Embed(
                 title="Data Cleanup Complete",
@@ -116,12 +178,12 @@ class AdminCog(commands.Cog):
                 inline=False
             )
             
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.edit_original_response(content=None, embed=embed)
             logger.info(f"Cleaned up {deleted_count} old records (>{days} days)")
             
         except Exception as e:
             logger.error(f"Error cleaning up data: {e}")
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"❌ Error cleaning up data: {e}",
                 ephemeral=True
             )
@@ -130,40 +192,62 @@ class AdminCog(commands.Cog):
     @app_commands.describe(user="The user to export data for")
     @app_commands.default_permissions(administrator=True)
     async def export_user_data(self, interaction: discord.Interaction, user: discord.Member):
-        """Export all tracking data for a specific user"""
+        """Export all tracking data for a specific user as a gzip-compressed NDJSON file"""
+        if not await self._require_sqlite(interaction):
+            return
+        
         try:
-            data = await self.bot.db.export_user_data(user.id)
+            await interaction.response.defer(ephemeral=True)
             
-            if not data:
-                await interaction.response.send_message(
-                    f"No tracking data found for {user.display_name}.",
+            archive, counts = await spool_ndjson_gzip(self.bot.db.export_user_data(user.id))
+            with archive:
+                if not counts:
+                    await interaction.followup.send(
+                        f"No tracking data found for {user.display_name}.",
+                        ephemeral=True
+                    )
+                    return
+                
+                size = archive.seek(0, io.SEEK_END)
+                archive.seek(0)
+                
+                # Create a summary embed
+                embed = discord.Embed(
+                    title=f"Data Export for {user.display_name}",
+                    color=discord.Color.blue(),
+                    timestamp=datetime.utcnow()
+                )
+                
+                embed.add_field(
+                    name="Export Summary",
+                    value=f"**Username Changes:** {counts.get('username_changes', 0)}\n"
+                          f"**Nickname Changes:** {counts.get('nickname_changes', 0)}\n"
+                          f"**Role Changes:** {counts.get('role_changes', 0)}\n"
+                          f"**Join/Leave Events:** {counts.get('join_leave_events', 0)}\n"
+                          f"**Total Rows:** {sum(counts.values())}",
+                    inline=False
+                )
+                
+                limit = interaction.guild.filesize_limit if interaction.guild else 10 * 1024 * 1024
+                if size > limit:
+                    embed.add_field(
+                        name="⚠️ File too large",
+                        value=f"The export is {size / 1024 / 1024:.1f} MB, above this server's "
+                              f"upload limit of {limit / 1024 / 1024:.0f} MB.",
+                        inline=False
+                    )
+                    await interaction.followup.send(embed=embed, ephemeral=True)
+                    return
+                
+                await interaction.followup.send(
+                    embed=embed,
+                    file=discord.File(archive, filename=f"user_{user.id}_export.ndjson.gz"),
                     ephemeral=True
                 )
-                return
-            
-            # Create a summary embed
-            embed = discord.Embed(
-                title=f"Data Export for {user.display_name}",
-                color=discord.Color.blue(),
-                timestamp=datetime.utcnow()
-            )
-            
-            embed.add_field(
-                name="Export Summary",
-                value=f"**Username Changes:** {len(data.get('username_changes', []))}\n"
-                      f"**Nickname Changes:** {len(data.get('nickname_changes', []))}\n"
-                      f"**Role Changes:** {len(data.get('role_changes', []))}\n"
-                      f"**Join/Leave Events:** {len(data.get('join_leave_events', []))}",
-                inline=False
-            )
-            
-            # For now, just send the summary
-            # In a production environment, you might want to create a file and send it
-            await interaction.response.send_message(embed=embed, ephemeral=True)
             
         except Exception as e:
             logger.error(f"Error exporting user data: {e}")
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"❌ Error exporting user data: {e}",
                 ephemeral=True
             )
@@ -216,15 +300,18 @@ class AdminCog(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def cleanup_duplicate_roles(self, interaction: discord.Interaction):
         """Clean up duplicate 'initial' role entries from the database"""
+        if not await self._require_sqlite(interaction):
+            return
+        
         try:
             await interaction.response.defer(ephemeral=True)
             
             # Run the cleanup function
-            await self.bot.db.cleanup_duplicate_initial_roles()
+            removed = await self.bot.db.cleanup_duplicate_initial_roles()
             
             embed = discord.Embed(
                 title="🧹 Database Cleanup Completed",
-                description="Successfully cleaned up duplicate initial role entries from the database.",
+                description=f"Removed {removed} duplicate initial role entries from the database.",
                 color=discord.Color.green(),
                 timestamp=datetime.utcnow()
             )
@@ -246,5 +333,197 @@ class AdminCog(commands.Cog):
                 ephemeral=True
             )
 
+    @app_commands.command(name="reinventory", description="Re-run the member inventory for all guilds (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    async def reinventory(self, interaction: discord.Interaction):
+        """Force a new member inventory; unchanged members are still skipped"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+            
+            await self.bot.initial_inventory(force=True)
+            
+            await interaction.followup.send(
+                "✅ Member inventory completed. Check the logs for details.",
+                ephemeral=True
+            )
+            
+        except Exception as e:
+            logger.error(f"Error during reinventory: {e}")
+            await interaction.followup.send(
+                "❌ An error occurred during the inventory. Check the logs for details.",
+                ephemeral=True
+            )
+
+    @app_commands.command(name="reconcile_counters", description="Recount the tables behind database statistics (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    async def reconcile_counters(self, interaction: discord.Interaction):
+        """Recount table_counters from the underlying tables"""
+        if not await self._require_sqlite(interaction):
+            return
+        
+        try:
+            await interaction.response.defer(ephemeral=True)
+            
+            drift = await self.bot.db.reconcile_table_counters()
+            
+            embed = discord.Embed(
+                title="Counter Reconciliation",
+                color=discord.Color.green() if not drift else discord.Color.orange(),
+                timestamp=datetime.utcnow()
+            )
+            
+            if drift:
+                embed.add_field(
+                    name="Corrected counters",
+                    value="\n".join(
+                        f"**{name}:** {values['stored']} → {values['actual']}"
+                        for name, values in drift.items()
+                    ),
+                    inline=False
+                )
+            else:
+                embed.description = "All counters matched the table contents."
+            
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            logger.error(f"Error reconciling counters: {e}")
+            await interaction.followup.send(
+                "❌ An error occurred while reconciling counters. Check the logs for details.",
+                ephemeral=True
+            )
+
+    @app_commands.command(name="leaderboard_check", description="Compare stored leaderboard scores with a live computation (Admin only)")
+    @app_commands.describe(repair="Rebuild the scores if they disagree")
+    @app_commands.default_permissions(administrator=True)
+    async def leaderboard_check(self, interaction: discord.Interaction, repair: bool = False):
+        """Run the leaderboard consistency checker for this guild"""
+        if not await self._require_sqlite(interaction):
+            return
+        
+        try:
+            await interaction.response.defer(ephemeral=True)
+            
+            result = await self.bot.db.check_leaderboard(interaction.guild.id, repair=repair)
+            
+            consistent = result['mismatches'] == 0
+            embed = discord.Embed(
+                title="Leaderboard Check",
+                color=discord.Color.green() if consistent else discord.Color.orange(),
+                timestamp=datetime.utcnow()
+            )
+            
+            embed.add_field(
+                name="Results",
+                value=f"**Members checked:** {result['checked']}\n"
+                      f"**Mismatches:** {result['mismatches']}\n"
+                      f"**Stale day counts:** {result['stale_days']}\n"
+                      f"**Repaired:** {'Yes' if result['repaired'] else 'No'}",
+                inline=False
+            )
+            
+            if result['samples']:
+                lines = []
+                for sample in result['samples'][:5]:
+                    expected = sample['expected']['score'] if sample['expected'] else '-'
+                    stored = sample['stored']['score'] if sample['stored'] else '-'
+                    lines.append(f"<@{sample['user_id']}>: expected {expected}, stored {stored}")
+                embed.add_field(name="Examples", value="\n".join(lines), inline=False)
+            
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            logger.error(f"Error checking leaderboard: {e}")
+            await interaction.followup.send(
+                "❌ An error occurred while checking the leaderboard. Check the logs for details.",
+                ephemeral=True
+            )
+
+    @app_commands.command(name="query_metrics", description="Show the slowest database methods (Admin only)")
+    @app_commands.describe(top="Number of methods to show (default: 10)", reset="Clear the metrics afterwards")
+    @app_commands.default_permissions(administrator=True)
+    async def query_metrics(self, interaction: discord.Interaction, top: int = 10, reset: bool = False):
+        """Per-method database timings, most total time first"""
+        try:
+            top = max(1, min(top, 20))
+            metrics = self.bot.db.get_query_metrics()
+            
+            embed = discord.Embed(
+                title="Database Query Metrics",
+                color=discord.Color.blue(),
+                timestamp=datetime.utcnow()
+            )
+            embed.set_footer(text=f"Since {datetime.utcfromtimestamp(metrics['since']):%Y-%m-%d %H:%M} UTC")
+            
+            if not metrics['enabled']:
+                embed.description = "Metrics are disabled (DATABASE_METRICS=false)."
+            elif not metrics['methods']:
+                embed.description = "No database calls recorded yet."
+            
+            for name, method in list(metrics['methods'].items())[:top]:
+                embed.add_field(
+                    name=name,
+                    value=f"**Calls:** {method['calls']} ({method['errors']} failed) | **Total:** {method['total_ms']:.0f}ms\n"
+                          f"**p50/p95/max:** {method['p50_ms']} / {method['p95_ms']} / {method['max_ms']}ms\n"
+                          f"**Rows:** {method['avg_rows']} avg | **Acquire:** {method['avg_acquire_ms']}ms avg",
+                    inline=False
+                )
+            
+            if reset:
+                self.bot.db.query_metrics.reset()
+            
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        except Exception as e:
+            logger.error(f"Error getting query metrics: {e}")
+            await interaction.response.send_message(
+                "❌ An error occurred while fetching query metrics.",
+                ephemeral=True
+            )
+
+    @app_commands.command(name="slow_queries", description="Show recent slow database statements and their query plans (Admin only)")
+    @app_commands.describe(count="Number of statements to show (default: 5)", clear="Empty the log afterwards")
+    @app_commands.default_permissions(administrator=True)
+    async def slow_queries(self, interaction: discord.Interaction, count: int = 5, clear: bool = False):
+        """Newest entries of the slow-query log with their EXPLAIN QUERY PLAN output"""
+        if not await self._require_sqlite(interaction):
+            return
+        
+        try:
+            count = max(1, min(count, 10))
+            log = self.bot.db.get_slow_queries()
+            
+            embed = discord.Embed(
+                title="Slow Queries",
+                color=discord.Color.orange() if log['entries'] else discord.Color.green(),
+                timestamp=datetime.utcnow()
+            )
+            embed.set_footer(text=f"Threshold {log['threshold_ms']}ms | {log['recorded']} recorded since startup")
+            
+            if log['threshold_ms'] <= 0:
+                embed.description = "The slow-query log is disabled (DATABASE_SLOW_QUERY_MS=0)."
+            elif not log['entries']:
+                embed.description = "No statement has exceeded the threshold."
+            
+            for entry in log['entries'][:count]:
+                plan = "\n".join(entry['plan'] or ["(no plan)"])
+                embed.add_field(
+                    name=f"{entry['elapsed_ms']:.0f}ms",
+                    value=f"<t:{int(entry['recorded_at'])}:R>\n```sql\n{entry['sql'][:400]}\n```\n```\n{plan[:500]}\n```",
+                    inline=False
+                )
+            
+            if clear:
+                self.bot.db.slow_queries.clear()
+            
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            logger.error(f"Error getting slow queries: {e}")
+            await interaction.response.send_message(
+                "❌ An error occurred while fetching the slow-query log.",
+                ephemeral=True
+            )
+
 async def setup(bot):
     await bot.add_cog(AdminCog(bot))
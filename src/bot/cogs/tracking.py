@@ -1,9 +1,13 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import logging
+import os
 from datetime import datetime, timedelta
 
+from src.database.database import Database
+from src.database.retention import policies_from_env
+
 logger = logging.getLogger(__name__)
 
 class TrackingCog(commands.Cog):
@@ -11,6 +15,75 @@ class TrackingCog(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        # Stored scores, retention and archives are maintained on the SQLite files only
+        if not isinstance(bot.db, Database):
+            return
+        self.refresh_leaderboard.start()
+        if policies_from_env():
+            self.run_retention.change_interval(hours=float(os.getenv('RETENTION_INTERVAL_HOURS', '24')))
+            self.run_retention.start()
+        if int(os.getenv('ARCHIVE_AFTER_DAYS', '0')) > 0:
+            self.archive_history.change_interval(hours=float(os.getenv('ARCHIVE_INTERVAL_HOURS', '24')))
+            self.archive_history.start()
+    
+    def cog_unload(self):
+        """Clean up when cog is unloaded"""
+        self.refresh_leaderboard.cancel()
+        self.run_retention.cancel()
+        self.archive_history.cancel()
+    
+    @tasks.loop(hours=1)
+    async def refresh_leaderboard(self):
+        """Background task that advances the days_active part of leaderboard scores"""
+        try:
+            if not self.bot.db:
+                return
+            refreshed = await self.bot.db.refresh_leaderboard_days()
+            if refreshed:
+                logger.info(f"Refreshed days_active for {refreshed} leaderboard scores")
+        except Exception as e:
+            logger.error(f"Error in refresh_leaderboard: {e}")
+    
+    @refresh_leaderboard.before_loop
+    async def before_refresh_leaderboard(self):
+        """Wait for bot to be ready before starting the loop"""
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(hours=24)
+    async def run_retention(self):
+        """Background task that prunes history according to the RETENTION_* policies"""
+        try:
+            if not self.bot.db:
+                return
+            if self.bot.db.retention.is_running:
+                logger.info("Skipping scheduled retention; a cleanup is already running")
+                return
+            await self.bot.db.run_retention()
+        except Exception as e:
+            logger.error(f"Error in run_retention: {e}")
+    
+    @run_retention.before_loop
+    async def before_run_retention(self):
+        """Wait for bot to be ready before starting the loop"""
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(hours=24)
+    async def archive_history(self):
+        """Background task that moves old history into the monthly archive files"""
+        try:
+            if not self.bot.db:
+                return
+            if self.bot.db.archive.is_running:
+                logger.info("Skipping scheduled archiving; a run is already in progress")
+                return
+            await self.bot.db.archive_history()
+        except Exception as e:
+            logger.error(f"Error in archive_history: {e}")
+    
+    @archive_history.before_loop
+    async def before_archive_history(self):
+        """Wait for bot to be ready before starting the loop"""
+        await self.bot.wait_until_ready()
     
     @app_commands.command(name="user_stats", description="Get statistics for a specific user")
     @app_commands.describe(user="The user to get statistics for")
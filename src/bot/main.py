@@ -5,7 +5,7 @@ from pathlib import Path
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-from src.database.database import Database
+from src.database.backend import create_backend
 
 # Load environment variables
 load_dotenv()
@@ -36,6 +36,7 @@ class RequiemBot(commands.Bot):
         )
         
         self.db = None
+        self.inventory_done = False
         
     async def setup_hook(self):
         """Called when the bot is starting up"""
@@ -43,8 +44,9 @@ class RequiemBot(commands.Bot):
         
         # Initialize database
         db_path = os.getenv('DATABASE_PATH', './data/tracking.db')
-        self.db = Database(db_path)
+        self.db = create_backend(path=db_path)
         await self.db.initialize()
+        logger.info(f"Using {type(self.db).__name__} backend")
         
         # Load cogs
         cogs_to_load = [
@@ -91,66 +93,52 @@ class RequiemBot(commands.Bot):
             )
         )
         
-        # Clean up any duplicate initial role entries from previous runs
-        await self.db.cleanup_duplicate_initial_roles()
-        
-        # Initial inventory of all guild members
+        # on_ready fires again on every gateway reconnect; the inventory only runs once per process
         await self.initial_inventory()
     
-    async def initial_inventory(self):
-        """Perform initial inventory of all guild members"""
+    async def initial_inventory(self, force: bool = False):
+        """Perform initial inventory of all guild members
+        
+        Runs once per process unless ``force`` is set. Members whose stored
+        fingerprint is unchanged since the last inventory are not rewritten.
+        """
         if not self.db:
             logger.error("Database not available for initial inventory")
             return
         
+        if self.inventory_done and not force:
+            logger.info("Initial inventory already completed for this process, skipping")
+            return
+        self.inventory_done = True
+        
         logger.info("Starting initial inventory of all guild members...")
         
         total_members = 0
+        total_unchanged = 0
         for guild in self.guilds:
             logger.info(f"Inventorying guild: {guild.name} (ID: {guild.id})")
             
             try:
-                # First, sync all roles in the guild
-                logger.info(f"Syncing {len(guild.roles)} roles for {guild.name}")
-                for role in guild.roles:
-                    if role.name != "@everyone":  # Skip @everyone role
-                        await self.db.upsert_role(role)
-                
                 # Get all members (this might take a while for large servers)
                 members = []
                 async for member in guild.fetch_members(limit=None):
                     members.append(member)
                 
-                logger.info(f"Found {len(members)} members in {guild.name}")
+                logger.info(f"Found {len(members)} members and {len(guild.roles)} roles in {guild.name}")
                 
-                # Process members in batches to avoid overwhelming the database
-                batch_size = 50
-                for i in range(0, len(members), batch_size):
-                    batch = members[i:i + batch_size]
-                    
-                    for member in batch:
-                        try:
-                            # Add/update user and guild member info
-                            await self.db.upsert_guild_member(member)
-                            total_members += 1
-                            
-                            # Log current roles for this member
-                            if len(member.roles) > 1:  # Exclude @everyone role
-                                for role in member.roles[1:]:  # Skip @everyone
-                                    await self.db._log_initial_role(member, role)
-                            
-                        except Exception as e:
-                            logger.error(f"Error processing member {member.display_name}: {e}")
-                    
-                    # Small delay between batches
-                    await asyncio.sleep(0.1)
+                # Roles, members and initial roles are written in one bulk transaction
+                counts = await self.db.inventory_guild(guild, members)
+                total_members += counts['members']
+                total_unchanged += counts['unchanged']
+                logger.info(f"Logged {counts['initial_roles']} new initial roles for {guild.name}")
                 
-                logger.info(f"Completed inventory for {guild.name}: {len(members)} members")
+                logger.info(f"Completed inventory for {guild.name}: {counts['members']} members written, "
+                            f"{counts['unchanged']} unchanged")
                 
             except Exception as e:
                 logger.error(f"Error inventorying guild {guild.name}: {e}")
         
-        logger.info(f"Initial inventory completed! Processed {total_members} total members.")
+        logger.info(f"Initial inventory completed! Wrote {total_members} members, skipped {total_unchanged} unchanged.")
     
     async def on_member_join(self, member):
         """Called when a member joins the guild"""
@@ -177,6 +165,21 @@ class RequiemBot(commands.Bot):
                 await self.db.log_role_change(before, after)
                 logger.info(f"Logged role change for {after.display_name}")
     
+    async def on_guild_role_create(self, role):
+        """Called when a role is created"""
+        if self.db:
+            await self.db.log_role_update(role)
+    
+    async def on_guild_role_update(self, before, after):
+        """Called when a role's name, color, position or permissions change"""
+        if self.db:
+            await self.db.log_role_update(after)
+    
+    async def on_guild_role_delete(self, role):
+        """Called when a role is deleted"""
+        if self.db:
+            self.db.forget_role(role)
+    
     async def on_user_update(self, before, after):
         """Called when a user's profile is updated"""
         if self.db and before.name != after.name:
@@ -234,9 +237,10 @@ async def main():
     except Exception as e:
         logger.error(f"Bot encountered an error: {e}")
     finally:
+        await bot.close()
+        # Closing the database flushes any queued tracking writes
         if bot.db:
             await bot.db.close()
-        await bot.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
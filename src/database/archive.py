@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+
+from .pool import ConnectionPool
+from .retention import RETENTION_TABLES, ProgressCallback
+from .timestamps import to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+# History tables moved to the archive, with the column that decides a row's month
+ARCHIVE_TABLES = RETENTION_TABLES
+
+# Rows that stay in the hot file regardless of age. 'initial' role rows are the
+# baseline the inventory diffs against, one per member and role.
+ARCHIVE_EXCLUDE = {
+    'role_changes': "action = 'initial'",
+}
+
+# Archived tables without a guild column are counted under guild 0
+ARCHIVE_GUILD_COLUMNS = {
+    'username_changes': None,
+}
+
+
+def month_expression(column: str) -> str:
+    """SQL for the YYYY-MM partition of an epoch-millisecond column"""
+    return f"strftime('%Y-%m', {column} / 1000, 'unixepoch')"
+
+
+class ArchiveManager:
+    """Moves old history out of the hot database into monthly archive files.
+
+    Each month lives in its own SQLite file (``<directory>/YYYY-MM.db``) with
+    the same table definitions as the hot file, and is only ATTACHed while it
+    is being written or read. Rows are moved in rowid windows of
+    ``batch_size``. Each window copies, counts and deletes the rows in one short
+    transaction, and the writer is released between windows, like the
+    retention engine.
+
+    The hot file keeps a manifest of partitions (``archive_partitions``) and
+    per-member row counts (``archived_user_counts``), so totals and leaderboard
+    scores still include archived history without opening any archive.
+    Copies use INSERT OR IGNORE on the original ids. If a crash lands between
+    the archive and hot commits, the next run just copies the rows again.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        directory: Path,
+        batch_size: int = 5000,
+        pause: float = 0.05,
+    ):
+        if batch_size < 1:
+            raise ValueError("Archive batch size must be at least 1")
+        self.pool = pool
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.pause = pause
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    def path_for(self, month: str) -> Path:
+        return self.directory / f"{month}.db"
+
+    async def months(self, db: aiosqlite.Connection, table: str) -> List[str]:
+        """Archived months holding rows of ``table``, oldest first"""
+        cursor = await db.execute(
+            "SELECT month FROM archive_partitions WHERE table_name = ? AND rows > 0 ORDER BY month",
+            (table,)
+        )
+        return [row[0] for row in await cursor.fetchall()]
+
+    @asynccontextmanager
+    async def attached(
+        self,
+        db: aiosqlite.Connection,
+        month: str,
+        read_only: bool = True,
+    ) -> AsyncIterator[Optional[str]]:
+        """ATTACH one month's archive to ``db`` and yield its schema name.
+
+        Read-only attaches yield None when the file is missing, so a deleted
+        partition drops out of reads instead of failing them.
+        """
+        path = self.path_for(month)
+        alias = f"archive_{month.replace('-', '_')}"
+        if read_only:
+            if not path.exists():
+                logger.warning(f"Archive partition {path} is missing; skipping it")
+                yield None
+                return
+            # Pool readers are URI connections, so the attach honours mode=ro
+            await db.execute(f"ATTACH DATABASE ? AS {alias}", (f"{path.resolve().as_uri()}?mode=ro",))
+        else:
+            await db.execute(f"ATTACH DATABASE ? AS {alias}", (str(path),))
+        try:
+            yield alias
+        finally:
+            if db.in_transaction:
+                await db.rollback()
+            await db.execute(f"DETACH DATABASE {alias}")
+
+    async def run(self, days: int, progress: Optional[ProgressCallback] = None) -> Dict[str, int]:
+        """Archive history older than ``days`` days; returns rows moved per table"""
+        async with self._lock:
+            started = time.perf_counter()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            cutoff = to_epoch_ms(datetime.utcnow() - timedelta(days=days))
+            moved = {}
+            for table, column in ARCHIVE_TABLES.items():
+                moved[table] = await self._archive_table(table, column, cutoff, progress)
+            logger.info(
+                f"Archived {sum(moved.values())} rows older than {days} days in "
+                f"{time.perf_counter() - started:.1f}s: {moved}"
+            )
+            return moved
+
+    async def _archive_table(
+        self,
+        table: str,
+        column: str,
+        cutoff: int,
+        progress: Optional[ProgressCallback],
+    ) -> int:
+        expired = f"{column} < ?"
+        if table in ARCHIVE_EXCLUDE:
+            expired += f" AND NOT ({ARCHIVE_EXCLUDE[table]})"
+        month_sql = month_expression(column)
+        async with self.pool.reader() as db:
+            cursor = await db.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table} WHERE {expired}", (cutoff,))
+            low, high = await cursor.fetchone()
+        if low is None:
+            return 0
+
+        moved = 0
+        start = low
+        while start <= high:
+            end = min(start + self.batch_size - 1, high)
+            window = f"rowid BETWEEN ? AND ? AND {expired}"
+            async with self.pool.reader() as db:
+                cursor = await db.execute(
+                    f"SELECT DISTINCT {month_sql} FROM {table} WHERE {window}",
+                    (start, end, cutoff)
+                )
+                months = [row[0] for row in await cursor.fetchall()]
+            for month in months:
+                moved += await self._move(table, f"{window} AND {month_sql} = ?", (start, end, cutoff, month), month)
+            start = end + 1
+            if progress is not None:
+                await progress(table, moved)
+            # Let queued tracking writes take the writer before the next window
+            await asyncio.sleep(self.pause)
+        logger.debug(f"Archived {moved} rows from {table} (older than {cutoff})")
+        return moved
+
+    async def _move(self, table: str, where: str, params: tuple, month: str) -> int:
+        """Copy the matching rows into ``month``'s archive, record them, delete them"""
+        guild_column = ARCHIVE_GUILD_COLUMNS.get(table, 'guild_id') or '0'
+        async with self.pool.writer() as db:
+            async with self.attached(db, month, read_only=False) as alias:
+                columns = await self._ensure_table(db, alias, table)
+                column_list = ', '.join(columns)
+                await db.execute(
+                    f"INSERT OR IGNORE INTO {alias}.{table} ({column_list}) "
+                    f"SELECT {column_list} FROM main.{table} WHERE {where}",
+                    params
+                )
+                await db.execute(f"""
+                    INSERT INTO archived_user_counts (table_name, guild_id, user_id, rows)
+                    SELECT ?, {guild_column}, user_id, COUNT(*) FROM main.{table}
+                    WHERE {where}
+                    GROUP BY 2, 3
+                    ON CONFLICT (user_id, guild_id, table_name) DO UPDATE SET rows = rows + excluded.rows
+                """, (table, *params))
+                cursor = await db.execute(f"DELETE FROM main.{table} WHERE {where}", params)
+                moved = cursor.rowcount
+                await db.execute("""
+                    INSERT INTO archive_partitions (month, table_name, rows) VALUES (?, ?, ?)
+                    ON CONFLICT (month, table_name) DO UPDATE SET
+                        rows = rows + excluded.rows,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (month, table, moved))
+                await db.commit()
+        return moved
+
+    async def _ensure_table(self, db: aiosqlite.Connection, alias: str, table: str) -> List[str]:
+        """Create ``table`` in the archive from the hot definition; returns its columns.
+
+        Columns added to the hot table since the partition was created are
+        added to the archive too, so copies never drop data.
+        """
+        cursor = await db.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+            (table,)
+        )
+        ddl = (await cursor.fetchone())[0]
+        ddl = re.sub(
+            r'^CREATE TABLE\s+(IF NOT EXISTS\s+)?["`\[]?\w+["`\]]?',
+            f'CREATE TABLE IF NOT EXISTS {alias}.{table}',
+            ddl,
+        )
+        await db.execute(ddl)
+        await db.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_{table}_user ON {table} (user_id)")
+
+        cursor = await db.execute(f"PRAGMA main.table_info({table})")
+        hot = [(row[1], row[2]) for row in await cursor.fetchall()]
+        cursor = await db.execute(f"PRAGMA {alias}.table_info({table})")
+        archived = {row[1] for row in await cursor.fetchall()}
+        for name, declared_type in hot:
+            if name not in archived:
+                await db.execute(f"ALTER TABLE {alias}.{table} ADD COLUMN {name} {declared_type}")
+        return [name for name, _ in hot]
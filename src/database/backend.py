@@ -0,0 +1,535 @@
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from .instrumentation import QueryMetrics
+from .row_cache import RoleCache, RowCache
+from .timestamps import from_epoch_ms
+from .write_queue import Statement
+
+# users.last_seen is only moved forward once it is this old, so an unchanged
+# user does not rewrite its row on every event
+LAST_SEEN_RESOLUTION_SECONDS = 300
+
+
+def create_backend(
+    url: Optional[str] = None,
+    path: Optional[str] = None,
+    read_only: Optional[bool] = None,
+) -> 'TrackingBackend':
+    """Open the configured storage backend (not yet initialized).
+
+    ``DATABASE_URL`` (or ``url``) starting with ``postgres://`` or
+    ``postgresql://`` selects PostgreSQL; anything else is the SQLite file at
+    ``DATABASE_PATH``. ``read_only`` opens the SQLite file without a writer,
+    migrations or write queue (``DATABASE_READ_ONLY`` when None); PostgreSQL
+    takes concurrent writers and ignores it.
+    """
+    url = url if url is not None else os.getenv('DATABASE_URL', '')
+    if url.startswith(('postgres://', 'postgresql://')):
+        from .postgres import PostgresDatabase
+        return PostgresDatabase(url)
+    from .database import Database
+    return Database(path or os.getenv('DATABASE_PATH', './data/tracking.db'), read_only=read_only)
+
+
+class TrackingBackend(ABC):
+    """Storage interface shared by the bot and the API.
+
+    Everything the Discord listeners, the cogs and the dashboard endpoints call
+    is declared here. SQLite (``Database``) and PostgreSQL (``PostgresDatabase``)
+    implement it; maintenance that only exists for the SQLite file (retention,
+    archive partitions, export, stored leaderboard scores) stays on
+    ``Database``.
+
+    Subclasses set ``upsert_role_sql``, ``upsert_user_sql`` and
+    ``upsert_member_sql``. The Discord-to-row conversion, the caches that skip
+    unchanged upserts and the inventory diff are shared.
+    """
+
+    upsert_role_sql: str
+    upsert_user_sql: str
+    upsert_member_sql: str
+
+    def __init__(self):
+        row_cache_size = int(os.getenv('DATABASE_ROW_CACHE_SIZE', '50000'))
+        self.user_rows = RowCache(row_cache_size, refresh_after=LAST_SEEN_RESOLUTION_SECONDS)
+        self.member_rows = RowCache(row_cache_size)
+        self.roles = RoleCache()
+        self.query_metrics = QueryMetrics.from_env()
+
+    # === Rows and statements ===
+
+    def _role_row(self, role: discord.Role) -> tuple:
+        return (
+            role.id,
+            role.guild.id,
+            role.name,
+            role.color.value,
+            role.position,
+            str(role.permissions.value),
+            role.hoist,
+            role.mentionable
+        )
+
+    def _user_row(self, user: discord.User | discord.Member) -> tuple:
+        return (
+            user.id,
+            user.name,
+            user.discriminator if hasattr(user, 'discriminator') else None,
+            user.display_name,
+            str(user.display_avatar.url) if user.display_avatar else None,
+            user.created_at,
+            datetime.utcnow(),
+            user.bot
+        )
+
+    def _member_row(self, member: discord.Member) -> tuple:
+        return (
+            member.guild.id,
+            member.id,
+            member.joined_at,
+            member.nick,
+            True
+        )
+
+    @staticmethod
+    def _user_cache_row(row: tuple) -> tuple:
+        # Everything but last_seen, which the cache refreshes on its own clock
+        return row[:6] + row[7:]
+
+    def _role_statements(self, role: discord.Role) -> List[Statement]:
+        row = self._role_row(role)
+        if not self.roles.should_write(row):
+            return []
+        return [(self.upsert_role_sql, row)]
+
+    def _user_statements(self, user: discord.User | discord.Member) -> List[Statement]:
+        row = self._user_row(user)
+        if not self.user_rows.should_write(user.id, self._user_cache_row(row)):
+            return []
+        return [(self.upsert_user_sql, row)]
+
+    def _member_statements(self, member: discord.Member) -> List[Statement]:
+        statements = self._user_statements(member)
+        row = self._member_row(member)
+        if self.member_rows.should_write((member.guild.id, member.id), row):
+            statements.append((self.upsert_member_sql, row))
+        return statements
+
+    def _forget_statements(self, statements: List[Statement]):
+        """Drop the cached rows of upserts that failed to commit"""
+        for sql, params in statements:
+            if sql == self.upsert_user_sql:
+                self.user_rows.invalidate(params[0])
+            elif sql == self.upsert_member_sql:
+                self.member_rows.invalidate((params[0], params[1]))
+            elif sql == self.upsert_role_sql:
+                self.roles.forget(params[0])
+
+    def get_upsert_stats(self) -> Dict[str, Any]:
+        """Get applied versus skipped role, user and member upserts"""
+        return {
+            'roles': self.roles.snapshot(),
+            'users': self.user_rows.snapshot(),
+            'members': self.member_rows.snapshot(),
+        }
+
+    def get_query_metrics(self) -> Dict[str, Any]:
+        """Get call counts, latency, rows and acquire time per storage method"""
+        return self.query_metrics.snapshot()
+
+    def forget_role(self, role: discord.Role):
+        """Drop a deleted role from the cache; its row stays so history keeps the name"""
+        self.roles.forget(role.id)
+
+    @staticmethod
+    def _leaderboard_score(days_active: int, role_count: int, role_changes: int) -> int:
+        return days_active * 2 + role_count * 50 + role_changes * 5
+
+    @staticmethod
+    def _change_record(row: tuple) -> Dict[str, Any]:
+        """Recent-changes entry for an event row joined with its user and (for role events) role"""
+        event_id, event_type, user_id, payload, ts, role_id, role_name, role_color, username, display_name, avatar_url = row
+        data = json.loads(payload) if payload else {}
+        change = {
+            'id': event_id,
+            'cursor': f"{ts},{event_id}",
+            'type': event_type,
+            'user_id': user_id,
+            'old_value': data.get('old'),
+            'new_value': data.get('new'),
+            'timestamp': from_epoch_ms(ts),
+            'username': username,
+            'display_name': display_name,
+            'avatar_url': avatar_url
+        }
+
+        # Add role-specific data if this is a role change
+        if event_type == 'role':
+            action = data.get('action')
+            change.update({
+                'old_value': role_name if action == 'removed' else None,
+                'new_value': role_name if action == 'added' else None,
+                'role_id': role_id if role_id is not None else data.get('role_id'),
+                'role_name': role_name,
+                'role_color': role_color,
+                'action': action
+            })
+        return change
+
+    # === Inventory ===
+
+    def _member_fingerprint(self, member: discord.Member) -> str:
+        """Hash of everything the inventory writes for a member"""
+        role_ids = sorted(role.id for role in member.roles if not role.is_default())
+        parts = (
+            member.name,
+            getattr(member, 'discriminator', None),
+            member.display_name,
+            str(member.display_avatar.url) if member.display_avatar else None,
+            member.bot,
+            member.nick,
+            member.joined_at.isoformat() if member.joined_at else None,
+            ','.join(map(str, role_ids)),
+        )
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def _inventory_rows(
+        self,
+        guild: discord.Guild,
+        changed: List[discord.Member],
+        fingerprints: Dict[int, str],
+        tracked: set,
+        current: set,
+        now: datetime,
+        ts: int,
+    ) -> Dict[str, list]:
+        """Rows an inventory writes for the changed members, diffed in memory.
+
+        ``tracked`` holds the (user_id, role_id) pairs with role history and
+        ``current`` those in member_roles. Roles are filtered through the role
+        cache, so only new or edited roles are returned.
+        """
+        roles = [role for role in guild.roles if not role.is_default()]
+        # Roles already held have history too, even if it has been archived
+        tracked = tracked | current
+        held = {
+            (member.id, role.id)
+            for member in changed
+            for role in member.roles
+            if not role.is_default()
+        }
+        changed_ids = {member.id for member in changed}
+        return {
+            'roles': [row for row in map(self._role_row, roles) if self.roles.should_write(row)],
+            'users': [self._user_row(member) for member in changed],
+            'members': [self._member_row(member) for member in changed],
+            'initial': [
+                (guild.id, member.id, role.id, now, ts)
+                for member in changed
+                for role in member.roles
+                if not role.is_default() and (member.id, role.id) not in tracked
+            ],
+            'grant': [(guild.id, user_id, role_id, now) for user_id, role_id in held - current],
+            'revoke': [
+                (guild.id, user_id, role_id)
+                for user_id, role_id in current - held
+                if user_id in changed_ids
+            ],
+            'fingerprints': [(guild.id, member.id, fingerprints[member.id]) for member in changed],
+        }
+
+    def _forget_inventory(self, rows: Dict[str, list]):
+        """Undo the role cache updates of an inventory whose transaction failed"""
+        for row in rows['roles']:
+            self.roles.forget(row[0])
+
+    def _remember_inventory(self, guild: discord.Guild, changed: List[discord.Member], rows: Dict[str, list]):
+        """Prime the row caches with what an inventory just committed"""
+        for member, user_row, member_row in zip(changed, rows['users'], rows['members']):
+            self.user_rows.remember(member.id, self._user_cache_row(user_row))
+            self.member_rows.remember((guild.id, member.id), member_row)
+
+    # === Lifecycle ===
+
+    @abstractmethod
+    async def initialize(self):
+        """Connect and bring the schema up to date"""
+
+    @abstractmethod
+    async def close(self):
+        """Finish pending writes and close all connections"""
+
+    @abstractmethod
+    async def flush(self):
+        """Wait until every tracking write handed in so far is committed"""
+
+    # === Tracking writes ===
+
+    @abstractmethod
+    async def upsert_role(self, role: discord.Role):
+        """Insert or update role information"""
+
+    @abstractmethod
+    async def log_role_update(self, role: discord.Role):
+        """Store a created or edited role"""
+
+    @abstractmethod
+    async def upsert_user(self, user: discord.User | discord.Member):
+        """Insert or update user information"""
+
+    @abstractmethod
+    async def upsert_guild_member(self, member: discord.Member):
+        """Insert or update guild member information"""
+
+    @abstractmethod
+    async def log_username_change(self, before: discord.User, after: discord.User):
+        """Log a username change"""
+
+    @abstractmethod
+    async def log_nickname_change(self, before: discord.Member, after: discord.Member):
+        """Log a nickname change"""
+
+    @abstractmethod
+    async def log_role_change(self, before: discord.Member, after: discord.Member):
+        """Log role changes"""
+
+    @abstractmethod
+    async def log_user_join(self, member: discord.Member):
+        """Log when a user joins the guild"""
+
+    @abstractmethod
+    async def log_user_leave(self, member: discord.Member):
+        """Log when a user leaves the guild"""
+
+    @abstractmethod
+    async def inventory_guild(self, guild: discord.Guild, members: List[discord.Member]) -> Dict[str, int]:
+        """Bulk-write a guild inventory; returns roles/members written, unchanged and initial roles"""
+
+    # === Dashboard reads ===
+
+    @abstractmethod
+    async def get_user_stats(self, user_id) -> Dict[str, Any]:
+        """Change counts and last activity of a user ({} when unknown)"""
+
+    @abstractmethod
+    async def get_users_stats(self, user_ids: List[int], guild_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """Profile, change counts and last activity of several users, keyed by user id.
+
+        With ``guild_id`` nickname and role counts only cover that guild;
+        unknown users are left out.
+        """
+
+    @abstractmethod
+    async def get_user_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Username, display name and avatar of a user, or None when unknown"""
+
+    @abstractmethod
+    async def get_server_stats(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Member count, change totals (optionally between two days) and 24h activity"""
+
+    @abstractmethod
+    async def get_recent_changes(
+        self,
+        guild_id: int,
+        limit: int = 10,
+        before: Optional[tuple] = None,
+    ) -> List[Dict[str, Any]]:
+        """Newest username, nickname and role changes, paged by a (ts, id) cursor"""
+
+    @abstractmethod
+    async def get_role_history(self, user_id, guild_id: int) -> List[Dict[str, Any]]:
+        """Role changes of a member, newest first (initial roles excluded)"""
+
+    @abstractmethod
+    async def get_daily_activity(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Per-day activity counters, oldest day first"""
+
+    @abstractmethod
+    async def get_weekly_activity(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Name and role changes per weekday"""
+
+    @abstractmethod
+    async def get_database_stats(self) -> Dict[str, int]:
+        """Overall row counts (initial role assignments excluded)"""
+
+    @abstractmethod
+    async def get_current_roles(self, user_id: int, guild_id: int) -> list:
+        """Roles a member currently holds, highest position first"""
+
+    @abstractmethod
+    async def get_current_roles_bulk(self, guild_id: int, user_ids: List[int]) -> Dict[int, list]:
+        """Current roles for several members, keyed by user id"""
+
+    @abstractmethod
+    async def search_users(
+        self,
+        query: str,
+        guild_id: Optional[int] = None,
+        role_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Search members by username, display name, nickname or current role name"""
+
+    @abstractmethod
+    async def get_guild_users(
+        self,
+        guild_id: int,
+        active_only: bool = True,
+        role_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Members of a guild, newest join first"""
+
+    @abstractmethod
+    async def get_roles(self, guild_id: int, role_ids: List[int]) -> List[Dict[str, Any]]:
+        """Name and color of the given roles of a guild"""
+
+    @abstractmethod
+    async def get_leaderboard(self, guild_id: int, limit: int = 50) -> list:
+        """Top members by community score"""
+
+    @abstractmethod
+    async def get_landing_stats(self, guild_id: int) -> dict:
+        """Public member count, role count and days active"""
+
+    # === Community content ===
+
+    @abstractmethod
+    async def get_user_game_profiles(self, user_id: int) -> list:
+        """Game profiles of a user, by game"""
+
+    @abstractmethod
+    async def upsert_user_game_profile(
+        self,
+        user_id: int,
+        game_name: str,
+        character_name: str,
+        server: str = None,
+        role_class: str = None,
+    ) -> dict:
+        """Create or replace a user's profile for one game"""
+
+    @abstractmethod
+    async def delete_user_game_profile(self, profile_id: int, user_id: int) -> bool:
+        """Delete one of a user's game profiles"""
+
+    @abstractmethod
+    async def add_news_post(
+        self,
+        title: str,
+        content: str,
+        discord_message_id: str = None,
+        author_id: int = None,
+        author_name: str = None,
+    ) -> int:
+        """Store a news post; returns its id"""
+
+    @abstractmethod
+    async def get_news_posts(self, limit: int = 20) -> list:
+        """Newest news posts first"""
+
+    @abstractmethod
+    async def get_clan_achievements(self, game_name: str = None) -> list:
+        """Clan achievements, optionally for one game"""
+
+    @abstractmethod
+    async def add_clan_achievement(
+        self,
+        game_name: str,
+        title: str,
+        description: str = None,
+        achieved_at: str = None,
+        created_by: int = None,
+    ) -> int:
+        """Store a clan achievement; returns its id"""
+
+    @abstractmethod
+    async def update_clan_achievement(
+        self,
+        achievement_id: int,
+        game_name: str,
+        title: str,
+        description: str = None,
+        achieved_at: str = None,
+    ) -> bool:
+        """Replace a clan achievement"""
+
+    @abstractmethod
+    async def delete_clan_achievement(self, achievement_id: int) -> bool:
+        """Delete a clan achievement"""
+
+    # === Scheduled messages ===
+
+    @abstractmethod
+    async def add_scheduled_message(
+        self,
+        guild_id: int,
+        name: str,
+        channel_id: int,
+        message: str,
+        interval_days: int,
+        interval_hours: int,
+        interval_minutes: int,
+        role_ids: List[int],
+        next_run: datetime,
+        embed_title: str = None,
+        embed_color: int = 3447003
+    ) -> int:
+        """Add a new scheduled message; returns its id"""
+
+    @abstractmethod
+    async def get_scheduled_messages(self, guild_id: int) -> List[Dict[str, Any]]:
+        """All scheduled messages of a guild, next run first"""
+
+    @abstractmethod
+    async def get_messages_to_send(self) -> List[Dict[str, Any]]:
+        """Active messages whose next run has passed"""
+
+    @abstractmethod
+    async def update_scheduled_message_next_run(self, message_id: int):
+        """Advance a message's next run by its interval and record the send"""
+
+    @abstractmethod
+    async def remove_scheduled_message(self, message_id: int, guild_id: int) -> bool:
+        """Remove a scheduled message"""
+
+    @abstractmethod
+    async def toggle_scheduled_message(self, message_id: int, guild_id: int) -> Optional[bool]:
+        """Flip a message between active and paused; None if not found"""
+
+    @abstractmethod
+    async def update_scheduled_message(
+        self,
+        message_id: int,
+        guild_id: int,
+        name: Optional[str] = None,
+        channel_id: Optional[int] = None,
+        message: Optional[str] = None,
+        interval_days: Optional[int] = None,
+        interval_hours: Optional[int] = None,
+        interval_minutes: Optional[int] = None,
+        role_ids: Optional[List[int]] = None,
+        next_run: Optional[datetime] = None
+    ) -> bool:
+        """Update the given fields of a scheduled message"""
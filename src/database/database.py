@@ -1,30 +1,465 @@
 import aiosqlite
+import json
 import logging
-from datetime import datetime, timedelta
+import os
+import time
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import discord
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
+
+from .archive import ARCHIVE_TABLES, ArchiveManager
+from .backend import LAST_SEEN_RESOLUTION_SECONDS, TrackingBackend
+from .instrumentation import instrumented
+from .pool import ConnectionPool, StorageProfile
+from .retention import ProgressCallback, RetentionEngine, RetentionPolicy, policies_for, policies_from_env
+from .slow_queries import SlowQueryLog
+from .timestamps import EPOCH_MS_SQL, from_epoch_ms, to_epoch_ms
+from .write_queue import Statement, WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
-class Database:
+UPSERT_ROLE_SQL = """
+    INSERT INTO roles 
+    (role_id, guild_id, name, color, position, permissions, is_hoisted, is_mentionable, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (role_id) DO UPDATE SET
+        guild_id = excluded.guild_id,
+        name = excluded.name,
+        color = excluded.color,
+        position = excluded.position,
+        permissions = excluded.permissions,
+        is_hoisted = excluded.is_hoisted,
+        is_mentionable = excluded.is_mentionable,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (roles.guild_id, roles.name, roles.color, roles.position, roles.permissions,
+           roles.is_hoisted, roles.is_mentionable)
+          IS NOT (excluded.guild_id, excluded.name, excluded.color, excluded.position, excluded.permissions,
+                  excluded.is_hoisted, excluded.is_mentionable)
+"""
+
+# Columns of a stored role, in _role_row order, for hydrating the role cache
+ROLE_CACHE_SQL = """
+    SELECT role_id, guild_id, name, color, position, permissions, is_hoisted, is_mentionable FROM roles
+"""
+
+# Upserts update in place (first_seen and the row id survive) and only when a
+# column actually changed
+UPSERT_USER_SQL = f"""
+    INSERT INTO users 
+    (user_id, username, discriminator, display_name, avatar_url, created_at, last_seen, is_bot)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = excluded.username,
+        discriminator = excluded.discriminator,
+        display_name = excluded.display_name,
+        avatar_url = excluded.avatar_url,
+        created_at = excluded.created_at,
+        last_seen = excluded.last_seen,
+        is_bot = excluded.is_bot
+    WHERE (users.username, users.discriminator, users.display_name, users.avatar_url,
+           users.created_at, users.is_bot)
+          IS NOT (excluded.username, excluded.discriminator, excluded.display_name, excluded.avatar_url,
+                  excluded.created_at, excluded.is_bot)
+       OR users.last_seen IS NULL
+       OR julianday(excluded.last_seen) - julianday(users.last_seen) > {LAST_SEEN_RESOLUTION_SECONDS} / 86400.0
+"""
+
+UPSERT_MEMBER_SQL = """
+    INSERT INTO guild_members 
+    (guild_id, user_id, joined_at, nickname, is_active)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET
+        joined_at = excluded.joined_at,
+        nickname = excluded.nickname,
+        is_active = excluded.is_active
+    WHERE (guild_members.joined_at, guild_members.nickname, guild_members.is_active)
+          IS NOT (excluded.joined_at, excluded.nickname, excluded.is_active)
+"""
+
+# Only for roles with no history at all; idx_role_changes_initial turns a
+# concurrent duplicate into a no-op
+INSERT_INITIAL_ROLE_SQL = """
+    INSERT OR IGNORE INTO role_changes (guild_id, user_id, role_id, action, changed_at, ts)
+    SELECT ?1, ?2, ?3, 'initial', ?4, ?5
+    WHERE NOT EXISTS (
+        SELECT 1 FROM role_changes WHERE user_id = ?2 AND guild_id = ?1 AND role_id = ?3
+    )
+"""
+
+# Keeps the oldest 'initial' row per member and role
+DELETE_DUPLICATE_INITIAL_ROLES_SQL = """
+    DELETE FROM role_changes WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY guild_id, user_id, role_id ORDER BY changed_at, id
+            ) AS position
+            FROM role_changes
+            WHERE action = 'initial'
+        )
+        WHERE position > 1
+    )
+"""
+
+GRANT_MEMBER_ROLE_SQL = """
+    INSERT OR IGNORE INTO member_roles (guild_id, user_id, role_id, since)
+    VALUES (?, ?, ?, ?)
+"""
+
+REVOKE_MEMBER_ROLE_SQL = """
+    DELETE FROM member_roles WHERE guild_id = ? AND user_id = ? AND role_id = ?
+"""
+
+# Everything stored about one user, in export order; role names come from roles.
+# Archived tables are read from each archive partition ({schema}) and then main.
+USER_EXPORT_QUERIES = [
+    ('users', """
+        SELECT user_id, username, discriminator, display_name, avatar_url, created_at, last_seen, is_bot
+        FROM users WHERE user_id = ?
+    """),
+    ('guild_members', """
+        SELECT guild_id, joined_at, nickname, is_active
+        FROM guild_members WHERE user_id = ?
+    """),
+    ('member_roles', """
+        SELECT mr.guild_id, mr.role_id, r.name AS role_name, mr.since
+        FROM member_roles mr
+        LEFT JOIN roles r ON r.role_id = mr.role_id
+        WHERE mr.user_id = ?
+    """),
+    ('username_changes', """
+        SELECT old_username, new_username, ts
+        FROM {schema}.username_changes WHERE user_id = ?
+        ORDER BY ts, id
+    """),
+    ('nickname_changes', """
+        SELECT guild_id, old_nickname, new_nickname, ts
+        FROM {schema}.nickname_changes WHERE user_id = ?
+        ORDER BY ts, id
+    """),
+    ('role_changes', """
+        SELECT rc.guild_id, rc.role_id, r.name AS role_name, rc.action, rc.ts
+        FROM {schema}.role_changes rc
+        LEFT JOIN main.roles r ON r.role_id = rc.role_id
+        WHERE rc.user_id = ?
+        ORDER BY rc.ts, rc.id
+    """),
+    ('join_leave_events', """
+        SELECT guild_id, event_type, ts
+        FROM {schema}.join_leave_events WHERE user_id = ?
+        ORDER BY ts, id
+    """),
+    ('events', """
+        SELECT type, guild_id, payload, ts
+        FROM {schema}.events WHERE user_id = ?
+        ORDER BY ts, id
+    """),
+]
+
+EXPORT_FETCH_SIZE = 500
+
+# Community score: days_active * 2 + role_count * 50 + role_changes * 5
+LEADERBOARD_SCORE_SQL = "days_active * 2 + role_count * 50 + role_changes * 5"
+
+LEADERBOARD_DAYS_SQL = "COALESCE(CAST((julianday('now') - julianday(active_since)) AS INTEGER), 0)"
+
+# Recompute one member's score row from scratch (params: guild_id, user_id)
+REFRESH_MEMBER_SCORE_SQL = f"""
+    INSERT OR REPLACE INTO leaderboard_scores
+    (guild_id, user_id, active_since, days_active, role_count, role_changes, score, is_active, updated_at)
+    SELECT guild_id, user_id, active_since, days_active, role_count, role_changes,
+           {LEADERBOARD_SCORE_SQL}, is_active, CURRENT_TIMESTAMP
+    FROM (
+        SELECT guild_id, user_id, active_since, {LEADERBOARD_DAYS_SQL} AS days_active,
+               role_count, role_changes, is_active
+        FROM (
+            SELECT
+                gm.guild_id,
+                gm.user_id,
+                COALESCE(gm.joined_at, u.first_seen) AS active_since,
+                (
+                    SELECT COUNT(*) FROM member_roles mr
+                    WHERE mr.guild_id = gm.guild_id AND mr.user_id = gm.user_id
+                ) AS role_count,
+                (
+                    SELECT COUNT(*) FROM role_changes rc
+                    WHERE rc.user_id = gm.user_id AND rc.guild_id = gm.guild_id
+                ) + (
+                    SELECT COALESCE(SUM(ac.rows), 0) FROM archived_user_counts ac
+                    WHERE ac.user_id = gm.user_id AND ac.guild_id = gm.guild_id
+                      AND ac.table_name = 'role_changes'
+                ) AS role_changes,
+                gm.is_active
+            FROM guild_members gm
+            INNER JOIN users u ON u.user_id = gm.user_id
+            WHERE gm.guild_id = ? AND gm.user_id = ?
+        )
+    )
+"""
+
+# Apply a role event to a member's score row
+# (params: role change delta, guild_id, user_id, guild_id, user_id)
+BUMP_MEMBER_SCORE_SQL = """
+    UPDATE leaderboard_scores
+    SET role_changes = role_changes + ?,
+        role_count = (SELECT COUNT(*) FROM member_roles WHERE guild_id = ? AND user_id = ?),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE guild_id = ? AND user_id = ?
+"""
+
+RESCORE_MEMBER_SQL = f"""
+    UPDATE leaderboard_scores SET score = {LEADERBOARD_SCORE_SQL}
+    WHERE guild_id = ? AND user_id = ?
+"""
+
+# Unified event log (params: type, guild_id, user_id, payload JSON, ts in epoch ms)
+INSERT_EVENT_SQL = """
+    INSERT INTO events (type, guild_id, user_id, payload, ts)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Username changes are global; log one event per guild the user belongs to
+# (params: payload JSON, ts, user_id)
+INSERT_USER_EVENT_SQL = """
+    INSERT INTO events (type, guild_id, user_id, payload, ts)
+    SELECT 'username', guild_id, user_id, ?, ? FROM guild_members WHERE user_id = ?
+"""
+
+# Row counts kept in table_counters by triggers, and the queries that recount them
+TABLE_COUNTERS = {
+    'user_count': "SELECT COUNT(*) FROM users",
+    'username_changes': "SELECT COUNT(*) FROM username_changes",
+    'nickname_changes': "SELECT COUNT(*) FROM nickname_changes",
+    'role_changes': "SELECT COUNT(*) FROM role_changes WHERE action != 'initial'",
+    'join_leave_events': "SELECT COUNT(*) FROM join_leave_events",
+}
+
+# Text timestamp column of each history table; migration 10 mirrored them into
+# an integer ts column (epoch milliseconds), which is what every query now uses
+HISTORY_TIME_COLUMNS = {
+    'username_changes': 'changed_at',
+    'nickname_changes': 'changed_at',
+    'role_changes': 'changed_at',
+    'join_leave_events': 'timestamp',
+}
+
+HISTORY_TS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_username_changes_user_ts ON username_changes (user_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_nickname_changes_guild_ts ON nickname_changes (guild_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_role_changes_guild_ts ON role_changes (guild_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_join_leave_events_guild_ts ON join_leave_events (guild_id, ts)",
+]
+
+# Per-member role history lookups (user_id = ? AND guild_id = ?, newest first).
+# With user_id alone, SQLite without ANALYZE statistics may pick
+# idx_role_changes_guild_ts instead and scan the guild's whole history per member.
+ROLE_CHANGES_MEMBER_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_role_changes_member_ts ON role_changes (user_id, guild_id, ts)"
+)
+
+# Ordered schema migrations: (version, description, Database method). Each one is
+# applied once and recorded in schema_version; append new entries, never renumber.
+MIGRATIONS = [
+    (1, "Split roles out of role_changes", '_migration_roles_table'),
+    (2, "Add embed columns to scheduled_messages", '_migration_scheduled_embeds'),
+    (3, "Backfill member_roles", '_migration_member_roles'),
+    (4, "Build user search documents", '_migration_search_docs'),
+    (5, "Backfill the event log", '_migration_events'),
+    (6, "Backfill daily activity rollups", '_migration_daily_activity'),
+    (7, "Seed table counters", '_migration_table_counters'),
+    (8, "Build leaderboard scores", '_migration_leaderboard'),
+    (9, "Make initial role entries unique", '_migration_unique_initial_roles'),
+    (10, "Add epoch-millisecond timestamps to history tables", '_migration_epoch_timestamps'),
+    (11, "Index role history by member, guild and time", '_migration_role_changes_member_index'),
+]
+
+SCHEDULED_MESSAGES_SQL = """
+    SELECT id, guild_id, name, channel_id, message, role_ids,
+           interval_days, interval_hours, interval_minutes,
+           next_run, is_active, created_at, last_sent,
+           embed_title, embed_color
+    FROM scheduled_messages
+    WHERE guild_id = ?
+    ORDER BY next_run ASC
+"""
+
+# Fallback for old schema
+SCHEDULED_MESSAGES_LEGACY_SQL = """
+    SELECT id, guild_id, name, channel_id, message, role_ids,
+           interval_days, interval_hours, interval_minutes,
+           next_run, is_active, created_at, last_sent
+    FROM scheduled_messages
+    WHERE guild_id = ?
+    ORDER BY next_run ASC
+"""
+
+DUE_MESSAGES_SQL = """
+    SELECT id, guild_id, name, channel_id, message, role_ids,
+           interval_days, interval_hours, interval_minutes,
+           next_run, is_active, embed_title, embed_color
+    FROM scheduled_messages
+    WHERE is_active = 1 AND next_run <= ?
+    ORDER BY next_run ASC
+"""
+
+# Fallback for old schema
+DUE_MESSAGES_LEGACY_SQL = """
+    SELECT id, guild_id, name, channel_id, message, role_ids,
+           interval_days, interval_hours, interval_minutes,
+           next_run, is_active
+    FROM scheduled_messages
+    WHERE is_active = 1 AND next_run <= ?
+    ORDER BY next_run ASC
+"""
+
+# Event types shown as "recent changes"
+CHANGE_EVENT_TYPES = ('username', 'nickname', 'role')
+
+# Rebuild one member's search document from users, guild_members and member_roles
+# (params: guild_id, user_id). Unchanged documents are left alone so the FTS index
+# is not rewritten on every event.
+_SEARCH_DOC_SQL = """
+    INSERT INTO user_search_docs (guild_id, user_id, username, display_name, nickname, role_names)
+    SELECT
+        gm.guild_id,
+        gm.user_id,
+        u.username,
+        u.display_name,
+        gm.nickname,
+        (
+            SELECT group_concat(r.name, ' ')
+            FROM member_roles mr
+            INNER JOIN roles r ON r.role_id = mr.role_id
+            WHERE mr.guild_id = gm.guild_id AND mr.user_id = gm.user_id
+        )
+    FROM guild_members gm
+    INNER JOIN users u ON u.user_id = gm.user_id
+    WHERE {where}
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET
+        username = excluded.username,
+        display_name = excluded.display_name,
+        nickname = excluded.nickname,
+        role_names = excluded.role_names
+    WHERE (username, display_name, nickname, role_names)
+        IS NOT (excluded.username, excluded.display_name, excluded.nickname, excluded.role_names)
+"""
+
+REFRESH_SEARCH_DOC_SQL = _SEARCH_DOC_SQL.format(where="gm.guild_id = ? AND gm.user_id = ?")
+
+# Every member holding a role, after the role is renamed
+REFRESH_ROLE_SEARCH_DOCS_SQL = _SEARCH_DOC_SQL.format(where="""
+    gm.guild_id = ?1
+    AND gm.user_id IN (SELECT user_id FROM member_roles WHERE guild_id = ?1 AND role_id = ?2)
+""")
+
+@instrumented
+class Database(TrackingBackend):
     """Database handler for tracking user activities"""
     
-    def __init__(self, db_path: str):
+    upsert_role_sql = UPSERT_ROLE_SQL
+    upsert_user_sql = UPSERT_USER_SQL
+    upsert_member_sql = UPSERT_MEMBER_SQL
+    
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: Optional[int] = None,
+        storage: Optional[StorageProfile] = None,
+        read_only: Optional[bool] = None,
+        archive_dir: Optional[Path] = None,
+    ):
+        super().__init__()
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if pool_size is None:
+            pool_size = int(os.getenv('DATABASE_POOL_SIZE', '4'))
+        if read_only is None:
+            read_only = os.getenv('DATABASE_READ_ONLY', 'false').lower() == 'true'
+        self.read_only = read_only
+        self.slow_queries = SlowQueryLog.from_env()
+        self.pool = ConnectionPool(
+            self.db_path,
+            readers=pool_size,
+            storage=storage or StorageProfile.from_env(),
+            read_only=read_only,
+            slow_queries=self.slow_queries,
+        )
+        self.write_queue = WriteBehindQueue(
+            self.pool,
+            max_size=int(os.getenv('DATABASE_WRITE_QUEUE_SIZE', '10000')),
+            flush_interval=int(os.getenv('DATABASE_FLUSH_INTERVAL_MS', '50')) / 1000,
+            max_batch=int(os.getenv('DATABASE_FLUSH_MAX_BATCH', '500')),
+            dead_letter_path=Path(os.getenv('DATABASE_DEAD_LETTER_PATH') or self.db_path.parent / 'dead_letter.jsonl'),
+            on_failure=self._forget_statements,
+        )
+        self.retention = RetentionEngine(
+            self.pool,
+            batch_size=int(os.getenv('RETENTION_BATCH_SIZE', '5000')),
+        )
+        self.archive = ArchiveManager(
+            self.pool,
+            Path(archive_dir or os.getenv('ARCHIVE_DIR') or self.db_path.parent / 'archive'),
+            batch_size=int(os.getenv('ARCHIVE_BATCH_SIZE', '5000')),
+        )
+        # Resolved once by initialize(): whether the user_search FTS index exists
+        # (False when this SQLite build lacks FTS5 or the trigram tokenizer) and
+        # which scheduled message statements match the table's columns
+        self.search_fts = False
+        self._scheduled_messages_sql = SCHEDULED_MESSAGES_SQL
+        self._due_messages_sql = DUE_MESSAGES_SQL
     
     async def initialize(self):
-        """Initialize the database and create tables"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await self._create_tables(db)
-            await self._migrate_database(db)
-            await db.commit()
+        """Open the connection pool and create tables (skipped for read-only handles)"""
+        await self.pool.open()
+        try:
+            if self.read_only:
+                async with self.reader() as db:
+                    await self._load_schema(db)
+                    await self._load_role_cache(db)
+                logger.info("Database opened read-only; schema is managed by the writing process")
+                return
+            async with self.writer() as db:
+                await self._create_tables(db)
+                await self._migrate_database(db)
+                await self._create_search_index(db)
+                await self._load_schema(db)
+                await self._load_role_cache(db)
+                await db.commit()
+        except BaseException:
+            # Close the pool's connection threads, or a failed start hangs at interpreter exit
+            await self.pool.close()
+            raise
+        self.write_queue.start()
         logger.info("Database initialized successfully")
     
+    def writer(self):
+        """Borrow the pooled writer connection (``async with db.writer() as conn``)"""
+        return self.pool.writer()
+    
+    def reader(self):
+        """Borrow a pooled read connection (``async with db.reader() as conn``)"""
+        return self.pool.reader()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool size and acquire wait-time metrics"""
+        return self.pool.metrics()
+    
+    def get_slow_queries(self) -> Dict[str, Any]:
+        """Get the statements that exceeded DATABASE_SLOW_QUERY_MS, newest first, with their query plans"""
+        return self.slow_queries.snapshot()
+    
     async def _create_tables(self, db: aiosqlite.Connection):
         """Create all necessary tables"""
         
+        # Schema version - one row per applied migration
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
         # Users table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -62,6 +497,7 @@ class Database:
                 old_username TEXT NOT NULL,
                 new_username TEXT NOT NULL,
                 changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ts INTEGER, -- epoch milliseconds
                 FOREIGN KEY (user_id) REFERENCES users (user_id)
             )
         """)
@@ -75,6 +511,7 @@ class Database:
                 old_nickname TEXT,
                 new_nickname TEXT,
                 changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ts INTEGER, -- epoch milliseconds
                 FOREIGN KEY (user_id) REFERENCES users (user_id)
             )
         """)
@@ -104,11 +541,23 @@ class Database:
                 role_id INTEGER NOT NULL,
                 action TEXT NOT NULL, -- 'added', 'removed', or 'initial'
                 changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ts INTEGER, -- epoch milliseconds
                 FOREIGN KEY (user_id) REFERENCES users (user_id),
                 FOREIGN KEY (role_id) REFERENCES roles (role_id)
             )
         """)
         
+        # Member roles table - current role state, maintained alongside role_changes
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS member_roles (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                role_id INTEGER NOT NULL,
+                since TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, user_id, role_id)
+            )
+        """)
+        
         # Join/Leave events table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS join_leave_events (
@@ -117,6 +566,7 @@ class Database:
                 user_id INTEGER NOT NULL,
                 event_type TEXT NOT NULL, -- 'join' or 'leave'
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ts INTEGER, -- epoch milliseconds
                 FOREIGN KEY (user_id) REFERENCES users (user_id)
             )
         """)
@@ -143,15 +593,137 @@ class Database:
             )
         """)
         
+        # Inventory fingerprints - lets reconnects skip members that did not change
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS member_fingerprints (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        """)
+        
+        # Leaderboard scores - precomputed community score per member
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS leaderboard_scores (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                active_since TIMESTAMP,
+                days_active INTEGER NOT NULL DEFAULT 0,
+                role_count INTEGER NOT NULL DEFAULT 0,
+                role_changes INTEGER NOT NULL DEFAULT 0,
+                score INTEGER NOT NULL DEFAULT 0,
+                is_active BOOLEAN DEFAULT TRUE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        """)
+        
+        # User search documents - one row per guild member, indexed by the user_search FTS table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS user_search_docs (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                username TEXT,
+                display_name TEXT,
+                nickname TEXT,
+                role_names TEXT,
+                UNIQUE(guild_id, user_id)
+            )
+        """)
+        
+        # Events table - append-only log of every tracked change, newest first per guild
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL, -- 'username', 'nickname', 'role', 'join' or 'leave'
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                payload TEXT, -- JSON
+                ts INTEGER NOT NULL -- Unix epoch milliseconds
+            )
+        """)
+        
+        # Daily activity rollups - per-guild counters per UTC day, fed by the event log
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS daily_activity (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL, -- YYYY-MM-DD (UTC)
+                joins INTEGER NOT NULL DEFAULT 0,
+                leaves INTEGER NOT NULL DEFAULT 0,
+                username_changes INTEGER NOT NULL DEFAULT 0,
+                nickname_changes INTEGER NOT NULL DEFAULT 0,
+                role_changes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, day)
+            ) WITHOUT ROWID
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS events_daily_activity AFTER INSERT ON events BEGIN
+                INSERT INTO daily_activity
+                (guild_id, day, joins, leaves, username_changes, nickname_changes, role_changes)
+                VALUES (
+                    new.guild_id,
+                    date(new.ts / 1000, 'unixepoch'),
+                    new.type = 'join',
+                    new.type = 'leave',
+                    new.type = 'username',
+                    new.type = 'nickname',
+                    new.type = 'role'
+                )
+                ON CONFLICT (guild_id, day) DO UPDATE SET
+                    joins = joins + excluded.joins,
+                    leaves = leaves + excluded.leaves,
+                    username_changes = username_changes + excluded.username_changes,
+                    nickname_changes = nickname_changes + excluded.nickname_changes,
+                    role_changes = role_changes + excluded.role_changes;
+            END
+        """)
+        
+        # Table counters - row counts maintained by triggers so stats never scan history
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS table_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        await self._create_counter_triggers(db)
+        
+        # Archive manifest - rows moved into each monthly archive file, per table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS archive_partitions (
+                month TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                rows INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (month, table_name)
+            ) WITHOUT ROWID
+        """)
+        
+        # Archived row counts per member, so stats and scores still include archived history
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS archived_user_counts (
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL, -- 0 for username_changes
+                table_name TEXT NOT NULL,
+                rows INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, guild_id, table_name)
+            ) WITHOUT ROWID
+        """)
+        
         # Create indexes for better performance
         await db.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_guild_members_guild ON guild_members (guild_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_username_changes_user ON username_changes (user_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_guild_members_user ON guild_members (user_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_nickname_changes_user ON nickname_changes (user_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_role_changes_user ON role_changes (user_id)")
+        # idx_role_changes_member_ts needs role_changes.ts, so migration 11 creates it
         await db.execute("CREATE INDEX IF NOT EXISTS idx_role_changes_role ON role_changes (role_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_roles_guild ON roles (guild_id)")
-        await db.execute("CREATE INDEX IF NOT EXISTS idx_join_leave_events_guild ON join_leave_events (guild_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_member_roles_role ON member_roles (guild_id, role_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_leaderboard_scores_rank ON leaderboard_scores (guild_id, is_active, score DESC)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_user_search_docs_user ON user_search_docs (user_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_events_guild_ts ON events (guild_id, ts)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_messages_guild ON scheduled_messages (guild_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_messages_next_run ON scheduled_messages (next_run)")
 
@@ -200,8 +772,22 @@ class Database:
         await db.execute("CREATE INDEX IF NOT EXISTS idx_achievements_game ON clan_achievements (game_name)")
 
     async def _migrate_database(self, db: aiosqlite.Connection):
-        """Handle database migrations"""
-        
+        """Apply pending migrations in order, recording each one in schema_version"""
+        cursor = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = (await cursor.fetchone())[0]
+        pending = [m for m in MIGRATIONS if m[0] > current]
+        for version, name, method in pending:
+            logger.info(f"Applying migration {version}: {name}")
+            await getattr(self, method)(db)
+            await db.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+        if pending:
+            logger.info(f"Database migrated to schema version {pending[-1][0]}")
+    
+    async def _migration_roles_table(self, db: aiosqlite.Connection):
+        """Split role names and colors out of role_changes into a roles table"""
         # Check if roles table exists
         cursor = await db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='roles'")
         roles_table_exists = await cursor.fetchone()
@@ -268,9 +854,13 @@ class Database:
             await db.execute("CREATE INDEX IF NOT EXISTS idx_role_changes_role ON role_changes (role_id)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_roles_guild ON roles (guild_id)")
             
+            # Dropping the old table dropped its counter triggers
+            await self._create_counter_triggers(db)
+            
             logger.info("Migration completed: roles table created and data migrated")
-        
-        # Migration: Add embed columns to scheduled_messages table
+    
+    async def _migration_scheduled_embeds(self, db: aiosqlite.Connection):
+        """Add embed title and color columns to scheduled_messages"""
         cursor = await db.execute("PRAGMA table_info(scheduled_messages)")
         columns = await cursor.fetchall()
         column_names = [col[1] for col in columns]
@@ -292,90 +882,382 @@ class Database:
             # Set default blue color for existing messages
             await db.execute("UPDATE scheduled_messages SET embed_color = 3447003 WHERE embed_color IS NULL")
             logger.info("Added embed_color column")
-            
-        logger.info("Database migration completed successfully")
+    
+    async def _migration_member_roles(self, db: aiosqlite.Connection):
+        """Backfill current role state from the role_changes history"""
+        # Latest row by id, since changed_at mixes several string formats
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM member_roles)")
+        if not (await cursor.fetchone())[0]:
+            cursor = await db.execute("""
+                INSERT OR IGNORE INTO member_roles (guild_id, user_id, role_id, since)
+                SELECT rc.guild_id, rc.user_id, rc.role_id, rc.changed_at
+                FROM role_changes rc
+                INNER JOIN (
+                    SELECT MAX(id) AS latest_id
+                    FROM role_changes
+                    GROUP BY guild_id, user_id, role_id
+                ) latest ON rc.id = latest.latest_id
+                WHERE rc.action IN ('added', 'initial')
+            """)
+            if cursor.rowcount:
+                logger.info(f"Backfilled {cursor.rowcount} current member roles from role history")
+    
+    async def _migration_search_docs(self, db: aiosqlite.Connection):
+        """Build search documents for existing members"""
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM user_search_docs)")
+        if not (await cursor.fetchone())[0]:
+            cursor = await db.execute("""
+                INSERT INTO user_search_docs (guild_id, user_id, username, display_name, nickname, role_names)
+                SELECT
+                    gm.guild_id,
+                    gm.user_id,
+                    u.username,
+                    u.display_name,
+                    gm.nickname,
+                    (
+                        SELECT group_concat(r.name, ' ')
+                        FROM member_roles mr
+                        INNER JOIN roles r ON r.role_id = mr.role_id
+                        WHERE mr.guild_id = gm.guild_id AND mr.user_id = gm.user_id
+                    )
+                FROM guild_members gm
+                INNER JOIN users u ON u.user_id = gm.user_id
+            """)
+            if cursor.rowcount:
+                logger.info(f"Built search documents for {cursor.rowcount} members")
+    
+    async def _migration_events(self, db: aiosqlite.Connection):
+        """Backfill the event log from the per-type tables"""
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM events)")
+        if not (await cursor.fetchone())[0]:
+            epoch_ms = EPOCH_MS_SQL
+            cursor = await db.execute(f"""
+                INSERT INTO events (type, guild_id, user_id, payload, ts)
+                SELECT type, guild_id, user_id, payload, ts FROM (
+                    SELECT 'username' AS type, gm.guild_id, uc.user_id,
+                           json_object('old', uc.old_username, 'new', uc.new_username) AS payload,
+                           {epoch_ms.format('uc.changed_at')} AS ts
+                    FROM username_changes uc
+                    INNER JOIN guild_members gm ON gm.user_id = uc.user_id
+                    UNION ALL
+                    SELECT 'nickname', guild_id, user_id,
+                           json_object('old', old_nickname, 'new', new_nickname),
+                           {epoch_ms.format('changed_at')}
+                    FROM nickname_changes
+                    UNION ALL
+                    SELECT 'role', guild_id, user_id,
+                           json_object('role_id', role_id, 'action', action),
+                           {epoch_ms.format('changed_at')}
+                    FROM role_changes WHERE action != 'initial'
+                    UNION ALL
+                    SELECT event_type, guild_id, user_id, NULL,
+                           {epoch_ms.format('timestamp')}
+                    FROM join_leave_events
+                )
+                WHERE ts IS NOT NULL
+                ORDER BY ts
+            """)
+            if cursor.rowcount:
+                logger.info(f"Backfilled {cursor.rowcount} events into the event log")
+    
+    async def _migration_daily_activity(self, db: aiosqlite.Connection):
+        """Build daily rollups for event logs that predate them"""
+        cursor = await db.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM daily_activity) AND EXISTS (SELECT 1 FROM events)"
+        )
+        if (await cursor.fetchone())[0]:
+            days = await self._backfill_daily_activity(db)
+            logger.info(f"Backfilled {days} days of activity rollups")
+    
+    async def _migration_table_counters(self, db: aiosqlite.Connection):
+        """Seed table counters"""
+        cursor = await db.execute("SELECT COUNT(*) FROM table_counters")
+        if (await cursor.fetchone())[0] < len(TABLE_COUNTERS):
+            await self._reconcile_table_counters(db)
+            logger.info("Seeded table counters")
+    
+    async def _migration_leaderboard(self, db: aiosqlite.Connection):
+        """Build leaderboard scores for existing members"""
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM leaderboard_scores)")
+        if not (await cursor.fetchone())[0]:
+            rebuilt = await self._rebuild_leaderboard(db)
+            if rebuilt:
+                logger.info(f"Built leaderboard scores for {rebuilt} members")
+    
+    async def _migration_unique_initial_roles(self, db: aiosqlite.Connection):
+        """Drop duplicate initial role entries, then index them as unique"""
+        cursor = await db.execute(DELETE_DUPLICATE_INITIAL_ROLES_SQL)
+        if cursor.rowcount:
+            logger.info(f"Removed {cursor.rowcount} duplicate initial role entries")
+            await self._rebuild_leaderboard(db)
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_role_changes_initial
+            ON role_changes (guild_id, user_id, role_id) WHERE action = 'initial'
+        """)
+    
+    async def _migration_epoch_timestamps(self, db: aiosqlite.Connection):
+        """Mirror history timestamps into indexed epoch-millisecond ts columns"""
+        for table, column in HISTORY_TIME_COLUMNS.items():
+            await self._add_epoch_ts(db, 'main', table, column)
+        for sql in HISTORY_TS_INDEXES:
+            await db.execute(sql)
+        # Both are prefixes of the new (…, ts) indexes
+        await db.execute("DROP INDEX IF EXISTS idx_username_changes_user")
+        await db.execute("DROP INDEX IF EXISTS idx_join_leave_events_guild")
+        
+        # Archive partitions written before this migration only have the text columns
+        cursor = await db.execute("SELECT DISTINCT month FROM archive_partitions ORDER BY month")
+        months = [row[0] for row in await cursor.fetchall() if self.archive.path_for(row[0]).exists()]
+        if months:
+            # ATTACH is not allowed inside a transaction
+            await db.commit()
+        for month in months:
+            async with self.archive.attached(db, month, read_only=False) as alias:
+                for table, column in HISTORY_TIME_COLUMNS.items():
+                    await self._add_epoch_ts(db, alias, table, column)
+                await db.commit()
+    
+    async def _add_epoch_ts(self, db: aiosqlite.Connection, schema: str, table: str, column: str):
+        """Add and fill ``table``.ts from its text timestamp column, if the table exists"""
+        cursor = await db.execute(f"PRAGMA {schema}.table_info({table})")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if not columns:
+            return
+        if 'ts' not in columns:
+            await db.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN ts INTEGER")
+        cursor = await db.execute(
+            f"UPDATE {schema}.{table} SET ts = {EPOCH_MS_SQL.format(column)} WHERE ts IS NULL"
+        )
+        if cursor.rowcount:
+            logger.info(f"Filled epoch timestamps for {cursor.rowcount} rows of {schema}.{table}")
+    
+    async def _migration_role_changes_member_index(self, db: aiosqlite.Connection):
+        """Replace the user_id index on role_changes with (user_id, guild_id, ts)"""
+        await db.execute(ROLE_CHANGES_MEMBER_INDEX_SQL)
+        await db.execute("DROP INDEX IF EXISTS idx_role_changes_user")
+    
+    async def _create_counter_triggers(self, db: aiosqlite.Connection):
+        """Triggers that keep table_counters in step with the counted tables"""
+        # users is upserted, and BEFORE INSERT fires even when the insert turns
+        # into an update; count there, while an existing row is still visible,
+        # and only when the user is new.
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS users_count_insert BEFORE INSERT ON users
+            WHEN NOT EXISTS (SELECT 1 FROM users WHERE user_id = new.user_id) BEGIN
+                UPDATE table_counters SET value = value + 1 WHERE name = 'user_count';
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS users_count_delete AFTER DELETE ON users BEGIN
+                UPDATE table_counters SET value = value - 1 WHERE name = 'user_count';
+            END
+        """)
+        for table, counter in (
+            ('username_changes', 'username_changes'),
+            ('nickname_changes', 'nickname_changes'),
+            ('join_leave_events', 'join_leave_events'),
+        ):
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN
+                    UPDATE table_counters SET value = value + 1 WHERE name = '{counter}';
+                END
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN
+                    UPDATE table_counters SET value = value - 1 WHERE name = '{counter}';
+                END
+            """)
+        # Initial role assignments are not counted as changes
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS role_changes_count_insert AFTER INSERT ON role_changes
+            WHEN new.action != 'initial' BEGIN
+                UPDATE table_counters SET value = value + 1 WHERE name = 'role_changes';
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS role_changes_count_delete AFTER DELETE ON role_changes
+            WHEN old.action != 'initial' BEGIN
+                UPDATE table_counters SET value = value - 1 WHERE name = 'role_changes';
+            END
+        """)
+    
+    async def _load_schema(self, db: aiosqlite.Connection):
+        """Resolve optional schema features once, so runtime queries need no PRAGMA round trips"""
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'user_search')")
+        self.search_fts = bool((await cursor.fetchone())[0])
+        cursor = await db.execute("PRAGMA table_info(scheduled_messages)")
+        column_names = {col[1] for col in await cursor.fetchall()}
+        if {'embed_title', 'embed_color'} <= column_names:
+            self._scheduled_messages_sql = SCHEDULED_MESSAGES_SQL
+            self._due_messages_sql = DUE_MESSAGES_SQL
+        else:
+            self._scheduled_messages_sql = SCHEDULED_MESSAGES_LEGACY_SQL
+            self._due_messages_sql = DUE_MESSAGES_LEGACY_SQL
+    
+    async def _load_role_cache(self, db: aiosqlite.Connection):
+        """Hydrate the role cache from the roles table"""
+        cursor = await db.execute(ROLE_CACHE_SQL)
+        # Booleans come back as 0/1; match the types _role_row produces
+        self.roles.load((*row[:6], bool(row[6]), bool(row[7])) for row in await cursor.fetchall())
+        logger.debug(f"Loaded {len(self.roles)} roles into the role cache")
+    
+    async def _create_search_index(self, db: aiosqlite.Connection) -> bool:
+        """Create the trigram FTS5 index over user_search_docs; False if unsupported"""
+        cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'user_search')")
+        existed = (await cursor.fetchone())[0]
+        try:
+            await db.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(
+                    username, display_name, nickname, role_names,
+                    content = 'user_search_docs',
+                    content_rowid = 'id',
+                    tokenize = 'trigram'
+                )
+            """)
+        except aiosqlite.OperationalError as e:
+            logger.warning(f"FTS5 trigram search unavailable ({e}); user search falls back to LIKE")
+            return False
+        
+        # Keep the external-content index in step with user_search_docs
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS user_search_docs_ai AFTER INSERT ON user_search_docs BEGIN
+                INSERT INTO user_search (rowid, username, display_name, nickname, role_names)
+                VALUES (new.id, new.username, new.display_name, new.nickname, new.role_names);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS user_search_docs_ad AFTER DELETE ON user_search_docs BEGIN
+                INSERT INTO user_search (user_search, rowid, username, display_name, nickname, role_names)
+                VALUES ('delete', old.id, old.username, old.display_name, old.nickname, old.role_names);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS user_search_docs_au AFTER UPDATE ON user_search_docs BEGIN
+                INSERT INTO user_search (user_search, rowid, username, display_name, nickname, role_names)
+                VALUES ('delete', old.id, old.username, old.display_name, old.nickname, old.role_names);
+                INSERT INTO user_search (rowid, username, display_name, nickname, role_names)
+                VALUES (new.id, new.username, new.display_name, new.nickname, new.role_names);
+            END
+        """)
+        if not existed:
+            await db.execute("INSERT INTO user_search (user_search) VALUES ('rebuild')")
+            logger.info("Built user_search full-text index")
+        return True
+    
+    # === Tracking writes ===
+    #
+    # The statement builders below return (sql, params) pairs. The direct
+    # upsert_* methods run them on the writer immediately; the log_* event
+    # methods hand them to the write-behind queue as one atomic operation.
+    
+    def _event_statement(
+        self,
+        event_type: str,
+        guild_id: int,
+        user_id: int,
+        payload: Optional[dict] = None,
+        ts: Optional[int] = None,
+    ) -> Statement:
+        return (INSERT_EVENT_SQL, (
+            event_type,
+            guild_id,
+            user_id,
+            json.dumps(payload) if payload is not None else None,
+            ts if ts is not None else to_epoch_ms()
+        ))
+    
+    def _search_statements(self, guild_id: int, user_id: int) -> List[Statement]:
+        return [(REFRESH_SEARCH_DOC_SQL, (guild_id, user_id))]
+    
+    def _score_bump_statements(self, guild_id: int, user_id: int, role_changes: int) -> List[Statement]:
+        return [
+            (BUMP_MEMBER_SCORE_SQL, (role_changes, guild_id, user_id, guild_id, user_id)),
+            (RESCORE_MEMBER_SQL, (guild_id, user_id)),
+        ]
+    
+    async def _execute_now(self, statements: List[Statement]):
+        """Run statements in one transaction on the writer, bypassing the queue"""
+        try:
+            async with self.writer() as db:
+                for sql, params in statements:
+                    await db.execute(sql, params)
+                await db.commit()
+        except Exception:
+            self._forget_statements(statements)
+            raise
+    
+    async def _enqueue(self, statements: List[Statement]):
+        """Hand an operation to the write-behind queue"""
+        await self.write_queue.submit(statements)
+    
+    async def flush(self):
+        """Wait until all queued tracking writes are committed"""
+        await self.write_queue.flush()
+    
+    def get_write_queue_stats(self) -> Dict[str, Any]:
+        """Get write-behind queue depth and batch size counters"""
+        return self.write_queue.metrics.snapshot(self.write_queue.depth)
     
     async def upsert_role(self, role: discord.Role):
         """Insert or update role information"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO roles 
-                (role_id, guild_id, name, color, position, permissions, is_hoisted, is_mentionable, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                role.id,
-                role.guild.id,
-                role.name,
-                role.color.value,
-                role.position,
-                str(role.permissions.value),
-                role.hoist,
-                role.mentionable
-            ))
-            await db.commit()
-
+        statements = self._role_statements(role)
+        if statements:
+            await self._execute_now(statements)
+    
+    async def log_role_update(self, role: discord.Role):
+        """Store a created or edited role; a rename also refreshes its holders' search documents"""
+        renamed = self.roles.name(role.id) not in (None, role.name)
+        statements = self._role_statements(role)
+        if renamed:
+            statements.append((REFRESH_ROLE_SEARCH_DOCS_SQL, (role.guild.id, role.id)))
+        if statements:
+            await self._enqueue(statements)
+    
     async def upsert_user(self, user: discord.User | discord.Member):
         """Insert or update user information"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO users 
-                (user_id, username, discriminator, display_name, avatar_url, created_at, last_seen, is_bot)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user.id,
-                user.name,
-                user.discriminator if hasattr(user, 'discriminator') else None,
-                user.display_name,
-                str(user.display_avatar.url) if user.display_avatar else None,
-                user.created_at,
-                datetime.utcnow(),
-                user.bot
-            ))
-            await db.commit()
+        await self._execute_now(self._user_statements(user))
     
     async def upsert_guild_member(self, member: discord.Member):
         """Insert or update guild member information"""
-        await self.upsert_user(member)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO guild_members 
-                (guild_id, user_id, joined_at, nickname, is_active)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                member.guild.id,
-                member.id,
-                member.joined_at,
-                member.nick,
-                True
-            ))
-            await db.commit()
+        await self._execute_now(
+            self._member_statements(member) + self._search_statements(member.guild.id, member.id)
+        )
     
     async def log_username_change(self, before: discord.User, after: discord.User):
         """Log a username change"""
-        await self.upsert_user(after)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO username_changes (user_id, old_username, new_username)
-                VALUES (?, ?, ?)
-            """, (after.id, before.name, after.name))
-            await db.commit()
+        ts = to_epoch_ms()
+        await self._enqueue(self._user_statements(after) + [
+            ("""
+                INSERT INTO username_changes (user_id, old_username, new_username, ts)
+                VALUES (?, ?, ?, ?)
+            """, (after.id, before.name, after.name, ts)),
+            (INSERT_USER_EVENT_SQL, (
+                json.dumps({'old': before.name, 'new': after.name}),
+                ts,
+                after.id
+            )),
+            # Update the search documents of every guild the user is in
+            ("""
+                UPDATE user_search_docs SET username = ?, display_name = ?
+                WHERE user_id = ? AND (username, display_name) IS NOT (?, ?)
+            """, (after.name, after.display_name, after.id, after.name, after.display_name)),
+        ])
     
     async def log_nickname_change(self, before: discord.Member, after: discord.Member):
         """Log a nickname change"""
-        await self.upsert_guild_member(after)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO nickname_changes (guild_id, user_id, old_nickname, new_nickname)
-                VALUES (?, ?, ?, ?)
-            """, (after.guild.id, after.id, before.nick, after.nick))
-            await db.commit()
+        ts = to_epoch_ms()
+        statements = self._member_statements(after) + [("""
+            INSERT INTO nickname_changes (guild_id, user_id, old_nickname, new_nickname, ts)
+            VALUES (?, ?, ?, ?, ?)
+        """, (after.guild.id, after.id, before.nick, after.nick, ts))]
+        statements.append(self._event_statement(
+            'nickname', after.guild.id, after.id, {'old': before.nick, 'new': after.nick}, ts
+        ))
+        await self._enqueue(statements + self._search_statements(after.guild.id, after.id))
     
     async def log_role_change(self, before: discord.Member, after: discord.Member):
         """Log role changes"""
-        await self.upsert_guild_member(after)
+        statements = self._member_statements(after)
         
         before_roles = set(role.id for role in before.roles)
         after_roles = set(role.id for role in after.roles)
@@ -387,204 +1269,277 @@ class Database:
         for role_id in added_roles | removed_roles:
             role = after.guild.get_role(role_id) or before.guild.get_role(role_id)
             if role:
-                await self.upsert_role(role)
+                statements += self._role_statements(role)
         
-        async with aiosqlite.connect(self.db_path) as db:
-            # Log added roles
-            for role_id in added_roles:
-                await db.execute("""
-                    INSERT INTO role_changes (guild_id, user_id, role_id, action)
-                    VALUES (?, ?, ?, ?)
-                """, (after.guild.id, after.id, role_id, 'added'))
-            
-            # Log removed roles
-            for role_id in removed_roles:
-                await db.execute("""
-                    INSERT INTO role_changes (guild_id, user_id, role_id, action)
-                    VALUES (?, ?, ?, ?)
-                """, (after.guild.id, after.id, role_id, 'removed'))
-            
-            await db.commit()
+        now = datetime.utcnow()
+        ts = to_epoch_ms(now)
+        
+        # Log added roles
+        for role_id in added_roles:
+            statements.append(("""
+                INSERT INTO role_changes (guild_id, user_id, role_id, action, ts)
+                VALUES (?, ?, ?, ?, ?)
+            """, (after.guild.id, after.id, role_id, 'added', ts)))
+            statements.append(self._event_statement(
+                'role', after.guild.id, after.id, {'role_id': role_id, 'action': 'added'}, ts
+            ))
+            statements.append((GRANT_MEMBER_ROLE_SQL, (after.guild.id, after.id, role_id, now)))
+        
+        # Log removed roles
+        for role_id in removed_roles:
+            statements.append(("""
+                INSERT INTO role_changes (guild_id, user_id, role_id, action, ts)
+                VALUES (?, ?, ?, ?, ?)
+            """, (after.guild.id, after.id, role_id, 'removed', ts)))
+            statements.append(self._event_statement(
+                'role', after.guild.id, after.id, {'role_id': role_id, 'action': 'removed'}, ts
+            ))
+            statements.append((REVOKE_MEMBER_ROLE_SQL, (after.guild.id, after.id, role_id)))
+        
+        if added_roles or removed_roles:
+            statements += self._score_bump_statements(
+                after.guild.id, after.id, len(added_roles) + len(removed_roles)
+            )
+        statements += self._search_statements(after.guild.id, after.id)
+        
+        await self._enqueue(statements)
     
     async def log_user_join(self, member: discord.Member):
         """Log when a user joins the guild"""
-        await self.upsert_guild_member(member)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO join_leave_events (guild_id, user_id, event_type)
-                VALUES (?, ?, ?)
-            """, (member.guild.id, member.id, 'join'))
-            await db.commit()
+        ts = to_epoch_ms()
+        await self._enqueue(self._member_statements(member) + [
+            ("""
+                INSERT INTO join_leave_events (guild_id, user_id, event_type, ts)
+                VALUES (?, ?, ?, ?)
+            """, (member.guild.id, member.id, 'join', ts)),
+            self._event_statement('join', member.guild.id, member.id, ts=ts),
+            (REFRESH_MEMBER_SCORE_SQL, (member.guild.id, member.id)),
+        ] + self._search_statements(member.guild.id, member.id))
     
     async def log_user_leave(self, member: discord.Member):
         """Log when a user leaves the guild"""
-        async with aiosqlite.connect(self.db_path) as db:
+        ts = to_epoch_ms()
+        # The cached row still says active; a rejoin must write again
+        self.member_rows.invalidate((member.guild.id, member.id))
+        await self._enqueue([
             # Mark as inactive in guild_members
-            await db.execute("""
+            ("""
                 UPDATE guild_members 
                 SET is_active = FALSE 
                 WHERE guild_id = ? AND user_id = ?
-            """, (member.guild.id, member.id))
-            
+            """, (member.guild.id, member.id)),
             # Log leave event
-            await db.execute("""
-                INSERT INTO join_leave_events (guild_id, user_id, event_type)
-                VALUES (?, ?, ?)
-            """, (member.guild.id, member.id, 'leave'))
-            
-            await db.commit()
+            ("""
+                INSERT INTO join_leave_events (guild_id, user_id, event_type, ts)
+                VALUES (?, ?, ?, ?)
+            """, (member.guild.id, member.id, 'leave', ts)),
+            self._event_statement('leave', member.guild.id, member.id, ts=ts),
+            # Drop out of the leaderboard
+            ("""
+                UPDATE leaderboard_scores
+                SET is_active = FALSE, updated_at = CURRENT_TIMESTAMP
+                WHERE guild_id = ? AND user_id = ?
+            """, (member.guild.id, member.id)),
+        ])
     
     async def get_user_stats(self, user_id) -> Dict[str, Any]:
         """Get statistics for a specific user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Get basic user info
-            cursor = await db.execute("""
-                SELECT * FROM users WHERE user_id = ?
-            """, (user_id,))
-            user_data = await cursor.fetchone()
-            
-            if not user_data:
+        return (await self.get_users_stats([int(user_id)])).get(int(user_id), {})
+    
+    async def get_users_stats(self, user_ids: List[int], guild_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """Profile, change counts and last activity of several users, keyed by user id.
+        
+        One reader connection and one grouped aggregate per history table.
+        With ``guild_id`` the nickname and role counts (and the nickname
+        fallback for users without a user row) are limited to that guild;
+        username changes are global. Unknown users are left out.
+        """
+        user_ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+        if not user_ids:
+            return {}
+        placeholders = ','.join('?' * len(user_ids))
+        guild_filter = "" if guild_id is None else " AND guild_id = ?"
+        guild_params = [] if guild_id is None else [guild_id]
+        
+        async with self.reader() as db:
+            cursor = await db.execute(f"""
+                SELECT user_id, username, display_name, avatar_url, last_seen
+                FROM users WHERE user_id IN ({placeholders})
+            """, user_ids)
+            profiles = {row[0]: row[1:] for row in await cursor.fetchall()}
+            
+            missing = [uid for uid in user_ids if uid not in profiles]
+            if missing:
+                cursor = await db.execute(f"""
+                    SELECT user_id, MAX(nickname) FROM guild_members
+                    WHERE user_id IN ({','.join('?' * len(missing))}){guild_filter}
+                    GROUP BY user_id
+                """, missing + guild_params)
+                for uid, nickname in await cursor.fetchall():
+                    profiles[uid] = (None, nickname, None, None)
+            if not profiles:
                 return {}
             
-            # Get change counts (excluding initial role assignments)
-            cursor = await db.execute("""
-                SELECT 
-                    (SELECT COUNT(*) FROM username_changes WHERE user_id = ?) as username_changes,
-                    (SELECT COUNT(*) FROM nickname_changes WHERE user_id = ?) as nickname_changes,
-                    (SELECT COUNT(*) FROM role_changes WHERE user_id = ? AND action != 'initial') as role_changes
-            """, (user_id, user_id, user_id))
-            
-            stats = await cursor.fetchone()
-            
-            return {
-                'username_changes': stats[0] if stats else 0,
-                'nickname_changes': stats[1] if stats else 0,
-                'role_changes': stats[2] if stats else 0,
-                'last_activity': datetime.fromisoformat(user_data[7]) if user_data[7] else None
+            known = list(profiles)
+            known_placeholders = ','.join('?' * len(known))
+            counts: Dict[str, Dict[int, int]] = {}
+            for table, where, params in (
+                ('username_changes', "", []),
+                ('nickname_changes', guild_filter, guild_params),
+                ('role_changes', guild_filter + " AND action != 'initial'", guild_params),
+            ):
+                cursor = await db.execute(f"""
+                    SELECT user_id, COUNT(*) FROM {table}
+                    WHERE user_id IN ({known_placeholders}){where}
+                    GROUP BY user_id
+                """, known + params)
+                counts[table] = dict(await cursor.fetchall())
+            
+            # Archived username changes are stored under guild 0
+            cursor = await db.execute(f"""
+                SELECT user_id, table_name, SUM(rows) FROM archived_user_counts
+                WHERE user_id IN ({known_placeholders}){'' if guild_id is None else ' AND guild_id IN (?, 0)'}
+                GROUP BY user_id, table_name
+            """, known + guild_params)
+            for uid, table, rows in await cursor.fetchall():
+                if table in counts:
+                    counts[table][uid] = counts[table].get(uid, 0) + rows
+        
+        result = {}
+        for uid, (username, display_name, avatar_url, last_seen) in profiles.items():
+            fallback = f"User_{uid}"
+            result[uid] = {
+                'username': username or fallback,
+                'display_name': display_name or username or fallback,
+                'avatar_url': avatar_url,
+                'username_changes': counts['username_changes'].get(uid, 0),
+                'nickname_changes': counts['nickname_changes'].get(uid, 0),
+                'role_changes': counts['role_changes'].get(uid, 0),
+                'last_activity': datetime.fromisoformat(last_seen) if last_seen else None,
             }
+        return result
     
-    async def get_server_stats(self, guild_id: int) -> Dict[str, Any]:
-        """Get statistics for a specific server"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Get total counts (excluding initial role assignments)
-            cursor = await db.execute("""
-                SELECT 
-                    (SELECT COUNT(DISTINCT user_id) FROM guild_members WHERE guild_id = ?) as total_users,
-                    (SELECT COUNT(*) FROM username_changes uc 
-                     JOIN guild_members gm ON uc.user_id = gm.user_id 
-                     WHERE gm.guild_id = ?) as total_username_changes,
-                    (SELECT COUNT(*) FROM nickname_changes WHERE guild_id = ?) as total_nickname_changes,
-                    (SELECT COUNT(*) FROM role_changes WHERE guild_id = ? AND action != 'initial') as total_role_changes
-            """, (guild_id, guild_id, guild_id, guild_id))
+    async def get_server_stats(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Get statistics for a specific server.
+        
+        Change totals come from the daily rollups, optionally limited to the
+        ``start``..``end`` day range (inclusive, UTC). The 24h figures are an
+        index range scan over the event log.
+        """
+        where, params = self._activity_range(guild_id, start, end)
+        async with self.reader() as db:
+            cursor = await db.execute(
+                "SELECT COUNT(DISTINCT user_id) FROM guild_members WHERE guild_id = ?",
+                (guild_id,)
+            )
+            total_users = (await cursor.fetchone())[0]
             
-            stats = await cursor.fetchone()
+            cursor = await db.execute(f"""
+                SELECT 
+                    COALESCE(SUM(username_changes), 0),
+                    COALESCE(SUM(nickname_changes), 0),
+                    COALESCE(SUM(role_changes), 0)
+                FROM daily_activity
+                WHERE {where}
+            """, params)
+            totals = await cursor.fetchone()
             
             # Get 24h activity
-            yesterday = datetime.utcnow() - timedelta(days=1)
+            since_ms = int((time.time() - 86400) * 1000)
             cursor = await db.execute("""
-                SELECT 
-                    (SELECT COUNT(*) FROM join_leave_events 
-                     WHERE guild_id = ? AND event_type = 'join' AND timestamp > ?) as new_members_24h,
-                    (SELECT COUNT(*) FROM join_leave_events 
-                     WHERE guild_id = ? AND event_type = 'leave' AND timestamp > ?) as left_members_24h,
-                    (SELECT COUNT(*) FROM nickname_changes 
-                     WHERE guild_id = ? AND changed_at > ?) as name_changes_24h
-            """, (guild_id, yesterday, guild_id, yesterday, guild_id, yesterday))
-            
-            activity_stats = await cursor.fetchone()
+                SELECT type, COUNT(*) FROM events
+                WHERE guild_id = ? AND ts > ? AND type IN ('join', 'leave', 'nickname')
+                GROUP BY type
+            """, (guild_id, since_ms))
+            recent = dict(await cursor.fetchall())
             
             return {
-                'total_users': stats[0] if stats else 0,
-                'total_username_changes': stats[1] if stats else 0,
-                'total_nickname_changes': stats[2] if stats else 0,
-                'total_role_changes': stats[3] if stats else 0,
-                'new_members_24h': activity_stats[0] if activity_stats else 0,
-                'left_members_24h': activity_stats[1] if activity_stats else 0,
-                'name_changes_24h': activity_stats[2] if activity_stats else 0
+                'total_users': total_users,
+                'total_username_changes': totals[0],
+                'total_nickname_changes': totals[1],
+                'total_role_changes': totals[2],
+                'new_members_24h': recent.get('join', 0),
+                'left_members_24h': recent.get('leave', 0),
+                'name_changes_24h': recent.get('nickname', 0)
             }
     
-    async def get_recent_changes(self, guild_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent username, nickname, and role changes (excluding initial roles)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT 'username' as type, uc.user_id, old_username as old_value, 
-                       new_username as new_value, changed_at as timestamp, 
-                       NULL as role_id, NULL as role_name, NULL as role_color, NULL as action,
-                       u.username, u.display_name, u.avatar_url
-                FROM username_changes uc
-                JOIN guild_members gm ON uc.user_id = gm.user_id
-                JOIN users u ON uc.user_id = u.user_id
-                WHERE gm.guild_id = ?
-                
-                UNION ALL
-                
-                SELECT 'nickname' as type, nc.user_id, old_nickname as old_value,
-                       new_nickname as new_value, changed_at as timestamp,
-                       NULL as role_id, NULL as role_name, NULL as role_color, NULL as action,
-                       u.username, u.display_name, u.avatar_url
-                FROM nickname_changes nc
-                JOIN users u ON nc.user_id = u.user_id
-                WHERE nc.guild_id = ?
-                
-                UNION ALL
-                
-                SELECT 'role' as type, rc.user_id, 
-                       CASE WHEN rc.action = 'removed' THEN r.name ELSE NULL END as old_value,
-                       CASE WHEN rc.action = 'added' THEN r.name ELSE NULL END as new_value,
-                       rc.changed_at as timestamp,
-                       r.role_id, r.name as role_name, r.color as role_color, rc.action,
-                       u.username, u.display_name, u.avatar_url
-                FROM role_changes rc
-                JOIN roles r ON rc.role_id = r.role_id
-                JOIN users u ON rc.user_id = u.user_id
-                WHERE rc.guild_id = ? AND rc.action != 'initial'
-                
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """, (guild_id, guild_id, guild_id, limit))
-            
+    async def get_recent_changes(
+        self,
+        guild_id: int,
+        limit: int = 10,
+        before: Optional[tuple] = None,
+    ) -> List[Dict[str, Any]]:
+        """Get recent username, nickname, and role changes (excluding initial roles).
+        
+        Reads the event log newest first. ``before`` is the ``(ts, id)`` cursor
+        of the last change already shown; each page is an index range scan, so
+        scrolling back costs the same as loading the first page. Once the hot
+        table runs out, the cursor continues into the archived months, newest
+        first, so paging reaches archived history too.
+        """
+        query = f"""
+            SELECT e.id, e.type, e.user_id, e.payload, e.ts,
+                   r.role_id, r.name, r.color,
+                   u.username, u.display_name, u.avatar_url
+            FROM {{schema}}.events e
+            JOIN main.users u ON e.user_id = u.user_id
+            LEFT JOIN main.roles r ON e.type = 'role' AND r.role_id = json_extract(e.payload, '$.role_id')
+            WHERE e.guild_id = ? AND e.type IN ({', '.join('?' * len(CHANGE_EVENT_TYPES))})
+        """
+        params: List[Any] = [guild_id, *CHANGE_EVENT_TYPES]
+        if before is not None:
+            query += " AND (e.ts, e.id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY e.ts DESC, e.id DESC LIMIT ?"
+        
+        async with self.reader() as db:
+            cursor = await db.execute(query.format(schema='main'), [*params, limit])
             rows = await cursor.fetchall()
             
-            changes = []
-            for row in rows:
-                change_data = {
-                    'type': row[0],
-                    'user_id': row[1],
-                    'old_value': row[2],
-                    'new_value': row[3],
-                    'timestamp': datetime.fromisoformat(row[4]),
-                    'username': row[9],
-                    'display_name': row[10],
-                    'avatar_url': row[11]
-                }
-                
-                # Add role-specific data if this is a role change
-                if row[0] == 'role':
-                    change_data.update({
-                        'role_id': row[5],
-                        'role_name': row[6],
-                        'role_color': row[7],
-                        'action': row[8]
-                    })
-                
-                changes.append(change_data)
-            
-            return changes
+            if len(rows) < limit:
+                # Months newer than the cursor hold nothing older than it
+                newest = from_epoch_ms(before[0]).strftime('%Y-%m') if before is not None else None
+                for month in reversed(await self.archive.months(db, 'events')):
+                    if len(rows) >= limit:
+                        break
+                    if newest is not None and month > newest:
+                        continue
+                    async with self.archive.attached(db, month) as alias:
+                        if alias is None:
+                            continue
+                        cursor = await db.execute(query.format(schema=alias), [*params, limit - len(rows)])
+                        rows.extend(await cursor.fetchall())
+        
+        return [self._change_record(row) for row in rows]
     
     async def get_role_history(self, user_id, guild_id: int) -> List[Dict[str, Any]]:
-        """Get role change history for a user (excluding initial role assignments)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT rc.role_id, r.name as role_name, r.color, rc.action, rc.changed_at
-                FROM role_changes rc
-                INNER JOIN roles r ON rc.role_id = r.role_id
-                WHERE rc.user_id = ? AND rc.guild_id = ? AND rc.action != 'initial'
-                ORDER BY rc.changed_at DESC
-            """, (user_id, guild_id))
-            
+        """Get role change history for a user (excluding initial role assignments).
+        
+        Newest first: the hot table, then each archived month from newest to oldest.
+        """
+        query = """
+            SELECT rc.role_id, r.name as role_name, r.color, rc.action, rc.ts
+            FROM {schema}.role_changes rc
+            INNER JOIN main.roles r ON rc.role_id = r.role_id
+            WHERE rc.user_id = ? AND rc.guild_id = ? AND rc.action != 'initial'
+            ORDER BY rc.ts DESC
+        """
+        async with self.reader() as db:
+            cursor = await db.execute(query.format(schema='main'), (user_id, guild_id))
             rows = await cursor.fetchall()
             
+            for month in reversed(await self.archive.months(db, 'role_changes')):
+                async with self.archive.attached(db, month) as alias:
+                    if alias is None:
+                        continue
+                    cursor = await db.execute(query.format(schema=alias), (user_id, guild_id))
+                    rows.extend(await cursor.fetchall())
+            
             history = []
             for row in rows:
                 history.append({
@@ -592,309 +1547,337 @@ class Database:
                     'role_name': row[1],
                     'role_color': row[2],
                     'action': row[3],
-                    'timestamp': datetime.fromisoformat(row[4])
+                    'timestamp': from_epoch_ms(row[4])
                 })
             
             return history
     
-    async def get_weekly_activity(self, guild_id: int) -> List[Dict[str, Any]]:
-        """Get activity statistics for the last 7 days"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Get the start of the week (7 days ago)
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            
-            cursor = await db.execute("""
-                WITH weekly_changes AS (
-                    -- Username changes
-                    SELECT 
-                        CASE CAST(STRFTIME('%w', uc.changed_at) AS INTEGER)
-                            WHEN 0 THEN 'Sun'
-                            WHEN 1 THEN 'Mon' 
-                            WHEN 2 THEN 'Tue'
-                            WHEN 3 THEN 'Wed'
-                            WHEN 4 THEN 'Thu'
-                            WHEN 5 THEN 'Fri'
-                            WHEN 6 THEN 'Sat'
-                        END as day_name,
-                        CAST(STRFTIME('%w', uc.changed_at) AS INTEGER) as day_number,
-                        COUNT(*) as change_count
-                    FROM username_changes uc
-                    JOIN guild_members gm ON uc.user_id = gm.user_id
-                    WHERE gm.guild_id = ? AND uc.changed_at >= ?
-                    GROUP BY STRFTIME('%w', uc.changed_at)
-                    
-                    UNION ALL
-                    
-                    -- Nickname changes  
-                    SELECT 
-                        CASE CAST(STRFTIME('%w', nc.changed_at) AS INTEGER)
-                            WHEN 0 THEN 'Sun'
-                            WHEN 1 THEN 'Mon'
-                            WHEN 2 THEN 'Tue' 
-                            WHEN 3 THEN 'Wed'
-                            WHEN 4 THEN 'Thu'
-                            WHEN 5 THEN 'Fri'
-                            WHEN 6 THEN 'Sat'
-                        END as day_name,
-                        CAST(STRFTIME('%w', nc.changed_at) AS INTEGER) as day_number,
-                        COUNT(*) as change_count
-                    FROM nickname_changes nc
-                    WHERE nc.guild_id = ? AND nc.changed_at >= ?
-                    GROUP BY STRFTIME('%w', nc.changed_at)
-                    
-                    UNION ALL
-                    
-                    -- Role changes (excluding initial)
-                    SELECT 
-                        CASE CAST(STRFTIME('%w', rc.changed_at) AS INTEGER)
-                            WHEN 0 THEN 'Sun'
-                            WHEN 1 THEN 'Mon'
-                            WHEN 2 THEN 'Tue'
-                            WHEN 3 THEN 'Wed' 
-                            WHEN 4 THEN 'Thu'
-                            WHEN 5 THEN 'Fri'
-                            WHEN 6 THEN 'Sat'
-                        END as day_name,
-                        CAST(STRFTIME('%w', rc.changed_at) AS INTEGER) as day_number,
-                        COUNT(*) as change_count
-                    FROM role_changes rc
-                    WHERE rc.guild_id = ? AND rc.changed_at >= ? AND rc.action != 'initial'
-                    GROUP BY STRFTIME('%w', rc.changed_at)
-                )
-                SELECT day_name, SUM(change_count) as total_changes
-                FROM weekly_changes
-                GROUP BY day_name, day_number
-                ORDER BY day_number
-            """, (guild_id, week_ago, guild_id, week_ago, guild_id, week_ago))
-            
-            rows = await cursor.fetchall()
-            
-            # Create a complete week structure with all days
-            days_order = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
-            activity_data = []
-            
-            # Convert rows to dict for easy lookup
-            data_dict = {row[0]: row[1] for row in rows}
-            
-            # Ensure all days are present, even with 0 changes
-            for day in days_order:
-                activity_data.append({
-                    'name': day,
-                    'changes': data_dict.get(day, 0)
-                })
-            
-            return activity_data
-    
-    async def get_database_stats(self) -> Dict[str, int]:
-        """Get overall database statistics (excluding initial role assignments)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT 
-                    (SELECT COUNT(*) FROM users) as user_count,
-                    (SELECT COUNT(*) FROM username_changes) as username_changes,
-                    (SELECT COUNT(*) FROM nickname_changes) as nickname_changes,
-                    (SELECT COUNT(*) FROM role_changes WHERE action != 'initial') as role_changes,
-                    (SELECT COUNT(*) FROM join_leave_events) as join_leave_events
-            """)
-            
-            stats = await cursor.fetchone()
-            
-            return {
-                'user_count': stats[0] if stats else 0,
-                'username_changes': stats[1] if stats else 0,
-                'nickname_changes': stats[2] if stats else 0,
-                'role_changes': stats[3] if stats else 0,
-                'join_leave_events': stats[4] if stats else 0
-            }
+    def _activity_range(self, guild_id: int, start: Optional[date], end: Optional[date]) -> tuple:
+        """WHERE clause and params selecting a guild's rollup rows between two days"""
+        where = "guild_id = ?"
+        params: List[Any] = [guild_id]
+        if start is not None:
+            where += " AND day >= ?"
+            params.append(start.isoformat())
+        if end is not None:
+            where += " AND day <= ?"
+            params.append(end.isoformat())
+        return where, params
     
-    async def cleanup_old_data(self, days: int) -> int:
-        """Clean up old tracking data"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            # Delete old username changes
-            cursor = await db.execute("""
-                DELETE FROM username_changes WHERE changed_at < ?
-            """, (cutoff_date,))
-            
-            deleted_count = cursor.rowcount
-            
-            # Delete old nickname changes
-            cursor = await db.execute("""
-                DELETE FROM nickname_changes WHERE changed_at < ?
-            """, (cutoff_date,))
-            
-            deleted_count += cursor.rowcount
-            
-            # Delete old role changes
-            cursor = await db.execute("""
-                DELETE FROM role_changes WHERE changed_at < ?
-            """, (cutoff_date,))
-            
-            deleted_count += cursor.rowcount
-            
-            # Delete old join/leave events
-            cursor = await db.execute("""
-                DELETE FROM join_leave_events WHERE timestamp < ?
-            """, (cutoff_date,))
-            
-            deleted_count += cursor.rowcount
-            
-            await db.commit()
-            
-            return deleted_count
-    
-    async def export_user_data(self, user_id: int) -> Dict[str, List[Dict[str, Any]]]:
-        """Export all data for a specific user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            data = {}
-            
-            # Username changes
-            cursor = await db.execute("""
-                SELECT old_username, new_username, changed_at
-                FROM username_changes WHERE user_id = ?
-                ORDER BY changed_at
-            """, (user_id,))
-            
-            data['username_changes'] = [
-                {
-                    'old_username': row[0],
-                    'new_username': row[1],
-                    'changed_at': row[2]
-                }
-                for row in await cursor.fetchall()
-            ]
-            
-            # Nickname changes
-            cursor = await db.execute("""
-                SELECT guild_id, old_nickname, new_nickname, changed_at
-                FROM nickname_changes WHERE user_id = ?
-                ORDER BY changed_at
-            """, (user_id,))
-            
-            data['nickname_changes'] = [
-                {
-                    'guild_id': row[0],
-                    'old_nickname': row[1],
-                    'new_nickname': row[2],
-                    'changed_at': row[3]
-                }
-                for row in await cursor.fetchall()
-            ]
-            
-            # Role changes
-            cursor = await db.execute("""
-                SELECT guild_id, role_id, role_name, action, changed_at
-                FROM role_changes WHERE user_id = ?
-                ORDER BY changed_at
-            """, (user_id,))
-            
-            data['role_changes'] = [
-                {
-                    'guild_id': row[0],
-                    'role_id': row[1],
-                    'role_name': row[2],
-                    'action': row[3],
-                    'changed_at': row[4]
-                }
-                for row in await cursor.fetchall()
-            ]
-            
-            # Join/leave events
-            cursor = await db.execute("""
-                SELECT guild_id, event_type, timestamp
-                FROM join_leave_events WHERE user_id = ?
-                ORDER BY timestamp
-            """, (user_id,))
-            
-            data['join_leave_events'] = [
+    async def get_daily_activity(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Per-day activity counters for a guild, oldest day first (days without activity are omitted)"""
+        where, params = self._activity_range(guild_id, start, end)
+        async with self.reader() as db:
+            cursor = await db.execute(f"""
+                SELECT day, joins, leaves, username_changes, nickname_changes, role_changes
+                FROM daily_activity
+                WHERE {where}
+                ORDER BY day
+            """, params)
+            return [
                 {
-                    'guild_id': row[0],
-                    'event_type': row[1],
-                    'timestamp': row[2]
+                    'day': row[0],
+                    'joins': row[1],
+                    'leaves': row[2],
+                    'username_changes': row[3],
+                    'nickname_changes': row[4],
+                    'role_changes': row[5],
                 }
                 for row in await cursor.fetchall()
             ]
-            
-            return data
+    
+    async def get_weekly_activity(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Get name and role changes per weekday, for the last 7 days unless a range is given"""
+        if start is None and end is None:
+            start = datetime.utcnow().date() - timedelta(days=6)
+        where, params = self._activity_range(guild_id, start, end)
+        async with self.reader() as db:
+            cursor = await db.execute(f"""
+                SELECT CAST(STRFTIME('%w', day) AS INTEGER) AS day_number,
+                       SUM(username_changes + nickname_changes + role_changes)
+                FROM daily_activity
+                WHERE {where}
+                GROUP BY day_number
+            """, params)
+            data_dict = dict(await cursor.fetchall())
+        
+        # Ensure all days are present, even with 0 changes
+        days_order = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+        return [
+            {'name': day, 'changes': data_dict.get(number, 0)}
+            for number, day in enumerate(days_order)
+        ]
+    
+    async def _backfill_daily_activity(self, db: aiosqlite.Connection, guild_id: Optional[int] = None) -> int:
+        """Recompute rollup rows from the event log; returns the number of days written"""
+        where = "WHERE guild_id = ?" if guild_id is not None else ""
+        params = (guild_id,) if guild_id is not None else ()
+        await db.execute(f"DELETE FROM daily_activity {where}", params)
+        cursor = await db.execute(f"""
+            INSERT INTO daily_activity
+            (guild_id, day, joins, leaves, username_changes, nickname_changes, role_changes)
+            SELECT
+                guild_id,
+                date(ts / 1000, 'unixepoch') AS day,
+                SUM(type = 'join'),
+                SUM(type = 'leave'),
+                SUM(type = 'username'),
+                SUM(type = 'nickname'),
+                SUM(type = 'role')
+            FROM events
+            {where}
+            GROUP BY guild_id, day
+        """, params)
+        return cursor.rowcount
+    
+    async def backfill_daily_activity(self, guild_id: Optional[int] = None) -> int:
+        """Rebuild the daily rollups from the event log (all guilds unless guild_id is given)"""
+        async with self.writer() as db:
+            days = await self._backfill_daily_activity(db, guild_id)
+            await db.commit()
+        logger.info(f"Rebuilt {days} days of activity rollups")
+        return days
+    
+    async def get_database_stats(self) -> Dict[str, int]:
+        """Get overall database statistics (excluding initial role assignments).
+        
+        Counts cover the hot tables plus every archive partition.
+        """
+        async with self.reader() as db:
+            cursor = await db.execute("SELECT name, value FROM table_counters")
+            counters = dict(await cursor.fetchall())
+            cursor = await db.execute("SELECT table_name, SUM(rows) FROM archive_partitions GROUP BY table_name")
+            archived = dict(await cursor.fetchall())
+            return {name: counters.get(name, 0) + archived.get(name, 0) for name in TABLE_COUNTERS}
+    
+    async def _reconcile_table_counters(self, db: aiosqlite.Connection) -> Dict[str, Dict[str, int]]:
+        """Recount every counted table; returns the counters that had drifted"""
+        cursor = await db.execute("SELECT name, value FROM table_counters")
+        stored = dict(await cursor.fetchall())
+        drift = {}
+        for name, query in TABLE_COUNTERS.items():
+            cursor = await db.execute(query)
+            actual = (await cursor.fetchone())[0]
+            if stored.get(name) != actual:
+                drift[name] = {'stored': stored.get(name), 'actual': actual}
+            await db.execute(
+                "INSERT OR REPLACE INTO table_counters (name, value) VALUES (?, ?)",
+                (name, actual)
+            )
+        return drift
+    
+    async def reconcile_table_counters(self) -> Dict[str, Dict[str, int]]:
+        """Recount the tables behind get_database_stats and fix any drifted counters"""
+        async with self.writer() as db:
+            drift = await self._reconcile_table_counters(db)
+            await db.commit()
+        if drift:
+            logger.warning(f"Reconciled drifted table counters: {drift}")
+        return drift
+    
+    async def run_retention(
+        self,
+        policies: Optional[List[RetentionPolicy]] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, int]:
+        """Prune history per retention policy (from the environment unless given).
+        
+        Deletes run in small batches so tracking writes keep flowing; the
+        daily_activity rollups and table counters stay correct. Returns rows
+        deleted per table.
+        """
+        if policies is None:
+            policies = policies_from_env()
+        deleted = await self.retention.run(policies, progress)
+        if deleted.get('role_changes'):
+            # Role history shrank, so the role_changes component has to be recounted
+            await self.rebuild_leaderboard()
+        return deleted
+    
+    async def archive_history(
+        self,
+        days: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, int]:
+        """Move history older than ``days`` days (ARCHIVE_AFTER_DAYS unless given)
+        into the monthly archive files; returns rows moved per table.
+        
+        Archived rows still count towards stats and leaderboard scores and are
+        read back by get_role_history, get_recent_changes and export_user_data.
+        """
+        if days is None:
+            days = int(os.getenv('ARCHIVE_AFTER_DAYS', '0'))
+        if days <= 0:
+            return {}
+        return await self.archive.run(days, progress)
+    
+    async def cleanup_old_data(self, days: int, progress: Optional[ProgressCallback] = None) -> int:
+        """Clean up tracking data older than ``days`` days from every history table"""
+        deleted = await self.run_retention(policies_for(days), progress)
+        # The event log mirrors the per-type tables; count each change once
+        return sum(count for table, count in deleted.items() if table != 'events')
+    
+    async def export_user_data(self, user_id: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all data for a specific user, one row at a time.
+        
+        Every row is a dict tagged with the ``table`` it came from. Rows are
+        fetched in chunks of EXPORT_FETCH_SIZE from a single reader, so memory
+        use does not depend on how much history the user has. Archived history
+        comes first, oldest month first, followed by the hot rows.
+        """
+        async with self.reader() as db:
+            for table, sql in USER_EXPORT_QUERIES:
+                if table in ARCHIVE_TABLES:
+                    for month in await self.archive.months(db, table):
+                        async with self.archive.attached(db, month) as alias:
+                            if alias is not None:
+                                async for record in self._export_rows(db, table, sql.format(schema=alias), user_id):
+                                    yield record
+                async for record in self._export_rows(db, table, sql.format(schema='main'), user_id):
+                    yield record
+    
+    async def _export_rows(
+        self,
+        db: aiosqlite.Connection,
+        table: str,
+        sql: str,
+        user_id: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        async with db.execute(sql, (user_id,)) as cursor:
+            columns = [column[0] for column in cursor.description]
+            while rows := await cursor.fetchmany(EXPORT_FETCH_SIZE):
+                for row in rows:
+                    record = {'table': table, **dict(zip(columns, row))}
+                    if table == 'events' and record['payload']:
+                        record['payload'] = json.loads(record['payload'])
+                    yield record
     
     async def _log_initial_role(self, member: discord.Member, role: discord.Role):
         """Log initial role during inventory (only if no role history exists for this specific role)"""
-        # First ensure the role exists in the roles table
-        await self.upsert_role(role)
-        
-        async with aiosqlite.connect(self.db_path) as db:
-            # Check if this user already has THIS SPECIFIC role in history
-            cursor = await db.execute("""
-                SELECT COUNT(*) FROM role_changes 
-                WHERE user_id = ? AND guild_id = ? AND role_id = ?
-            """, (member.id, member.guild.id, role.id))
+        async with self.writer() as db:
+            # First ensure the role exists in the roles table
+            for sql, params in self._role_statements(role):
+                await db.execute(sql, params)
             
-            role_specific_count = (await cursor.fetchone())[0]
-            
-            # Only log initial role if this specific role hasn't been tracked before
-            if role_specific_count == 0:
-                # This is the first time we're tracking this specific role for this user
-                await db.execute("""
-                    INSERT INTO role_changes (guild_id, user_id, role_id, action, changed_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    member.guild.id, 
-                    member.id, 
-                    role.id, 
-                    'initial', 
-                    datetime.utcnow()
-                ))
-                await db.commit()
+            # The member holds the role right now, whatever the history says
+            now = datetime.utcnow()
+            await db.execute(GRANT_MEMBER_ROLE_SQL, (member.guild.id, member.id, role.id, now))
+            
+            # Only logged if this specific role hasn't been tracked before
+            cursor = await db.execute(INSERT_INITIAL_ROLE_SQL, (
+                member.guild.id, 
+                member.id, 
+                role.id, 
+                now,
+                to_epoch_ms(now)
+            ))
+            if cursor.rowcount:
                 logger.debug(f"Logged initial role {role.name} for user {member.display_name}")
             else:
-                # This specific role already exists in history, skip
                 logger.debug(f"Skipping initial role logging for {member.display_name} - role {role.name} already tracked")
+            await db.execute(REFRESH_MEMBER_SCORE_SQL, (member.guild.id, member.id))
+            await db.execute(REFRESH_SEARCH_DOC_SQL, (member.guild.id, member.id))
+            await db.commit()
     
-    async def cleanup_duplicate_initial_roles(self):
-        """Clean up duplicate 'initial' role entries, keeping only the oldest one per user/role combination"""
-        async with aiosqlite.connect(self.db_path) as db:
-            logger.info("Starting cleanup of duplicate initial role entries...")
-            
-            # Find duplicate initial entries (same user, guild, role with action='initial')
-            cursor = await db.execute("""
-                SELECT user_id, guild_id, role_id, COUNT(*) as count
-                FROM role_changes 
-                WHERE action = 'initial'
-                GROUP BY user_id, guild_id, role_id
-                HAVING COUNT(*) > 1
-                ORDER BY user_id, guild_id, role_id
-            """)
-            
-            duplicates = await cursor.fetchall()
-            
-            if not duplicates:
-                logger.info("No duplicate initial role entries found.")
-                return
-            
-            logger.info(f"Found {len(duplicates)} duplicate initial role combinations to clean up")
-            
-            total_deleted = 0
-            for user_id, guild_id, role_id, count in duplicates:
-                # Keep only the oldest initial entry for each user/guild/role combination
-                cursor = await db.execute("""
-                    DELETE FROM role_changes 
-                    WHERE user_id = ? AND guild_id = ? AND role_id = ? AND action = 'initial'
-                    AND id NOT IN (
-                        SELECT id FROM role_changes 
-                        WHERE user_id = ? AND guild_id = ? AND role_id = ? AND action = 'initial'
-                        ORDER BY changed_at ASC 
-                        LIMIT 1
-                    )
-                """, (user_id, guild_id, role_id, user_id, guild_id, role_id))
-                
-                deleted_count = cursor.rowcount
-                total_deleted += deleted_count
-                
-                logger.debug(f"Deleted {deleted_count} duplicate initial entries for user {user_id}, role {role_id}")
-            
+    async def inventory_guild(self, guild: discord.Guild, members: List[discord.Member]) -> Dict[str, int]:
+        """Bulk-write a guild inventory: roles, users, members and initial roles.
+        
+        Members whose fingerprint matches the one stored by the previous
+        inventory are skipped. For the rest, existing role history and current
+        roles are loaded once and diffed in memory, then every table is written
+        with executemany inside a single transaction. ``member_roles`` is
+        brought in line with the roles each member actually holds, and the
+        leaderboard scores and search documents of changed members are
+        recomputed (plus the search documents of everyone holding a renamed role).
+        """
+        async with self.reader() as db:
+            cursor = await db.execute(
+                "SELECT user_id, fingerprint FROM member_fingerprints WHERE guild_id = ?",
+                (guild.id,)
+            )
+            known = dict(await cursor.fetchall())
+        
+        renamed = [
+            role.id for role in guild.roles
+            if not role.is_default() and self.roles.name(role.id) not in (None, role.name)
+        ]
+        
+        fingerprints = {member.id: self._member_fingerprint(member) for member in members}
+        changed = [member for member in members if known.get(member.id) != fingerprints[member.id]]
+        
+        tracked = set()
+        current = set()
+        if changed:
+            async with self.reader() as db:
+                cursor = await db.execute(
+                    "SELECT DISTINCT user_id, role_id FROM role_changes WHERE guild_id = ?",
+                    (guild.id,)
+                )
+                tracked = set(await cursor.fetchall())
+                cursor = await db.execute(
+                    "SELECT user_id, role_id FROM member_roles WHERE guild_id = ?",
+                    (guild.id,)
+                )
+                current = set(await cursor.fetchall())
+        
+        now = datetime.utcnow()
+        rows = self._inventory_rows(guild, changed, fingerprints, tracked, current, now, to_epoch_ms(now))
+        changed_ids = {member.id for member in changed}
+        
+        try:
+            async with self.writer() as db:
+                await db.executemany(UPSERT_ROLE_SQL, rows['roles'])
+                await db.executemany(UPSERT_USER_SQL, rows['users'])
+                await db.executemany(UPSERT_MEMBER_SQL, rows['members'])
+                await db.executemany(INSERT_INITIAL_ROLE_SQL, rows['initial'])
+                await db.executemany(GRANT_MEMBER_ROLE_SQL, rows['grant'])
+                await db.executemany(REVOKE_MEMBER_ROLE_SQL, rows['revoke'])
+                await db.executemany("""
+                    INSERT OR REPLACE INTO member_fingerprints (guild_id, user_id, fingerprint, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, rows['fingerprints'])
+                await db.executemany(REFRESH_MEMBER_SCORE_SQL, [(guild.id, member.id) for member in changed])
+                await db.executemany(REFRESH_SEARCH_DOC_SQL, [(guild.id, user_id) for user_id in changed_ids])
+                await db.executemany(REFRESH_ROLE_SEARCH_DOCS_SQL, [(guild.id, role_id) for role_id in renamed])
+                await db.commit()
+        except Exception:
+            self._forget_inventory(rows)
+            raise
+        
+        self._remember_inventory(guild, changed, rows)
+        
+        return {
+            'roles': len(rows['roles']),
+            'members': len(rows['members']),
+            'unchanged': len(members) - len(changed),
+            'initial_roles': len(rows['initial']),
+        }
+    
+    async def cleanup_duplicate_initial_roles(self) -> int:
+        """Clean up duplicate 'initial' role entries, keeping only the oldest one per user/role combination.
+        
+        New duplicates are prevented by idx_role_changes_initial, so this only
+        matters for databases that have not been migrated yet. Returns the
+        number of rows removed.
+        """
+        async with self.writer() as db:
+            cursor = await db.execute(DELETE_DUPLICATE_INITIAL_ROLES_SQL)
+            total_deleted = cursor.rowcount
+            if total_deleted:
+                await self._rebuild_leaderboard(db)
             await db.commit()
-            logger.info(f"Cleanup completed: Removed {total_deleted} duplicate initial role entries")
+        logger.info(f"Cleanup completed: Removed {total_deleted} duplicate initial role entries")
+        return total_deleted
     
     # === Scheduled Messages Functions ===
     
@@ -913,7 +1896,7 @@ class Database:
         embed_color: int = 3447003
     ) -> int:
         """Add a new scheduled message (always sent as embed)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             role_ids_str = ','.join(map(str, role_ids)) if role_ids else None
             
             cursor = await db.execute("""
@@ -932,35 +1915,8 @@ class Database:
     
     async def get_scheduled_messages(self, guild_id: int) -> List[Dict[str, Any]]:
         """Get all scheduled messages for a guild"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Check which columns exist
-            cursor = await db.execute("PRAGMA table_info(scheduled_messages)")
-            columns = await cursor.fetchall()
-            column_names = [col[1] for col in columns]
-            
-            # Build SELECT based on available columns
-            if 'embed_title' in column_names and 'embed_color' in column_names:
-                query = """
-                    SELECT id, guild_id, name, channel_id, message, role_ids,
-                           interval_days, interval_hours, interval_minutes,
-                           next_run, is_active, created_at, last_sent,
-                           embed_title, embed_color
-                    FROM scheduled_messages
-                    WHERE guild_id = ?
-                    ORDER BY next_run ASC
-                """
-            else:
-                # Fallback for old schema
-                query = """
-                    SELECT id, guild_id, name, channel_id, message, role_ids,
-                           interval_days, interval_hours, interval_minutes,
-                           next_run, is_active, created_at, last_sent
-                    FROM scheduled_messages
-                    WHERE guild_id = ?
-                    ORDER BY next_run ASC
-                """
-            
-            cursor = await db.execute(query, (guild_id,))
+        async with self.reader() as db:
+            cursor = await db.execute(self._scheduled_messages_sql, (guild_id,))
             rows = await cursor.fetchall()
             
             messages = []
@@ -995,36 +1951,10 @@ class Database:
     
     async def get_messages_to_send(self) -> List[Dict[str, Any]]:
         """Get all messages that should be sent now (always sent as embeds)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.reader() as db:
             now = datetime.utcnow()
             
-            # Check which columns exist
-            cursor = await db.execute("PRAGMA table_info(scheduled_messages)")
-            columns = await cursor.fetchall()
-            column_names = [col[1] for col in columns]
-            
-            # Build SELECT based on available columns
-            if 'embed_title' in column_names and 'embed_color' in column_names:
-                query = """
-                    SELECT id, guild_id, name, channel_id, message, role_ids,
-                           interval_days, interval_hours, interval_minutes,
-                           next_run, is_active, embed_title, embed_color
-                    FROM scheduled_messages
-                    WHERE is_active = 1 AND next_run <= ?
-                    ORDER BY next_run ASC
-                """
-            else:
-                # Fallback for old schema
-                query = """
-                    SELECT id, guild_id, name, channel_id, message, role_ids,
-                           interval_days, interval_hours, interval_minutes,
-                           next_run, is_active
-                    FROM scheduled_messages
-                    WHERE is_active = 1 AND next_run <= ?
-                    ORDER BY next_run ASC
-                """
-            
-            cursor = await db.execute(query, (now,))
+            cursor = await db.execute(self._due_messages_sql, (now,))
             rows = await cursor.fetchall()
             
             messages = []
@@ -1057,7 +1987,7 @@ class Database:
     
     async def update_scheduled_message_next_run(self, message_id: int):
         """Update the next run time for a scheduled message"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             # Get current message data including the current next_run time
             cursor = await db.execute("""
                 SELECT interval_days, interval_hours, interval_minutes, next_run
@@ -1074,7 +2004,8 @@ class Database:
             # Parse current next_run time
             try:
                 if isinstance(current_next_run, str):
-                    current_next_run = datetime.strptime(current_next_run, "%Y-%m-%d %H:%M:%S.%f")
+                    # str(datetime) drops ".%f" when microseconds are 0; fromisoformat takes both
+                    current_next_run = datetime.fromisoformat(current_next_run)
                 elif isinstance(current_next_run, datetime):
                     pass  # Already a datetime object
                 else:
@@ -1102,7 +2033,7 @@ class Database:
     
     async def remove_scheduled_message(self, message_id: int, guild_id: int) -> bool:
         """Remove a scheduled message"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             cursor = await db.execute("""
                 DELETE FROM scheduled_messages
                 WHERE id = ? AND guild_id = ?
@@ -1113,7 +2044,7 @@ class Database:
     
     async def toggle_scheduled_message(self, message_id: int, guild_id: int) -> Optional[bool]:
         """Toggle a scheduled message active/inactive. Returns new state or None if not found."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             # Get current state
             cursor = await db.execute("""
                 SELECT is_active FROM scheduled_messages
@@ -1150,7 +2081,7 @@ class Database:
         next_run: Optional[datetime] = None
     ) -> bool:
         """Update a scheduled message. Only updates provided fields. Returns True if successful."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             # Check if message exists
             cursor = await db.execute("""
                 SELECT id FROM scheduled_messages
@@ -1216,7 +2147,7 @@ class Database:
     # ── Game Profiles ──────────────────────────────────────────────────────
 
     async def get_user_game_profiles(self, user_id: int) -> list:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.reader() as db:
             cursor = await db.execute(
                 "SELECT id, game_name, character_name, server, role_class, updated_at FROM user_game_profiles WHERE user_id = ? ORDER BY game_name",
                 (user_id,)
@@ -1225,7 +2156,7 @@ class Database:
             return [{"id": r[0], "game_name": r[1], "character_name": r[2], "server": r[3], "role_class": r[4], "updated_at": r[5]} for r in rows]
 
     async def upsert_user_game_profile(self, user_id: int, game_name: str, character_name: str, server: str = None, role_class: str = None) -> dict:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             cursor = await db.execute(
                 "SELECT id FROM user_game_profiles WHERE user_id = ? AND game_name = ?",
                 (user_id, game_name)
@@ -1248,7 +2179,7 @@ class Database:
             return {"id": row_id, "game_name": game_name, "character_name": character_name, "server": server, "role_class": role_class, "updated_at": now}
 
     async def delete_user_game_profile(self, profile_id: int, user_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             await db.execute("DELETE FROM user_game_profiles WHERE id = ? AND user_id = ?", (profile_id, user_id))
             await db.commit()
             return True
@@ -1256,7 +2187,7 @@ class Database:
     # ── News Posts ─────────────────────────────────────────────────────────
 
     async def add_news_post(self, title: str, content: str, discord_message_id: str = None, author_id: int = None, author_name: str = None) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             cursor = await db.execute(
                 "INSERT INTO news_posts (title, content, discord_message_id, author_id, author_name, posted_at) VALUES (?, ?, ?, ?, ?, ?)",
                 (title, content, discord_message_id, author_id, author_name, datetime.utcnow().isoformat())
@@ -1265,7 +2196,7 @@ class Database:
             return cursor.lastrowid
 
     async def get_news_posts(self, limit: int = 20) -> list:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.reader() as db:
             cursor = await db.execute(
                 "SELECT id, title, content, discord_message_id, author_name, posted_at FROM news_posts ORDER BY posted_at DESC LIMIT ?",
                 (limit,)
@@ -1276,7 +2207,7 @@ class Database:
     # ── Clan Achievements ──────────────────────────────────────────────────
 
     async def get_clan_achievements(self, game_name: str = None) -> list:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.reader() as db:
             if game_name:
                 cursor = await db.execute(
                     "SELECT id, game_name, title, description, achieved_at, created_at FROM clan_achievements WHERE game_name = ? ORDER BY achieved_at DESC",
@@ -1290,7 +2221,7 @@ class Database:
             return [{"id": r[0], "game_name": r[1], "title": r[2], "description": r[3], "achieved_at": r[4], "created_at": r[5]} for r in rows]
 
     async def add_clan_achievement(self, game_name: str, title: str, description: str = None, achieved_at: str = None, created_by: int = None) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             cursor = await db.execute(
                 "INSERT INTO clan_achievements (game_name, title, description, achieved_at, created_by) VALUES (?, ?, ?, ?, ?)",
                 (game_name, title, description, achieved_at, created_by)
@@ -1299,7 +2230,7 @@ class Database:
             return cursor.lastrowid
 
     async def update_clan_achievement(self, achievement_id: int, game_name: str, title: str, description: str = None, achieved_at: str = None) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             await db.execute(
                 "UPDATE clan_achievements SET game_name = ?, title = ?, description = ?, achieved_at = ? WHERE id = ?",
                 (game_name, title, description, achieved_at, achievement_id)
@@ -1308,85 +2239,416 @@ class Database:
             return True
 
     async def delete_clan_achievement(self, achievement_id: int) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.writer() as db:
             await db.execute("DELETE FROM clan_achievements WHERE id = ?", (achievement_id,))
             await db.commit()
             return True
 
+    # ── Current Roles ──────────────────────────────────────────────────────
+
+    async def get_current_roles(self, user_id: int, guild_id: int) -> list:
+        """Roles a member currently holds, highest position first"""
+        async with self.reader() as db:
+            cursor = await db.execute("""
+                SELECT mr.role_id, r.name, r.color, r.position
+                FROM member_roles mr
+                INNER JOIN roles r ON mr.role_id = r.role_id
+                WHERE mr.guild_id = ? AND mr.user_id = ?
+                ORDER BY r.position DESC
+            """, (guild_id, user_id))
+            rows = await cursor.fetchall()
+            return [{"role_id": r[0], "role_name": r[1], "color": r[2], "position": r[3]} for r in rows]
+
+    async def get_current_roles_bulk(self, guild_id: int, user_ids: List[int]) -> Dict[int, list]:
+        """Current roles for several members, keyed by user id"""
+        if not user_ids:
+            return {}
+        async with self.reader() as db:
+            placeholders = ','.join('?' * len(user_ids))
+            cursor = await db.execute(f"""
+                SELECT mr.user_id, mr.role_id, r.name, r.color, r.position
+                FROM member_roles mr
+                INNER JOIN roles r ON mr.role_id = r.role_id
+                WHERE mr.guild_id = ? AND mr.user_id IN ({placeholders})
+                ORDER BY mr.user_id, r.position DESC
+            """, [guild_id] + list(user_ids))
+            result: Dict[int, list] = {}
+            for r in await cursor.fetchall():
+                result.setdefault(r[0], []).append(
+                    {"role_id": r[1], "role_name": r[2], "color": r[3], "position": r[4]}
+                )
+            return result
+
+    # ── User search ────────────────────────────────────────────────────────
+
+    async def search_users(
+        self,
+        query: str,
+        guild_id: Optional[int] = None,
+        role_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Search members by username, display name, nickname or current role name.
+        
+        Queries of three or more characters go through the trigram FTS index
+        and are ranked by bm25, with name columns weighted above role names.
+        Shorter queries (trigrams need at least three characters) and SQLite
+        builds without trigram support fall back to LIKE over the search
+        documents. Without a guild only usernames and display names are matched.
+        """
+        use_fts = self.search_fts and len(query) >= 3
+        phrase = '"' + query.replace('"', '""') + '"'
+        pattern = f"%{query}%"
+        async with self.reader() as db:
+            if guild_id:
+                params: List[Any] = []
+                if use_fts:
+                    sql = """
+                        SELECT u.user_id, u.username, u.display_name, u.avatar_url,
+                               u.last_seen, gm.nickname, gm.joined_at
+                        FROM user_search s
+                        INNER JOIN user_search_docs d ON d.id = s.rowid
+                        INNER JOIN guild_members gm ON gm.guild_id = d.guild_id AND gm.user_id = d.user_id
+                        INNER JOIN users u ON u.user_id = d.user_id
+                        WHERE user_search MATCH ? AND d.guild_id = ? AND gm.is_active = 1
+                    """
+                    params.extend([phrase, guild_id])
+                else:
+                    sql = """
+                        SELECT u.user_id, u.username, u.display_name, u.avatar_url,
+                               u.last_seen, gm.nickname, gm.joined_at
+                        FROM user_search_docs d
+                        INNER JOIN guild_members gm ON gm.guild_id = d.guild_id AND gm.user_id = d.user_id
+                        INNER JOIN users u ON u.user_id = d.user_id
+                        WHERE d.guild_id = ? AND gm.is_active = 1
+                        AND (d.username LIKE ? OR d.display_name LIKE ? OR d.nickname LIKE ? OR d.role_names LIKE ?)
+                    """
+                    params.extend([guild_id] + [pattern] * 4)
+                if role_id is not None:
+                    sql += """
+                        AND d.user_id IN (
+                            SELECT user_id FROM member_roles
+                            WHERE guild_id = ? AND role_id = ?
+                        )
+                    """
+                    params.extend([guild_id, role_id])
+                if use_fts:
+                    sql += " ORDER BY bm25(user_search, 10.0, 10.0, 10.0, 1.0), u.last_seen DESC LIMIT ?"
+                else:
+                    sql += " ORDER BY u.last_seen DESC LIMIT ?"
+                params.append(limit)
+                cursor = await db.execute(sql, params)
+            elif use_fts:
+                cursor = await db.execute("""
+                    SELECT user_id, username, display_name, avatar_url, last_seen,
+                           NULL as nickname, NULL as joined_at
+                    FROM users
+                    WHERE user_id IN (
+                        SELECT d.user_id
+                        FROM user_search s
+                        INNER JOIN user_search_docs d ON d.id = s.rowid
+                        WHERE user_search MATCH ?
+                    )
+                    ORDER BY last_seen DESC LIMIT ?
+                """, (f"{{username display_name}} : {phrase}", limit))
+            else:
+                cursor = await db.execute("""
+                    SELECT user_id, username, display_name, avatar_url, last_seen,
+                           NULL as nickname, NULL as joined_at
+                    FROM users
+                    WHERE username LIKE ? OR display_name LIKE ?
+                    ORDER BY last_seen DESC LIMIT ?
+                """, (pattern, pattern, limit))
+            return [
+                {
+                    "user_id": row[0],
+                    "username": row[1],
+                    "display_name": row[2],
+                    "avatar_url": row[3],
+                    "last_seen": row[4],
+                    "nickname": row[5],
+                    "joined_at": row[6],
+                }
+                for row in await cursor.fetchall()
+            ]
+    
+    async def get_user_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Username, display name and avatar of a user, or None when unknown.
+        
+        Members tracked before their user row existed fall back to their nickname.
+        """
+        async with self.reader() as db:
+            cursor = await db.execute(
+                "SELECT username, display_name, avatar_url FROM users WHERE user_id = ?",
+                (user_id,)
+            )
+            row = await cursor.fetchone()
+            if not row:
+                cursor = await db.execute(
+                    "SELECT nickname FROM guild_members WHERE user_id = ? LIMIT 1",
+                    (user_id,)
+                )
+                member = await cursor.fetchone()
+                if not member:
+                    return None
+                row = (None, member[0], None)
+        fallback = f"User_{user_id}"
+        return {
+            'username': row[0] or fallback,
+            'display_name': row[1] or row[0] or fallback,
+            'avatar_url': row[2],
+        }
+    
+    async def get_guild_users(
+        self,
+        guild_id: int,
+        active_only: bool = True,
+        role_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Members of a guild, newest join first, optionally only holders of a role"""
+        query = """
+            SELECT u.user_id, u.username, u.display_name, u.avatar_url, gm.nickname, gm.joined_at
+            FROM users u
+            JOIN guild_members gm ON u.user_id = gm.user_id
+            WHERE gm.guild_id = ?
+        """
+        params: list = [guild_id]
+        if active_only:
+            query += " AND gm.is_active = TRUE"
+        if role_id is not None:
+            query += """
+                AND u.user_id IN (
+                    SELECT user_id FROM member_roles
+                    WHERE guild_id = ? AND role_id = ?
+                )
+            """
+            params.extend([guild_id, role_id])
+        query += " ORDER BY gm.joined_at DESC"
+        async with self.reader() as db:
+            cursor = await db.execute(query, params)
+            return [
+                {
+                    "user_id": row[0],
+                    "username": row[1],
+                    "display_name": row[2],
+                    "avatar_url": row[3],
+                    "nickname": row[4],
+                    "joined_at": row[5],
+                }
+                for row in await cursor.fetchall()
+            ]
+    
+    async def get_roles(self, guild_id: int, role_ids: List[int]) -> List[Dict[str, Any]]:
+        """Name and color of the given roles of a guild"""
+        if not role_ids:
+            return []
+        placeholders = ','.join('?' * len(role_ids))
+        async with self.reader() as db:
+            cursor = await db.execute(
+                f"SELECT role_id, name, color FROM roles WHERE role_id IN ({placeholders}) AND guild_id = ?",
+                [*role_ids, guild_id]
+            )
+            return [
+                {'role_id': row[0], 'name': row[1], 'color': row[2]}
+                for row in await cursor.fetchall()
+            ]
+    
     # ── Leaderboard ────────────────────────────────────────────────────────
 
     async def get_leaderboard(self, guild_id: int, limit: int = 50) -> list:
-        """Compute community score: days_active * 2 + role_count * 50 + role_changes * 5"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Top-N read of the precomputed community scores"""
+        async with self.reader() as db:
             cursor = await db.execute("""
                 SELECT
-                    u.user_id,
+                    ls.user_id,
                     u.username,
                     u.display_name,
                     u.avatar_url,
+                    ls.score,
+                    ls.days_active,
+                    ls.role_count,
+                    ls.role_changes
+                FROM leaderboard_scores ls
+                INNER JOIN users u ON u.user_id = ls.user_id
+                WHERE ls.guild_id = ? AND ls.is_active = 1
+                ORDER BY ls.score DESC
+                LIMIT ?
+            """, (guild_id, limit))
+            rows = await cursor.fetchall()
+            return [
+                {
+                    "rank": i + 1,
+                    "user_id": str(r[0]),
+                    "username": r[1],
+                    "display_name": r[2],
+                    "avatar_url": r[3],
+                    "score": r[4],
+                    "days_active": r[5],
+                    "role_count": r[6],
+                    "role_changes": r[7],
+                }
+                for i, r in enumerate(rows)
+            ]
+    
+    async def _rebuild_leaderboard(self, db: aiosqlite.Connection, guild_id: Optional[int] = None) -> int:
+        """Recompute score rows from the full tables (all guilds unless guild_id is given)"""
+        where = "WHERE gm.guild_id = ?" if guild_id is not None else ""
+        params = (guild_id,) if guild_id is not None else ()
+        if guild_id is not None:
+            await db.execute("DELETE FROM leaderboard_scores WHERE guild_id = ?", params)
+        else:
+            await db.execute("DELETE FROM leaderboard_scores")
+        cursor = await db.execute(f"""
+            INSERT INTO leaderboard_scores
+            (guild_id, user_id, active_since, days_active, role_count, role_changes, score, is_active, updated_at)
+            SELECT guild_id, user_id, active_since, days_active, role_count, role_changes,
+                   {LEADERBOARD_SCORE_SQL}, is_active, CURRENT_TIMESTAMP
+            FROM (
+                SELECT guild_id, user_id, active_since, {LEADERBOARD_DAYS_SQL} AS days_active,
+                       role_count, role_changes, is_active
+                FROM (
+                    SELECT
+                        gm.guild_id,
+                        gm.user_id,
+                        COALESCE(gm.joined_at, u.first_seen) AS active_since,
+                        COALESCE(mr.role_count, 0) AS role_count,
+                        COALESCE(rc.role_changes, 0) AS role_changes,
+                        gm.is_active
+                    FROM guild_members gm
+                    INNER JOIN users u ON u.user_id = gm.user_id
+                    LEFT JOIN (
+                        SELECT guild_id, user_id, COUNT(*) AS role_count
+                        FROM member_roles GROUP BY guild_id, user_id
+                    ) mr ON mr.guild_id = gm.guild_id AND mr.user_id = gm.user_id
+                    LEFT JOIN (
+                        SELECT guild_id, user_id, SUM(changes) AS role_changes
+                        FROM (
+                            SELECT guild_id, user_id, COUNT(*) AS changes
+                            FROM role_changes GROUP BY guild_id, user_id
+                            UNION ALL
+                            SELECT guild_id, user_id, rows FROM archived_user_counts
+                            WHERE table_name = 'role_changes'
+                        )
+                        GROUP BY guild_id, user_id
+                    ) rc ON rc.guild_id = gm.guild_id AND rc.user_id = gm.user_id
+                    {where}
+                )
+            )
+        """, params)
+        return cursor.rowcount
+    
+    async def rebuild_leaderboard(self, guild_id: Optional[int] = None) -> int:
+        """Rebuild leaderboard scores from scratch; returns the number of rows written"""
+        async with self.writer() as db:
+            count = await self._rebuild_leaderboard(db, guild_id)
+            await db.commit()
+        logger.info(f"Rebuilt {count} leaderboard scores")
+        return count
+    
+    async def refresh_leaderboard_days(self) -> int:
+        """Advance the days_active component; only rows whose day count changed are touched"""
+        async with self.writer() as db:
+            cursor = await db.execute(f"""
+                UPDATE leaderboard_scores
+                SET days_active = {LEADERBOARD_DAYS_SQL}, updated_at = CURRENT_TIMESTAMP
+                WHERE days_active != {LEADERBOARD_DAYS_SQL}
+            """)
+            refreshed = cursor.rowcount
+            await db.execute(f"""
+                UPDATE leaderboard_scores SET score = {LEADERBOARD_SCORE_SQL}
+                WHERE score != {LEADERBOARD_SCORE_SQL}
+            """)
+            await db.commit()
+        return refreshed
+    
+    async def check_leaderboard(self, guild_id: int, repair: bool = False) -> Dict[str, Any]:
+        """Compare stored leaderboard scores with a live evaluation of the formula.
+        
+        ``days_active`` is only refreshed on a schedule, so a one-day lag is
+        counted as stale rather than as a mismatch. With ``repair`` the guild's
+        rows are rebuilt when anything disagrees.
+        """
+        async with self.reader() as db:
+            cursor = await db.execute("""
+                SELECT
+                    u.user_id,
                     CAST((julianday('now') - julianday(COALESCE(gm.joined_at, u.first_seen))) AS INTEGER) AS days_active,
                     (
-                        SELECT COUNT(DISTINCT rc2.role_id)
-                        FROM role_changes rc2
-                        INNER JOIN (
-                            SELECT role_id, user_id, MAX(changed_at) AS latest
-                            FROM role_changes
-                            WHERE user_id = u.user_id AND guild_id = ?
-                            GROUP BY role_id, user_id
-                        ) latest_rc ON rc2.role_id = latest_rc.role_id
-                               AND rc2.user_id = latest_rc.user_id
-                               AND rc2.changed_at = latest_rc.latest
-                        WHERE rc2.action IN ('added', 'initial')
+                        SELECT COUNT(*) FROM member_roles
+                        WHERE user_id = u.user_id AND guild_id = ?
                     ) AS current_role_count,
                     (
                         SELECT COUNT(*) FROM role_changes
                         WHERE user_id = u.user_id AND guild_id = ?
+                    ) + (
+                        SELECT COALESCE(SUM(rows), 0) FROM archived_user_counts
+                        WHERE user_id = u.user_id AND guild_id = ? AND table_name = 'role_changes'
                     ) AS total_role_changes
                 FROM users u
                 LEFT JOIN guild_members gm ON u.user_id = gm.user_id AND gm.guild_id = ?
                 WHERE gm.is_active = 1
-                ORDER BY (
-                    CAST((julianday('now') - julianday(COALESCE(gm.joined_at, u.first_seen))) AS INTEGER) * 2
-                    + (
-                        SELECT COUNT(DISTINCT rc2.role_id)
-                        FROM role_changes rc2
-                        INNER JOIN (
-                            SELECT role_id, user_id, MAX(changed_at) AS latest
-                            FROM role_changes WHERE user_id = u.user_id AND guild_id = ?
-                            GROUP BY role_id, user_id
-                        ) latest_rc2 ON rc2.role_id = latest_rc2.role_id
-                               AND rc2.user_id = latest_rc2.user_id
-                               AND rc2.changed_at = latest_rc2.latest
-                        WHERE rc2.action IN ('added', 'initial')
-                    ) * 50
-                    + (SELECT COUNT(*) FROM role_changes WHERE user_id = u.user_id AND guild_id = ?) * 5
-                ) DESC
-                LIMIT ?
-            """, (guild_id, guild_id, guild_id, guild_id, guild_id, limit))
-            rows = await cursor.fetchall()
-            result = []
-            for i, r in enumerate(rows):
-                days = r[4] or 0
-                roles = r[5] or 0
-                changes = r[6] or 0
-                score = days * 2 + roles * 50 + changes * 5
-                result.append({
-                    "rank": i + 1,
-                    "user_id": str(r[0]),
-                    "username": r[1],
-                    "display_name": r[2],
-                    "avatar_url": r[3],
-                    "score": score,
-                    "days_active": days,
-                    "role_count": roles,
-                    "role_changes": changes,
-                })
-            return result
-
+            """, (guild_id, guild_id, guild_id, guild_id))
+            live = {r[0]: (r[1] or 0, r[2] or 0, r[3] or 0) for r in await cursor.fetchall()}
+            cursor = await db.execute("""
+                SELECT user_id, days_active, role_count, role_changes, score
+                FROM leaderboard_scores
+                WHERE guild_id = ? AND is_active = 1
+            """, (guild_id,))
+            stored = {r[0]: tuple(r[1:]) for r in await cursor.fetchall()}
+        
+        def describe(values):
+            if values is None:
+                return None
+            days, roles, changes = values[:3]
+            return {
+                'days_active': days,
+                'role_count': roles,
+                'role_changes': changes,
+                'score': values[3] if len(values) > 3 else self._leaderboard_score(days, roles, changes),
+            }
+        
+        mismatches = []
+        stale = 0
+        for user_id in sorted(live.keys() | stored.keys()):
+            expected = live.get(user_id)
+            actual = stored.get(user_id)
+            if expected is not None and actual is not None:
+                days, roles, changes = expected
+                s_days, s_roles, s_changes, s_score = actual
+                if (
+                    (roles, changes) == (s_roles, s_changes)
+                    and abs(days - s_days) <= 1
+                    and s_score == self._leaderboard_score(s_days, s_roles, s_changes)
+                ):
+                    if days != s_days:
+                        stale += 1
+                    continue
+            mismatches.append({
+                'user_id': str(user_id),
+                'expected': describe(expected),
+                'stored': describe(actual),
+            })
+        
+        repaired = False
+        if repair and (mismatches or stale):
+            await self.rebuild_leaderboard(guild_id)
+            repaired = True
+        
+        if mismatches:
+            logger.warning(f"Leaderboard check for guild {guild_id}: {len(mismatches)} of {len(live)} members disagree")
+        
+        return {
+            'checked': len(live),
+            'mismatches': len(mismatches),
+            'stale_days': stale,
+            'samples': mismatches[:10],
+            'repaired': repaired,
+        }
+    
     # ── Landing Stats (public) ─────────────────────────────────────────────
 
     async def get_landing_stats(self, guild_id: int) -> dict:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.reader() as db:
             cursor = await db.execute(
                 "SELECT COUNT(*) FROM guild_members WHERE guild_id = ? AND is_active = 1",
                 (guild_id,)
@@ -1416,6 +2678,6 @@ class Database:
             return {"member_count": member_count, "role_count": role_count, "days_active": days_active}
 
     async def close(self):
-        """Close database connections"""
-        # aiosqlite handles connection closing automatically
-        pass
+        """Flush queued writes and close database connections"""
+        await self.write_queue.close()
+        await self.pool.close()
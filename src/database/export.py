@@ -0,0 +1,41 @@
+import gzip
+import json
+from contextlib import aclosing
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, BinaryIO, Dict, Tuple
+
+# Exports larger than this (compressed) move from memory to a temp file on disk
+EXPORT_SPOOL_BYTES = 4 * 1024 * 1024
+
+
+async def write_ndjson_gzip(rows: AsyncIterator[Dict[str, Any]], fileobj: BinaryIO) -> Dict[str, int]:
+    """Write rows as gzip-compressed NDJSON; returns rows written per table.
+
+    Each row is encoded and compressed as it arrives, so only the current row
+    and the compressor's window are held in memory.
+    """
+    counts: Dict[str, int] = {}
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as archive:
+        async with aclosing(rows):
+            async for row in rows:
+                archive.write(json.dumps(row, default=str).encode() + b'\n')
+                counts[row['table']] = counts.get(row['table'], 0) + 1
+    return counts
+
+
+async def spool_ndjson_gzip(
+    rows: AsyncIterator[Dict[str, Any]],
+    max_memory: int = EXPORT_SPOOL_BYTES,
+) -> Tuple[SpooledTemporaryFile, Dict[str, int]]:
+    """Compress rows into a spooled temp file, rewound and ready to upload.
+
+    The caller owns the returned file and must close it.
+    """
+    spool = SpooledTemporaryFile(max_size=max_memory, mode='w+b')
+    try:
+        counts = await write_ndjson_gzip(rows, spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, counts
@@ -0,0 +1,172 @@
+import asyncio
+import functools
+import inspect
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Sized
+from contextvars import ContextVar, copy_context
+from typing import Any, Coroutine, Dict, List, Optional
+
+# Upper bounds of the latency histogram buckets in milliseconds; slower calls
+# land in a final overflow bucket
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Connection-acquire seconds of the instrumented call running in this task,
+# as a one-element list so the pool can add to it in place; None outside any
+# instrumented call, which is also how nested calls recognize themselves
+_acquire_wait: ContextVar[Optional[List[float]]] = ContextVar('database_acquire_wait', default=None)
+
+
+def record_acquire(wait: float):
+    """Charge a pool acquire wait to the instrumented call that is borrowing the connection"""
+    current = _acquire_wait.get()
+    if current is not None:
+        current[0] += wait
+
+
+def start_background_task(coro: Coroutine, name: str) -> asyncio.Task:
+    """Start a long-lived task outside the instrumented call that spawns it.
+
+    Tasks copy the caller's context, so a task started by ``initialize()``
+    would otherwise look nested forever: its own instrumented calls would go
+    unrecorded and its acquire waits would be charged to the finished caller.
+    """
+    context = copy_context()
+    context.run(_acquire_wait.set, None)
+    return asyncio.create_task(coro, name=name, context=context)
+
+
+class MethodMetrics:
+    """Call count, latency histogram, rows and acquire time for one method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.acquire_total = 0.0
+        self.acquire_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed: float, rows: int, acquire: float, failed: bool):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.rows += rows
+        self.acquire_total += acquire
+        if acquire > self.acquire_max:
+            self.acquire_max = acquire
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed * 1000)] += 1
+
+    def _percentile_ms(self, fraction: float) -> float:
+        # Upper bound of the bucket holding the percentile; the overflow bucket reports max
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, round(self.max * 1000, 3))
+        return round(self.max * 1000, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        calls = self.calls or 1
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total / calls * 1000, 3),
+            'p50_ms': self._percentile_ms(0.5),
+            'p95_ms': self._percentile_ms(0.95),
+            'p99_ms': self._percentile_ms(0.99),
+            'max_ms': round(self.max * 1000, 3),
+            'rows': self.rows,
+            'avg_rows': round(self.rows / calls, 1),
+            'avg_acquire_ms': round(self.acquire_total / calls * 1000, 3),
+            'max_acquire_ms': round(self.acquire_max * 1000, 3),
+            'histogram': {
+                **{f"le_{bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                'overflow': self.buckets[-1],
+            },
+        }
+
+
+class QueryMetrics:
+    """Per-method timings of a storage backend, filled in by ``@instrumented``.
+
+    Disabled metrics (``DATABASE_METRICS=false``) cost one attribute check per
+    call. Only the outermost instrumented call is recorded: a method called
+    from another one (``get_user_stats`` calling ``get_users_stats``) counts
+    towards its caller, so per-method totals add up to the time spent in the
+    database layer. Rows are the length of a returned collection, so a dict
+    keyed by user counts its users (0 for strings and scalars); acquire time is the wait for pooled connections during the
+    call.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.methods: Dict[str, MethodMetrics] = {}
+        self.started = time.time()
+
+    @classmethod
+    def from_env(cls) -> 'QueryMetrics':
+        return cls(enabled=os.getenv('DATABASE_METRICS', 'true').lower() == 'true')
+
+    def record(self, name: str, elapsed: float, rows: int, acquire: float, failed: bool):
+        method = self.methods.get(name)
+        if method is None:
+            method = self.methods[name] = MethodMetrics()
+        method.record(elapsed, rows, acquire, failed)
+
+    def reset(self):
+        self.methods.clear()
+        self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Metrics per method, most total time first"""
+        methods = sorted(self.methods.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            'enabled': self.enabled,
+            'since': self.started,
+            'methods': {name: method.snapshot() for name, method in methods},
+        }
+
+
+def _row_count(result: Any) -> int:
+    if isinstance(result, Sized) and not isinstance(result, (str, bytes)):
+        return len(result)
+    return 0
+
+
+def _timed(name: str, method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        metrics = self.query_metrics
+        if not metrics.enabled or _acquire_wait.get() is not None:
+            return await method(self, *args, **kwargs)
+        acquire = [0.0]
+        token = _acquire_wait.set(acquire)
+        started = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = await method(self, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            _acquire_wait.reset(token)
+            metrics.record(name, elapsed, _row_count(result), acquire[0], failed)
+    return wrapper
+
+
+def instrumented(cls):
+    """Class decorator: time every public coroutine method the class defines"""
+    for name, member in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.iscoroutinefunction(member):
+            setattr(cls, name, _timed(name, member))
+    return cls
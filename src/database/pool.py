@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+
+from .instrumentation import record_acquire
+from .slow_queries import SlowQueryLog
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StorageProfile:
+    """SQLite settings applied to every pooled connection.
+
+    WAL lets the API keep reading while the bot writes; ``synchronous=NORMAL``
+    is durable across application crashes in WAL mode and only skips the fsync
+    on every commit.
+    """
+    journal_mode: str = 'wal'
+    synchronous: str = 'normal'
+    busy_timeout_ms: int = 5000
+    cache_size_kib: int = 16384
+    mmap_size: int = 128 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> 'StorageProfile':
+        return cls(
+            journal_mode=os.getenv('DATABASE_JOURNAL_MODE', cls.journal_mode).lower(),
+            synchronous=os.getenv('DATABASE_SYNCHRONOUS', cls.synchronous).lower(),
+            busy_timeout_ms=int(os.getenv('DATABASE_BUSY_TIMEOUT_MS', cls.busy_timeout_ms)),
+            cache_size_kib=int(os.getenv('DATABASE_CACHE_SIZE_KIB', cls.cache_size_kib)),
+            mmap_size=int(os.getenv('DATABASE_MMAP_SIZE', cls.mmap_size)),
+        )
+
+    def connection_pragmas(self) -> List[str]:
+        # journal_mode is persisted in the file and is set once by the writer
+        return [
+            f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA cache_size = -{int(self.cache_size_kib)}",
+            f"PRAGMA mmap_size = {int(self.mmap_size)}",
+        ]
+
+
+class PoolMetrics:
+    """Acquire counters and wait times for one side of the pool"""
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquisitions += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        avg = self.total_wait / self.acquisitions if self.acquisitions else 0.0
+        return {
+            'acquisitions': self.acquisitions,
+            'waiting': self.waiting,
+            'avg_wait_ms': round(avg * 1000, 3),
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+        }
+
+
+class ReadOnlyDatabaseError(RuntimeError):
+    """A write was attempted on a pool opened without a writer"""
+
+
+class ConnectionPool:
+    """Long-lived aiosqlite connections: one serialized writer and N readers.
+
+    Every aiosqlite connection owns a worker thread, so opening one per call
+    is expensive. The pool opens them once in ``open()`` and hands them out
+    until ``close()``. Readers are always opened with ``mode=ro``; a
+    ``read_only`` pool has no writer at all and never touches the schema.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        readers: int = 4,
+        storage: Optional[StorageProfile] = None,
+        read_only: bool = False,
+        slow_queries: Optional[SlowQueryLog] = None,
+    ):
+        if readers < 1:
+            raise ValueError("Connection pool needs at least one reader")
+        self.db_path = Path(db_path)
+        self.size = readers
+        self.storage = storage or StorageProfile()
+        self.read_only = read_only
+        self.slow_queries = slow_queries
+        self._open = False
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self.write_metrics = PoolMetrics()
+        self.read_metrics = PoolMetrics()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        options = {}
+        if self.slow_queries is not None and self.slow_queries.enabled:
+            options['factory'] = self.slow_queries.connection_factory()
+        if read_only:
+            conn = await aiosqlite.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, **options)
+        else:
+            conn = await aiosqlite.connect(self.db_path, **options)
+        for pragma in self.storage.connection_pragmas():
+            await conn.execute(pragma)
+        return conn
+
+    async def open(self):
+        """Open the writer and all reader connections"""
+        if self.is_open:
+            return
+        try:
+            if not self.read_only:
+                self._writer = await self._connect(read_only=False)
+                cursor = await self._writer.execute(f"PRAGMA journal_mode = {self.storage.journal_mode}")
+                journal_mode = (await cursor.fetchone())[0]
+                if journal_mode.lower() != self.storage.journal_mode:
+                    logger.warning(f"Requested journal_mode={self.storage.journal_mode}, SQLite kept {journal_mode}")
+            elif not self.db_path.exists():
+                raise FileNotFoundError(f"Read-only database {self.db_path} does not exist")
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                conn = await self._connect(read_only=True)
+                self._readers.append(conn)
+                self._idle.put_nowait(conn)
+        except BaseException:
+            # Each aiosqlite connection owns a thread that would keep the process alive
+            await self._close_connections()
+            raise
+        self._open = True
+        writers = 0 if self.read_only else 1
+        logger.info(f"Opened connection pool for {self.db_path} ({writers} writer, {self.size} readers)")
+
+    async def _close_connections(self):
+        for conn in self._readers:
+            await conn.close()
+        self._readers.clear()
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def close(self):
+        """Wait for borrowed connections to come back, then close everything"""
+        if not self.is_open:
+            return
+        async with self._write_lock:
+            for _ in range(len(self._readers)):
+                await self._idle.get()
+            await self._close_connections()
+            self._open = False
+        logger.info(f"Closed connection pool for {self.db_path}")
+
+    def _check_open(self):
+        if not self.is_open:
+            raise RuntimeError("Connection pool is not open; call Database.initialize() first")
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow the writer connection; concurrent writers queue up behind a lock"""
+        self._check_open()
+        if self.read_only:
+            raise ReadOnlyDatabaseError(f"Database {self.db_path} was opened read-only")
+        started = time.perf_counter()
+        self.write_metrics.waiting += 1
+        try:
+            await self._write_lock.acquire()
+        finally:
+            self.write_metrics.waiting -= 1
+        wait = time.perf_counter() - started
+        self.write_metrics.record(wait)
+        record_acquire(wait)
+        try:
+            yield self._writer
+        except BaseException:
+            # Never leave a half-finished transaction for the next borrower to commit
+            await self._writer.rollback()
+            raise
+        finally:
+            self._write_lock.release()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow an idle reader connection, waiting if all are in use"""
+        self._check_open()
+        started = time.perf_counter()
+        self.read_metrics.waiting += 1
+        try:
+            conn = await self._idle.get()
+        finally:
+            self.read_metrics.waiting -= 1
+        wait = time.perf_counter() - started
+        self.read_metrics.record(wait)
+        record_acquire(wait)
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'read_only': self.read_only,
+            'readers': self.size,
+            'idle_readers': self._idle.qsize() if self._idle else 0,
+            'writer': self.write_metrics.snapshot(),
+            'reader': self.read_metrics.snapshot(),
+        }
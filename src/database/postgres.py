@@ -0,0 +1,1251 @@
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+import discord
+
+from .backend import LAST_SEEN_RESOLUTION_SECONDS, TrackingBackend
+from .database import CHANGE_EVENT_TYPES, LEADERBOARD_SCORE_SQL, ROLE_CACHE_SQL, TABLE_COUNTERS
+from .instrumentation import instrumented, record_acquire
+from .timestamps import from_epoch_ms, to_epoch_ms
+from .write_queue import Statement
+
+logger = logging.getLogger(__name__)
+
+# Timestamps are stored as naive UTC, like the SQLite file
+UTC_NOW = "(now() AT TIME ZONE 'utc')"
+
+# Held while the schema is created so several processes can start at once
+SCHEMA_LOCK_ID = 0x52514D31
+
+SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS users (
+        user_id BIGINT PRIMARY KEY,
+        username TEXT NOT NULL,
+        discriminator TEXT,
+        display_name TEXT,
+        avatar_url TEXT,
+        created_at TIMESTAMP,
+        first_seen TIMESTAMP DEFAULT {UTC_NOW},
+        last_seen TIMESTAMP DEFAULT {UTC_NOW},
+        is_bot BOOLEAN DEFAULT FALSE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS guild_members (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        joined_at TIMESTAMP,
+        nickname TEXT,
+        is_active BOOLEAN DEFAULT TRUE,
+        UNIQUE (guild_id, user_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS roles (
+        role_id BIGINT PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        name TEXT NOT NULL,
+        color INTEGER NOT NULL DEFAULT 0,
+        position INTEGER DEFAULT 0,
+        permissions TEXT DEFAULT '0',
+        is_hoisted BOOLEAN DEFAULT FALSE,
+        is_mentionable BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT {UTC_NOW},
+        updated_at TIMESTAMP DEFAULT {UTC_NOW}
+    )
+    """,
+    # History tables only carry the epoch-millisecond ts the SQLite queries use
+    """
+    CREATE TABLE IF NOT EXISTS username_changes (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        old_username TEXT NOT NULL,
+        new_username TEXT NOT NULL,
+        ts BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nickname_changes (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        old_nickname TEXT,
+        new_nickname TEXT,
+        ts BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS role_changes (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        role_id BIGINT NOT NULL,
+        action TEXT NOT NULL, -- 'added', 'removed', or 'initial'
+        ts BIGINT NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS member_roles (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        role_id BIGINT NOT NULL,
+        since TIMESTAMP DEFAULT {UTC_NOW},
+        PRIMARY KEY (guild_id, user_id, role_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS join_leave_events (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        event_type TEXT NOT NULL, -- 'join' or 'leave'
+        ts BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        id BIGSERIAL PRIMARY KEY,
+        type TEXT NOT NULL, -- 'username', 'nickname', 'role', 'join' or 'leave'
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        payload JSONB,
+        ts BIGINT NOT NULL -- Unix epoch milliseconds
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS member_fingerprints (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT {UTC_NOW},
+        PRIMARY KEY (guild_id, user_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS scheduled_messages (
+        id BIGSERIAL PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        name TEXT NOT NULL,
+        channel_id BIGINT NOT NULL,
+        message TEXT NOT NULL,
+        role_ids TEXT,
+        interval_days INTEGER DEFAULT 0,
+        interval_hours INTEGER DEFAULT 0,
+        interval_minutes INTEGER DEFAULT 60,
+        next_run TIMESTAMP NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT {UTC_NOW},
+        created_by BIGINT,
+        last_sent TIMESTAMP,
+        embed_title TEXT,
+        embed_color INTEGER DEFAULT 3447003
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS user_game_profiles (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        game_name TEXT NOT NULL,
+        character_name TEXT NOT NULL,
+        server TEXT,
+        role_class TEXT,
+        updated_at TIMESTAMP DEFAULT {UTC_NOW},
+        UNIQUE (user_id, game_name)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS news_posts (
+        id BIGSERIAL PRIMARY KEY,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        discord_message_id TEXT,
+        author_id BIGINT,
+        author_name TEXT,
+        posted_at TIMESTAMP DEFAULT {UTC_NOW}
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS clan_achievements (
+        id BIGSERIAL PRIMARY KEY,
+        game_name TEXT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        achieved_at DATE,
+        created_by BIGINT,
+        created_at TIMESTAMP DEFAULT {UTC_NOW}
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+    "CREATE INDEX IF NOT EXISTS idx_guild_members_user ON guild_members (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_roles_guild ON roles (guild_id)",
+    "CREATE INDEX IF NOT EXISTS idx_member_roles_role ON member_roles (guild_id, role_id)",
+    "CREATE INDEX IF NOT EXISTS idx_username_changes_user_ts ON username_changes (user_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_nickname_changes_user ON nickname_changes (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_nickname_changes_guild_ts ON nickname_changes (guild_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_role_changes_user ON role_changes (user_id, guild_id)",
+    "CREATE INDEX IF NOT EXISTS idx_role_changes_guild_ts ON role_changes (guild_id, ts)",
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_role_changes_initial
+    ON role_changes (guild_id, user_id, role_id) WHERE action = 'initial'
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_join_leave_events_guild_ts ON join_leave_events (guild_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_events_guild_ts ON events (guild_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_scheduled_messages_guild ON scheduled_messages (guild_id)",
+    "CREATE INDEX IF NOT EXISTS idx_scheduled_messages_next_run ON scheduled_messages (next_run)",
+    "CREATE INDEX IF NOT EXISTS idx_achievements_game ON clan_achievements (game_name)",
+]
+
+# Trigram indexes behind the ILIKE user search; skipped when pg_trgm cannot be installed
+SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_users_display_name_trgm ON users USING gin (display_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_guild_members_nickname_trgm ON guild_members USING gin (nickname gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_roles_name_trgm ON roles USING gin (name gin_trgm_ops)",
+]
+
+UPSERT_ROLE_SQL = f"""
+    INSERT INTO roles
+    (role_id, guild_id, name, color, position, permissions, is_hoisted, is_mentionable, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, {UTC_NOW})
+    ON CONFLICT (role_id) DO UPDATE SET
+        guild_id = excluded.guild_id,
+        name = excluded.name,
+        color = excluded.color,
+        position = excluded.position,
+        permissions = excluded.permissions,
+        is_hoisted = excluded.is_hoisted,
+        is_mentionable = excluded.is_mentionable,
+        updated_at = excluded.updated_at
+    WHERE (roles.guild_id, roles.name, roles.color, roles.position, roles.permissions,
+           roles.is_hoisted, roles.is_mentionable)
+          IS DISTINCT FROM (excluded.guild_id, excluded.name, excluded.color, excluded.position,
+                            excluded.permissions, excluded.is_hoisted, excluded.is_mentionable)
+"""
+
+UPSERT_USER_SQL = f"""
+    INSERT INTO users
+    (user_id, username, discriminator, display_name, avatar_url, created_at, last_seen, is_bot)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = excluded.username,
+        discriminator = excluded.discriminator,
+        display_name = excluded.display_name,
+        avatar_url = excluded.avatar_url,
+        created_at = excluded.created_at,
+        last_seen = excluded.last_seen,
+        is_bot = excluded.is_bot
+    WHERE (users.username, users.discriminator, users.display_name, users.avatar_url,
+           users.created_at, users.is_bot)
+          IS DISTINCT FROM (excluded.username, excluded.discriminator, excluded.display_name,
+                            excluded.avatar_url, excluded.created_at, excluded.is_bot)
+       OR users.last_seen IS NULL
+       OR excluded.last_seen - users.last_seen > interval '{LAST_SEEN_RESOLUTION_SECONDS} seconds'
+"""
+
+UPSERT_MEMBER_SQL = """
+    INSERT INTO guild_members (guild_id, user_id, joined_at, nickname, is_active)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET
+        joined_at = excluded.joined_at,
+        nickname = excluded.nickname,
+        is_active = excluded.is_active
+    WHERE (guild_members.joined_at, guild_members.nickname, guild_members.is_active)
+          IS DISTINCT FROM (excluded.joined_at, excluded.nickname, excluded.is_active)
+"""
+
+# Only for roles with no history at all; idx_role_changes_initial turns a
+# concurrent duplicate into a no-op (params: guild_id, user_id, role_id, ts)
+INSERT_INITIAL_ROLE_SQL = """
+    INSERT INTO role_changes (guild_id, user_id, role_id, action, ts)
+    SELECT $1, $2, $3, 'initial', $4
+    WHERE NOT EXISTS (
+        SELECT 1 FROM role_changes WHERE user_id = $2 AND guild_id = $1 AND role_id = $3
+    )
+    ON CONFLICT DO NOTHING
+"""
+
+INSERT_ROLE_CHANGE_SQL = """
+    INSERT INTO role_changes (guild_id, user_id, role_id, action, ts)
+    VALUES ($1, $2, $3, $4, $5)
+"""
+
+GRANT_MEMBER_ROLE_SQL = """
+    INSERT INTO member_roles (guild_id, user_id, role_id, since)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT DO NOTHING
+"""
+
+REVOKE_MEMBER_ROLE_SQL = """
+    DELETE FROM member_roles WHERE guild_id = $1 AND user_id = $2 AND role_id = $3
+"""
+
+UPSERT_FINGERPRINT_SQL = f"""
+    INSERT INTO member_fingerprints (guild_id, user_id, fingerprint, updated_at)
+    VALUES ($1, $2, $3, {UTC_NOW})
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET
+        fingerprint = excluded.fingerprint,
+        updated_at = excluded.updated_at
+"""
+
+INSERT_EVENT_SQL = """
+    INSERT INTO events (type, guild_id, user_id, payload, ts)
+    VALUES ($1, $2, $3, $4, $5)
+"""
+
+# Username changes are global; log one event per guild the user belongs to
+# (params: payload JSON, ts, user_id)
+INSERT_USER_EVENT_SQL = """
+    INSERT INTO events (type, guild_id, user_id, payload, ts)
+    SELECT 'username', guild_id, user_id, $1, $2 FROM guild_members WHERE user_id = $3
+"""
+
+# Community score, computed on read: Postgres has no single-writer bottleneck
+# to work around, so there is no leaderboard_scores table to keep in sync
+LEADERBOARD_SQL = f"""
+    SELECT user_id, username, display_name, avatar_url,
+           {LEADERBOARD_SCORE_SQL} AS score, days_active, role_count, role_changes
+    FROM (
+        SELECT
+            gm.user_id,
+            u.username,
+            u.display_name,
+            u.avatar_url,
+            COALESCE(
+                FLOOR(EXTRACT(EPOCH FROM {UTC_NOW} - COALESCE(gm.joined_at, u.first_seen)) / 86400), 0
+            )::INTEGER AS days_active,
+            (
+                SELECT COUNT(*) FROM member_roles mr
+                WHERE mr.guild_id = gm.guild_id AND mr.user_id = gm.user_id
+            ) AS role_count,
+            (
+                SELECT COUNT(*) FROM role_changes rc
+                WHERE rc.guild_id = gm.guild_id AND rc.user_id = gm.user_id
+            ) AS role_changes
+        FROM guild_members gm
+        INNER JOIN users u ON u.user_id = gm.user_id
+        WHERE gm.guild_id = $1 AND gm.is_active
+    ) members
+    ORDER BY score DESC
+    LIMIT $2
+"""
+
+# UTC day of an event, for the activity rollups SQLite keeps in daily_activity
+EVENT_DAY_SQL = "(to_timestamp(ts / 1000.0) AT TIME ZONE 'utc')"
+
+
+def _pg_value(value: Any) -> Any:
+    """Aware datetimes (discord.py's created_at/joined_at) as naive UTC"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _pg_row(row: tuple) -> tuple:
+    return tuple(_pg_value(value) for value in row)
+
+
+def _rowcount(status: str) -> int:
+    """Row count of a command status such as ``DELETE 1``"""
+    return int(status.split()[-1])
+
+
+@instrumented
+class PostgresDatabase(TrackingBackend):
+    """PostgreSQL backend (asyncpg) for deployments that run the API on several hosts.
+
+    The schema mirrors the SQLite one, with BIGINT ids and naive UTC
+    timestamps. Postgres takes concurrent writers, so tracking events are
+    written directly rather than through the write-behind queue, and
+    aggregates the SQLite file precomputes (daily rollups, leaderboard
+    scores, table counters, search documents) are computed at read time.
+    """
+
+    upsert_role_sql = UPSERT_ROLE_SQL
+    upsert_user_sql = UPSERT_USER_SQL
+    upsert_member_sql = UPSERT_MEMBER_SQL
+
+    def __init__(self, dsn: str, pool_size: Optional[int] = None):
+        super().__init__()
+        self.dsn = dsn
+        if pool_size is None:
+            pool_size = int(os.getenv('DATABASE_POOL_SIZE', '4'))
+        self.pool_size = pool_size
+        self.pool: Optional[asyncpg.Pool] = None
+        # Resolved by initialize(): whether the pg_trgm search indexes exist
+        self.search_trgm = False
+
+    # === Lifecycle ===
+
+    async def initialize(self):
+        """Open the connection pool and create the schema"""
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+        async with self._connection() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                for statement in SCHEMA:
+                    await conn.execute(statement)
+                self.search_trgm = await self._create_search_indexes(conn)
+            rows = await conn.fetch(ROLE_CACHE_SQL)
+        self.roles.load(tuple(row) for row in rows)
+        logger.info(f"PostgreSQL database initialized (pool of {self.pool_size})")
+
+    async def _create_search_indexes(self, conn: asyncpg.Connection) -> bool:
+        """Trigram indexes for search; False when pg_trgm is unavailable to this role"""
+        try:
+            async with conn.transaction():
+                await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for statement in SEARCH_INDEXES:
+                    await conn.execute(statement)
+            return True
+        except asyncpg.PostgresError as e:
+            logger.warning(f"pg_trgm not available, user search will scan: {e}")
+            return False
+
+    async def close(self):
+        """Close all pooled connections"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[asyncpg.Connection]:
+        """Borrow a pooled connection, recording the acquire wait"""
+        started = perf_counter()
+        async with self.pool.acquire() as conn:
+            record_acquire(perf_counter() - started)
+            yield conn
+
+    async def flush(self):
+        """Writes are committed before the log_* methods return; nothing is buffered"""
+
+    async def _execute(self, statements: List[Statement]):
+        """Run statements in one transaction"""
+        if not statements:
+            return
+        try:
+            async with self._connection() as conn:
+                async with conn.transaction():
+                    for sql, params in statements:
+                        await conn.execute(sql, *_pg_row(params))
+        except Exception:
+            self._forget_statements(statements)
+            raise
+
+    def _event_statement(
+        self,
+        event_type: str,
+        guild_id: int,
+        user_id: int,
+        payload: Optional[dict] = None,
+        ts: Optional[int] = None,
+    ) -> Statement:
+        return (INSERT_EVENT_SQL, (
+            event_type,
+            guild_id,
+            user_id,
+            json.dumps(payload) if payload is not None else None,
+            ts if ts is not None else to_epoch_ms()
+        ))
+
+    # === Tracking writes ===
+
+    async def upsert_role(self, role: discord.Role):
+        """Insert or update role information"""
+        await self._execute(self._role_statements(role))
+
+    async def log_role_update(self, role: discord.Role):
+        """Store a created or edited role (search reads role names live, so a rename needs nothing else)"""
+        await self._execute(self._role_statements(role))
+
+    async def upsert_user(self, user: discord.User | discord.Member):
+        """Insert or update user information"""
+        await self._execute(self._user_statements(user))
+
+    async def upsert_guild_member(self, member: discord.Member):
+        """Insert or update guild member information"""
+        await self._execute(self._member_statements(member))
+
+    async def log_username_change(self, before: discord.User, after: discord.User):
+        """Log a username change"""
+        ts = to_epoch_ms()
+        await self._execute(self._user_statements(after) + [
+            ("""
+                INSERT INTO username_changes (user_id, old_username, new_username, ts)
+                VALUES ($1, $2, $3, $4)
+            """, (after.id, before.name, after.name, ts)),
+            (INSERT_USER_EVENT_SQL, (json.dumps({'old': before.name, 'new': after.name}), ts, after.id)),
+        ])
+
+    async def log_nickname_change(self, before: discord.Member, after: discord.Member):
+        """Log a nickname change"""
+        ts = to_epoch_ms()
+        await self._execute(self._member_statements(after) + [
+            ("""
+                INSERT INTO nickname_changes (guild_id, user_id, old_nickname, new_nickname, ts)
+                VALUES ($1, $2, $3, $4, $5)
+            """, (after.guild.id, after.id, before.nick, after.nick, ts)),
+            self._event_statement('nickname', after.guild.id, after.id, {'old': before.nick, 'new': after.nick}, ts),
+        ])
+
+    async def log_role_change(self, before: discord.Member, after: discord.Member):
+        """Log role changes"""
+        statements = self._member_statements(after)
+
+        before_roles = set(role.id for role in before.roles)
+        after_roles = set(role.id for role in after.roles)
+        added_roles = after_roles - before_roles
+        removed_roles = before_roles - after_roles
+
+        # Ensure roles exist in roles table first
+        for role_id in added_roles | removed_roles:
+            role = after.guild.get_role(role_id) or before.guild.get_role(role_id)
+            if role:
+                statements += self._role_statements(role)
+
+        now = datetime.utcnow()
+        ts = to_epoch_ms(now)
+        for role_id in added_roles:
+            statements += [
+                (INSERT_ROLE_CHANGE_SQL, (after.guild.id, after.id, role_id, 'added', ts)),
+                self._event_statement('role', after.guild.id, after.id, {'role_id': role_id, 'action': 'added'}, ts),
+                (GRANT_MEMBER_ROLE_SQL, (after.guild.id, after.id, role_id, now)),
+            ]
+        for role_id in removed_roles:
+            statements += [
+                (INSERT_ROLE_CHANGE_SQL, (after.guild.id, after.id, role_id, 'removed', ts)),
+                self._event_statement('role', after.guild.id, after.id, {'role_id': role_id, 'action': 'removed'}, ts),
+                (REVOKE_MEMBER_ROLE_SQL, (after.guild.id, after.id, role_id)),
+            ]
+
+        await self._execute(statements)
+
+    async def log_user_join(self, member: discord.Member):
+        """Log when a user joins the guild"""
+        ts = to_epoch_ms()
+        await self._execute(self._member_statements(member) + [
+            ("""
+                INSERT INTO join_leave_events (guild_id, user_id, event_type, ts)
+                VALUES ($1, $2, 'join', $3)
+            """, (member.guild.id, member.id, ts)),
+            self._event_statement('join', member.guild.id, member.id, ts=ts),
+        ])
+
+    async def log_user_leave(self, member: discord.Member):
+        """Log when a user leaves the guild"""
+        ts = to_epoch_ms()
+        # The cached row still says active; a rejoin must write again
+        self.member_rows.invalidate((member.guild.id, member.id))
+        await self._execute([
+            ("""
+                UPDATE guild_members SET is_active = FALSE
+                WHERE guild_id = $1 AND user_id = $2
+            """, (member.guild.id, member.id)),
+            ("""
+                INSERT INTO join_leave_events (guild_id, user_id, event_type, ts)
+                VALUES ($1, $2, 'leave', $3)
+            """, (member.guild.id, member.id, ts)),
+            self._event_statement('leave', member.guild.id, member.id, ts=ts),
+        ])
+
+    async def inventory_guild(self, guild: discord.Guild, members: List[discord.Member]) -> Dict[str, int]:
+        """Bulk-write a guild inventory in one transaction (see Database.inventory_guild)"""
+        async with self._connection() as conn:
+            known = dict(await conn.fetch(
+                "SELECT user_id, fingerprint FROM member_fingerprints WHERE guild_id = $1",
+                guild.id
+            ))
+
+            fingerprints = {member.id: self._member_fingerprint(member) for member in members}
+            changed = [member for member in members if known.get(member.id) != fingerprints[member.id]]
+
+            tracked = set()
+            current = set()
+            if changed:
+                rows = await conn.fetch(
+                    "SELECT DISTINCT user_id, role_id FROM role_changes WHERE guild_id = $1", guild.id
+                )
+                tracked = {tuple(row) for row in rows}
+                rows = await conn.fetch(
+                    "SELECT user_id, role_id FROM member_roles WHERE guild_id = $1", guild.id
+                )
+                current = {tuple(row) for row in rows}
+
+            now = datetime.utcnow()
+            rows = self._inventory_rows(guild, changed, fingerprints, tracked, current, now, to_epoch_ms(now))
+            try:
+                async with conn.transaction():
+                    for sql, batch in (
+                        (UPSERT_ROLE_SQL, rows['roles']),
+                        (UPSERT_USER_SQL, rows['users']),
+                        (UPSERT_MEMBER_SQL, rows['members']),
+                        # role_changes has no changed_at column here, only ts
+                        (INSERT_INITIAL_ROLE_SQL, [row[:3] + row[4:] for row in rows['initial']]),
+                        (GRANT_MEMBER_ROLE_SQL, rows['grant']),
+                        (REVOKE_MEMBER_ROLE_SQL, rows['revoke']),
+                        (UPSERT_FINGERPRINT_SQL, rows['fingerprints']),
+                    ):
+                        if batch:
+                            await conn.executemany(sql, [_pg_row(row) for row in batch])
+            except Exception:
+                self._forget_inventory(rows)
+                raise
+
+        self._remember_inventory(guild, changed, rows)
+
+        return {
+            'roles': len(rows['roles']),
+            'members': len(rows['members']),
+            'unchanged': len(members) - len(changed),
+            'initial_roles': len(rows['initial']),
+        }
+
+    # === Dashboard reads ===
+
+    async def get_user_stats(self, user_id) -> Dict[str, Any]:
+        """Get statistics for a specific user"""
+        return (await self.get_users_stats([int(user_id)])).get(int(user_id), {})
+
+    async def get_users_stats(self, user_ids: List[int], guild_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """Profile, change counts and last activity of several users, keyed by user id"""
+        user_ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+        if not user_ids:
+            return {}
+        guild_filter = "" if guild_id is None else " AND guild_id = $2"
+        guild_params = [] if guild_id is None else [guild_id]
+
+        async with self._connection() as conn:
+            profiles = {
+                r[0]: tuple(r[1:])
+                for r in await conn.fetch("""
+                    SELECT user_id, username, display_name, avatar_url, last_seen
+                    FROM users WHERE user_id = ANY($1::BIGINT[])
+                """, user_ids)
+            }
+            missing = [uid for uid in user_ids if uid not in profiles]
+            if missing:
+                for r in await conn.fetch(f"""
+                    SELECT user_id, MAX(nickname) FROM guild_members
+                    WHERE user_id = ANY($1::BIGINT[]){guild_filter}
+                    GROUP BY user_id
+                """, missing, *guild_params):
+                    profiles[r[0]] = (None, r[1], None, None)
+            if not profiles:
+                return {}
+
+            known = list(profiles)
+            counts: Dict[str, Dict[int, int]] = {}
+            for table, where, params in (
+                ('username_changes', "", []),
+                ('nickname_changes', guild_filter, guild_params),
+                ('role_changes', guild_filter + " AND action != 'initial'", guild_params),
+            ):
+                counts[table] = {
+                    r[0]: r[1]
+                    for r in await conn.fetch(f"""
+                        SELECT user_id, COUNT(*) FROM {table}
+                        WHERE user_id = ANY($1::BIGINT[]){where}
+                        GROUP BY user_id
+                    """, known, *params)
+                }
+
+        result = {}
+        for uid, (username, display_name, avatar_url, last_seen) in profiles.items():
+            fallback = f"User_{uid}"
+            result[uid] = {
+                'username': username or fallback,
+                'display_name': display_name or username or fallback,
+                'avatar_url': avatar_url,
+                'username_changes': counts['username_changes'].get(uid, 0),
+                'nickname_changes': counts['nickname_changes'].get(uid, 0),
+                'role_changes': counts['role_changes'].get(uid, 0),
+                'last_activity': last_seen,
+            }
+        return result
+
+    async def get_user_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Username, display name and avatar of a user, or None when unknown"""
+        async with self._connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT username, display_name, avatar_url FROM users WHERE user_id = $1", user_id
+            )
+            if not row:
+                nickname = await conn.fetchrow(
+                    "SELECT nickname FROM guild_members WHERE user_id = $1 LIMIT 1", user_id
+                )
+                if not nickname:
+                    return None
+                row = (None, nickname[0], None)
+        fallback = f"User_{user_id}"
+        return {
+            'username': row[0] or fallback,
+            'display_name': row[1] or row[0] or fallback,
+            'avatar_url': row[2],
+        }
+
+    def _event_range(self, guild_id: int, start: Optional[date], end: Optional[date]) -> tuple:
+        """WHERE clause and params selecting a guild's events between two UTC days (inclusive)"""
+        where = "guild_id = $1"
+        params: List[Any] = [guild_id]
+        if start is not None:
+            params.append(to_epoch_ms(datetime.combine(start, time.min)))
+            where += f" AND ts >= ${len(params)}"
+        if end is not None:
+            params.append(to_epoch_ms(datetime.combine(end + timedelta(days=1), time.min)))
+            where += f" AND ts < ${len(params)}"
+        return where, params
+
+    async def get_server_stats(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Member count, change totals (optionally between two days) and 24h activity, from the event log"""
+        where, params = self._event_range(guild_id, start, end)
+        async with self._connection() as conn:
+            total_users = await conn.fetchval(
+                "SELECT COUNT(DISTINCT user_id) FROM guild_members WHERE guild_id = $1", guild_id
+            )
+            totals = dict(await conn.fetch(f"""
+                SELECT type, COUNT(*) FROM events
+                WHERE {where} AND type IN ('username', 'nickname', 'role')
+                GROUP BY type
+            """, *params))
+            recent = dict(await conn.fetch("""
+                SELECT type, COUNT(*) FROM events
+                WHERE guild_id = $1 AND ts > $2 AND type IN ('join', 'leave', 'nickname')
+                GROUP BY type
+            """, guild_id, to_epoch_ms() - 86400 * 1000))
+        return {
+            'total_users': total_users,
+            'total_username_changes': totals.get('username', 0),
+            'total_nickname_changes': totals.get('nickname', 0),
+            'total_role_changes': totals.get('role', 0),
+            'new_members_24h': recent.get('join', 0),
+            'left_members_24h': recent.get('leave', 0),
+            'name_changes_24h': recent.get('nickname', 0)
+        }
+
+    async def get_recent_changes(
+        self,
+        guild_id: int,
+        limit: int = 10,
+        before: Optional[tuple] = None,
+    ) -> List[Dict[str, Any]]:
+        """Newest username, nickname and role changes, paged by a (ts, id) cursor"""
+        query = """
+            SELECT e.id, e.type, e.user_id, e.payload::text, e.ts,
+                   r.role_id, r.name, r.color,
+                   u.username, u.display_name, u.avatar_url
+            FROM events e
+            JOIN users u ON e.user_id = u.user_id
+            LEFT JOIN roles r ON e.type = 'role' AND r.role_id = (e.payload ->> 'role_id')::BIGINT
+            WHERE e.guild_id = $1 AND e.type = ANY($2::TEXT[])
+        """
+        params: List[Any] = [guild_id, list(CHANGE_EVENT_TYPES)]
+        if before is not None:
+            query += " AND (e.ts, e.id) < ($3::BIGINT, $4::BIGINT)"
+            params.extend(before)
+        params.append(limit)
+        query += f" ORDER BY e.ts DESC, e.id DESC LIMIT ${len(params)}"
+        async with self._connection() as conn:
+            rows = await conn.fetch(query, *params)
+        return [self._change_record(tuple(row)) for row in rows]
+
+    async def get_role_history(self, user_id, guild_id: int) -> List[Dict[str, Any]]:
+        """Get role change history for a user (excluding initial role assignments)"""
+        async with self._connection() as conn:
+            rows = await conn.fetch("""
+                SELECT rc.role_id, r.name, r.color, rc.action, rc.ts
+                FROM role_changes rc
+                INNER JOIN roles r ON rc.role_id = r.role_id
+                WHERE rc.user_id = $1 AND rc.guild_id = $2 AND rc.action != 'initial'
+                ORDER BY rc.ts DESC
+            """, int(user_id), guild_id)
+        return [
+            {
+                'role_id': row[0],
+                'role_name': row[1],
+                'role_color': row[2],
+                'action': row[3],
+                'timestamp': from_epoch_ms(row[4]),
+            }
+            for row in rows
+        ]
+
+    async def get_daily_activity(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Per-day activity counters for a guild, oldest day first (days without activity are omitted)"""
+        where, params = self._event_range(guild_id, start, end)
+        async with self._connection() as conn:
+            rows = await conn.fetch(f"""
+                SELECT to_char({EVENT_DAY_SQL}, 'YYYY-MM-DD') AS day,
+                       COUNT(*) FILTER (WHERE type = 'join'),
+                       COUNT(*) FILTER (WHERE type = 'leave'),
+                       COUNT(*) FILTER (WHERE type = 'username'),
+                       COUNT(*) FILTER (WHERE type = 'nickname'),
+                       COUNT(*) FILTER (WHERE type = 'role')
+                FROM events
+                WHERE {where}
+                GROUP BY day
+                ORDER BY day
+            """, *params)
+        return [
+            {
+                'day': row[0],
+                'joins': row[1],
+                'leaves': row[2],
+                'username_changes': row[3],
+                'nickname_changes': row[4],
+                'role_changes': row[5],
+            }
+            for row in rows
+        ]
+
+    async def get_weekly_activity(
+        self,
+        guild_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Get name and role changes per weekday, for the last 7 days unless a range is given"""
+        if start is None and end is None:
+            start = datetime.utcnow().date() - timedelta(days=6)
+        where, params = self._event_range(guild_id, start, end)
+        async with self._connection() as conn:
+            data_dict = dict(await conn.fetch(f"""
+                SELECT EXTRACT(DOW FROM {EVENT_DAY_SQL})::INTEGER AS day_number, COUNT(*)
+                FROM events
+                WHERE {where} AND type IN ('username', 'nickname', 'role')
+                GROUP BY day_number
+            """, *params))
+
+        days_order = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+        return [
+            {'name': day, 'changes': data_dict.get(number, 0)}
+            for number, day in enumerate(days_order)
+        ]
+
+    async def get_database_stats(self) -> Dict[str, int]:
+        """Get overall database statistics (excluding initial role assignments).
+
+        Counted live; Postgres has no trigger-maintained table_counters.
+        """
+        async with self._connection() as conn:
+            return {name: await conn.fetchval(query) for name, query in TABLE_COUNTERS.items()}
+
+    async def get_current_roles(self, user_id: int, guild_id: int) -> list:
+        """Roles a member currently holds, highest position first"""
+        async with self._connection() as conn:
+            rows = await conn.fetch("""
+                SELECT mr.role_id, r.name, r.color, r.position
+                FROM member_roles mr
+                INNER JOIN roles r ON mr.role_id = r.role_id
+                WHERE mr.guild_id = $1 AND mr.user_id = $2
+                ORDER BY r.position DESC
+            """, guild_id, user_id)
+        return [{"role_id": r[0], "role_name": r[1], "color": r[2], "position": r[3]} for r in rows]
+
+    async def get_current_roles_bulk(self, guild_id: int, user_ids: List[int]) -> Dict[int, list]:
+        """Current roles for several members, keyed by user id"""
+        if not user_ids:
+            return {}
+        async with self._connection() as conn:
+            rows = await conn.fetch("""
+                SELECT mr.user_id, mr.role_id, r.name, r.color, r.position
+                FROM member_roles mr
+                INNER JOIN roles r ON mr.role_id = r.role_id
+                WHERE mr.guild_id = $1 AND mr.user_id = ANY($2::BIGINT[])
+                ORDER BY mr.user_id, r.position DESC
+            """, guild_id, list(user_ids))
+        result: Dict[int, list] = {}
+        for r in rows:
+            result.setdefault(r[0], []).append(
+                {"role_id": r[1], "role_name": r[2], "color": r[3], "position": r[4]}
+            )
+        return result
+
+    async def search_users(
+        self,
+        query: str,
+        guild_id: Optional[int] = None,
+        role_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Search members by username, display name, nickname or current role name.
+
+        ILIKE over the live tables, served by the pg_trgm indexes when they
+        exist. Without a guild only usernames and display names are matched.
+        """
+        pattern = f"%{query}%"
+        if guild_id:
+            sql = """
+                SELECT u.user_id, u.username, u.display_name, u.avatar_url,
+                       u.last_seen, gm.nickname, gm.joined_at
+                FROM guild_members gm
+                INNER JOIN users u ON u.user_id = gm.user_id
+                WHERE gm.guild_id = $1 AND gm.is_active
+                AND (
+                    u.username ILIKE $2 OR u.display_name ILIKE $2 OR gm.nickname ILIKE $2
+                    OR EXISTS (
+                        SELECT 1 FROM member_roles mr
+                        INNER JOIN roles r ON r.role_id = mr.role_id
+                        WHERE mr.guild_id = gm.guild_id AND mr.user_id = gm.user_id AND r.name ILIKE $2
+                    )
+                )
+            """
+            params: List[Any] = [guild_id, pattern]
+            if role_id is not None:
+                params.append(role_id)
+                sql += f"""
+                    AND gm.user_id IN (
+                        SELECT user_id FROM member_roles
+                        WHERE guild_id = $1 AND role_id = ${len(params)}
+                    )
+                """
+        else:
+            sql = """
+                SELECT user_id, username, display_name, avatar_url, last_seen,
+                       NULL AS nickname, NULL AS joined_at
+                FROM users u
+                WHERE username ILIKE $1 OR display_name ILIKE $1
+            """
+            params = [pattern]
+        params.append(limit)
+        sql += f" ORDER BY u.last_seen DESC NULLS LAST LIMIT ${len(params)}"
+        async with self._connection() as conn:
+            rows = await conn.fetch(sql, *params)
+        return [
+            {
+                "user_id": row[0],
+                "username": row[1],
+                "display_name": row[2],
+                "avatar_url": row[3],
+                "last_seen": row[4],
+                "nickname": row[5],
+                "joined_at": row[6],
+            }
+            for row in rows
+        ]
+
+    async def get_guild_users(
+        self,
+        guild_id: int,
+        active_only: bool = True,
+        role_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Members of a guild, newest join first, optionally only holders of a role"""
+        query = """
+            SELECT u.user_id, u.username, u.display_name, u.avatar_url, gm.nickname, gm.joined_at
+            FROM users u
+            JOIN guild_members gm ON u.user_id = gm.user_id
+            WHERE gm.guild_id = $1
+        """
+        params: List[Any] = [guild_id]
+        if active_only:
+            query += " AND gm.is_active"
+        if role_id is not None:
+            params.append(role_id)
+            query += f"""
+                AND u.user_id IN (
+                    SELECT user_id FROM member_roles
+                    WHERE guild_id = $1 AND role_id = ${len(params)}
+                )
+            """
+        query += " ORDER BY gm.joined_at DESC NULLS LAST"
+        async with self._connection() as conn:
+            rows = await conn.fetch(query, *params)
+        return [
+            {
+                "user_id": row[0],
+                "username": row[1],
+                "display_name": row[2],
+                "avatar_url": row[3],
+                "nickname": row[4],
+                "joined_at": row[5],
+            }
+            for row in rows
+        ]
+
+    async def get_roles(self, guild_id: int, role_ids: List[int]) -> List[Dict[str, Any]]:
+        """Name and color of the given roles of a guild"""
+        if not role_ids:
+            return []
+        async with self._connection() as conn:
+            rows = await conn.fetch(
+                "SELECT role_id, name, color FROM roles WHERE role_id = ANY($1::BIGINT[]) AND guild_id = $2",
+                list(role_ids), guild_id
+            )
+        return [{'role_id': row[0], 'name': row[1], 'color': row[2]} for row in rows]
+
+    async def get_leaderboard(self, guild_id: int, limit: int = 50) -> list:
+        """Top members by community score, computed live"""
+        async with self._connection() as conn:
+            rows = await conn.fetch(LEADERBOARD_SQL, guild_id, limit)
+        return [
+            {
+                "rank": i + 1,
+                "user_id": str(r[0]),
+                "username": r[1],
+                "display_name": r[2],
+                "avatar_url": r[3],
+                "score": r[4],
+                "days_active": r[5],
+                "role_count": r[6],
+                "role_changes": r[7],
+            }
+            for i, r in enumerate(rows)
+        ]
+
+    async def get_landing_stats(self, guild_id: int) -> dict:
+        async with self._connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT
+                    (SELECT COUNT(*) FROM guild_members WHERE guild_id = $1 AND is_active),
+                    (SELECT COUNT(*) FROM roles WHERE guild_id = $1),
+                    (SELECT MIN(joined_at) FROM guild_members WHERE guild_id = $1)
+            """, guild_id)
+        oldest = row[2]
+        days_active = (datetime.utcnow() - oldest).days if oldest else 0
+        return {"member_count": row[0], "role_count": row[1], "days_active": days_active}
+
+    # === Game profiles, news and achievements ===
+    # Timestamps are returned as the strings the SQLite backend stores
+
+    async def get_user_game_profiles(self, user_id: int) -> list:
+        async with self._connection() as conn:
+            rows = await conn.fetch(
+                "SELECT id, game_name, character_name, server, role_class, updated_at FROM user_game_profiles WHERE user_id = $1 ORDER BY game_name",
+                user_id
+            )
+        return [{"id": r[0], "game_name": r[1], "character_name": r[2], "server": r[3], "role_class": r[4], "updated_at": r[5].isoformat() if r[5] else None} for r in rows]
+
+    async def upsert_user_game_profile(self, user_id: int, game_name: str, character_name: str, server: str = None, role_class: str = None) -> dict:
+        now = datetime.utcnow()
+        async with self._connection() as conn:
+            row_id = await conn.fetchval("""
+                INSERT INTO user_game_profiles (user_id, game_name, character_name, server, role_class, updated_at)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (user_id, game_name) DO UPDATE SET
+                    character_name = excluded.character_name,
+                    server = excluded.server,
+                    role_class = excluded.role_class,
+                    updated_at = excluded.updated_at
+                RETURNING id
+            """, user_id, game_name, character_name, server, role_class, now)
+        return {"id": row_id, "game_name": game_name, "character_name": character_name, "server": server, "role_class": role_class, "updated_at": now.isoformat()}
+
+    async def delete_user_game_profile(self, profile_id: int, user_id: int) -> bool:
+        async with self._connection() as conn:
+            await conn.execute("DELETE FROM user_game_profiles WHERE id = $1 AND user_id = $2", profile_id, user_id)
+        return True
+
+    async def add_news_post(self, title: str, content: str, discord_message_id: str = None, author_id: int = None, author_name: str = None) -> int:
+        async with self._connection() as conn:
+            return await conn.fetchval(
+                "INSERT INTO news_posts (title, content, discord_message_id, author_id, author_name, posted_at) VALUES ($1, $2, $3, $4, $5, $6) RETURNING id",
+                title, content, discord_message_id, author_id, author_name, datetime.utcnow()
+            )
+
+    async def get_news_posts(self, limit: int = 20) -> list:
+        async with self._connection() as conn:
+            rows = await conn.fetch(
+                "SELECT id, title, content, discord_message_id, author_name, posted_at FROM news_posts ORDER BY posted_at DESC LIMIT $1",
+                limit
+            )
+        return [{"id": r[0], "title": r[1], "content": r[2], "discord_message_id": r[3], "author_name": r[4], "posted_at": r[5].isoformat() if r[5] else None} for r in rows]
+
+    async def get_clan_achievements(self, game_name: str = None) -> list:
+        async with self._connection() as conn:
+            if game_name:
+                rows = await conn.fetch(
+                    "SELECT id, game_name, title, description, achieved_at, created_at FROM clan_achievements WHERE game_name = $1 ORDER BY achieved_at DESC",
+                    game_name
+                )
+            else:
+                rows = await conn.fetch(
+                    "SELECT id, game_name, title, description, achieved_at, created_at FROM clan_achievements ORDER BY game_name, achieved_at DESC"
+                )
+        return [{"id": r[0], "game_name": r[1], "title": r[2], "description": r[3], "achieved_at": r[4].isoformat() if r[4] else None, "created_at": str(r[5]) if r[5] else None} for r in rows]
+
+    async def add_clan_achievement(self, game_name: str, title: str, description: str = None, achieved_at: str = None, created_by: int = None) -> int:
+        async with self._connection() as conn:
+            return await conn.fetchval(
+                "INSERT INTO clan_achievements (game_name, title, description, achieved_at, created_by) VALUES ($1, $2, $3, $4, $5) RETURNING id",
+                game_name, title, description, date.fromisoformat(achieved_at) if achieved_at else None, created_by
+            )
+
+    async def update_clan_achievement(self, achievement_id: int, game_name: str, title: str, description: str = None, achieved_at: str = None) -> bool:
+        async with self._connection() as conn:
+            await conn.execute(
+                "UPDATE clan_achievements SET game_name = $1, title = $2, description = $3, achieved_at = $4 WHERE id = $5",
+                game_name, title, description, date.fromisoformat(achieved_at) if achieved_at else None, achievement_id
+            )
+        return True
+
+    async def delete_clan_achievement(self, achievement_id: int) -> bool:
+        async with self._connection() as conn:
+            await conn.execute("DELETE FROM clan_achievements WHERE id = $1", achievement_id)
+        return True
+
+    # === Scheduled messages ===
+
+    @staticmethod
+    def _scheduled_message(row: asyncpg.Record) -> Dict[str, Any]:
+        msg = {
+            'id': row['id'],
+            'guild_id': row['guild_id'],
+            'name': row['name'],
+            'channel_id': row['channel_id'],
+            'message': row['message'],
+            'role_ids': row['role_ids'],
+            'interval_days': row['interval_days'],
+            'interval_hours': row['interval_hours'],
+            'interval_minutes': row['interval_minutes'],
+            'next_run': str(row['next_run']),
+            'is_active': row['is_active'],
+            'embed_title': row['embed_title'] or row['name'],
+            'embed_color': row['embed_color'] if row['embed_color'] is not None else 3447003,
+        }
+        if 'created_at' in row.keys():
+            msg['created_at'] = str(row['created_at']) if row['created_at'] else None
+            msg['last_sent'] = str(row['last_sent']) if row['last_sent'] else None
+        return msg
+
+    async def add_scheduled_message(
+        self,
+        guild_id: int,
+        name: str,
+        channel_id: int,
+        message: str,
+        interval_days: int,
+        interval_hours: int,
+        interval_minutes: int,
+        role_ids: List[int],
+        next_run: datetime,
+        embed_title: str = None,
+        embed_color: int = 3447003
+    ) -> int:
+        """Add a new scheduled message (always sent as embed)"""
+        role_ids_str = ','.join(map(str, role_ids)) if role_ids else None
+        async with self._connection() as conn:
+            return await conn.fetchval("""
+                INSERT INTO scheduled_messages
+                (guild_id, name, channel_id, message, role_ids, interval_days, interval_hours,
+                 interval_minutes, next_run, is_active, embed_title, embed_color)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, TRUE, $10, $11)
+                RETURNING id
+            """, guild_id, name, channel_id, message, role_ids_str,
+                interval_days, interval_hours, interval_minutes, _pg_value(next_run),
+                embed_title or name, embed_color)
+
+    async def get_scheduled_messages(self, guild_id: int) -> List[Dict[str, Any]]:
+        """Get all scheduled messages for a guild"""
+        async with self._connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, guild_id, name, channel_id, message, role_ids,
+                       interval_days, interval_hours, interval_minutes,
+                       next_run, is_active, created_at, last_sent,
+                       embed_title, embed_color
+                FROM scheduled_messages
+                WHERE guild_id = $1
+                ORDER BY next_run ASC
+            """, guild_id)
+        return [self._scheduled_message(row) for row in rows]
+
+    async def get_messages_to_send(self) -> List[Dict[str, Any]]:
+        """Get all messages that should be sent now (always sent as embeds)"""
+        async with self._connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, guild_id, name, channel_id, message, role_ids,
+                       interval_days, interval_hours, interval_minutes,
+                       next_run, is_active, embed_title, embed_color
+                FROM scheduled_messages
+                WHERE is_active AND next_run <= $1
+                ORDER BY next_run ASC
+            """, datetime.utcnow())
+        return [self._scheduled_message(row) for row in rows]
+
+    async def update_scheduled_message_next_run(self, message_id: int):
+        """Advance next_run by one interval from the scheduled time (not from now), so sends do not drift"""
+        async with self._connection() as conn:
+            await conn.execute("""
+                UPDATE scheduled_messages
+                SET next_run = next_run + make_interval(days => interval_days, hours => interval_hours, mins => interval_minutes),
+                    last_sent = $2
+                WHERE id = $1
+            """, message_id, datetime.utcnow())
+
+    async def remove_scheduled_message(self, message_id: int, guild_id: int) -> bool:
+        """Remove a scheduled message"""
+        async with self._connection() as conn:
+            status = await conn.execute(
+                "DELETE FROM scheduled_messages WHERE id = $1 AND guild_id = $2", message_id, guild_id
+            )
+        return _rowcount(status) > 0
+
+    async def toggle_scheduled_message(self, message_id: int, guild_id: int) -> Optional[bool]:
+        """Toggle a scheduled message active/inactive. Returns new state or None if not found."""
+        async with self._connection() as conn:
+            return await conn.fetchval("""
+                UPDATE scheduled_messages SET is_active = NOT is_active
+                WHERE id = $1 AND guild_id = $2
+                RETURNING is_active
+            """, message_id, guild_id)
+
+    async def update_scheduled_message(
+        self,
+        message_id: int,
+        guild_id: int,
+        name: Optional[str] = None,
+        channel_id: Optional[int] = None,
+        message: Optional[str] = None,
+        interval_days: Optional[int] = None,
+        interval_hours: Optional[int] = None,
+        interval_minutes: Optional[int] = None,
+        role_ids: Optional[List[int]] = None,
+        next_run: Optional[datetime] = None
+    ) -> bool:
+        """Update a scheduled message. Only updates provided fields. Returns True if successful."""
+        fields = {
+            'name': name,
+            'channel_id': channel_id,
+            'message': message,
+            'interval_days': interval_days,
+            'interval_hours': interval_hours,
+            'interval_minutes': interval_minutes,
+            'next_run': _pg_value(next_run),
+        }
+        values = [message_id, guild_id]
+        updates = []
+        for column, value in fields.items():
+            if value is not None:
+                values.append(value)
+                updates.append(f"{column} = ${len(values)}")
+        if role_ids is not None:
+            values.append(','.join(map(str, role_ids)) if role_ids else None)
+            updates.append(f"role_ids = ${len(values)}")
+
+        async with self._connection() as conn:
+            if not updates:
+                return await conn.fetchval(
+                    "SELECT TRUE FROM scheduled_messages WHERE id = $1 AND guild_id = $2", message_id, guild_id
+                ) is not None
+            status = await conn.execute(f"""
+                UPDATE scheduled_messages
+                SET {', '.join(updates)}
+                WHERE id = $1 AND guild_id = $2
+            """, *values)
+        return _rowcount(status) > 0
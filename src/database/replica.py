@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSync:
+    """Keeps a local read replica of the database fresh with the SQLite online backup API.
+
+    Every ``interval`` seconds the source is opened read-only and copied into
+    ``target`` in a single backup step. In WAL mode that step is one read
+    snapshot, so the bot keeps writing while it runs. A stepped backup would
+    restart whenever the bot commits between steps. The replica keeps the
+    source's WAL journal, so readers that already have it open keep their
+    snapshot until the copy commits. They then see the new data on their next
+    transaction.
+
+    ``age()`` is how old the data in the replica is: the seconds since the last
+    successful copy started.
+    """
+
+    def __init__(self, source: Path, target: Path, interval: float = 30.0, busy_timeout_ms: int = 5000):
+        if interval <= 0:
+            raise ValueError("Replica sync interval must be positive")
+        self.source = Path(source)
+        self.target = Path(target)
+        self.interval = interval
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synced_at: Optional[float] = None
+        self.last_duration_ms = 0.0
+        self.syncs = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def age(self) -> Optional[float]:
+        """Seconds since the replica's snapshot was taken; None before the first sync"""
+        if self.synced_at is None:
+            return None
+        return max(0.0, time.time() - self.synced_at)
+
+    async def sync(self):
+        """Copy the source into the replica once"""
+        snapshot_at = time.time()
+        started = time.perf_counter()
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        async with aiosqlite.connect(f"{self.source.resolve().as_uri()}?mode=ro", uri=True) as source:
+            await source.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+            async with aiosqlite.connect(self.target) as target:
+                await target.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+                await source.backup(target)
+        self.synced_at = snapshot_at
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+        self.syncs += 1
+        logger.debug(f"Replica {self.target} synced in {self.last_duration_ms:.1f}ms")
+
+    def start(self):
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run(), name="database-replica-sync")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Replica sync failed, replica is now {self.snapshot()['age_seconds']}s old: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            'path': str(self.target),
+            'interval': self.interval,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'last_duration_ms': round(self.last_duration_ms, 1),
+            'syncs': self.syncs,
+            'failures': self.failures,
+        }
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .pool import ConnectionPool
+from .timestamps import to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+# History tables that retention may prune, and the epoch-millisecond column
+# holding each row's time
+RETENTION_TABLES = {
+    'username_changes': 'ts',
+    'nickname_changes': 'ts',
+    'role_changes': 'ts',
+    'join_leave_events': 'ts',
+    'events': 'ts',
+}
+
+# Called after every batch with (table, rows deleted so far in that table)
+ProgressCallback = Callable[[str, int], Awaitable[None]]
+
+
+@dataclass
+class RetentionPolicy:
+    """Keep ``days`` days of history in ``table``"""
+    table: str
+    days: int
+
+    @property
+    def time_column(self) -> str:
+        return RETENTION_TABLES[self.table]
+
+    def cutoff(self, now: Optional[datetime] = None) -> int:
+        return to_epoch_ms((now or datetime.utcnow()) - timedelta(days=self.days))
+
+
+def policies_for(days: int) -> List[RetentionPolicy]:
+    """The same retention period for every history table"""
+    return [RetentionPolicy(table, days) for table in RETENTION_TABLES]
+
+
+def policies_from_env() -> List[RetentionPolicy]:
+    """Scheduled retention policies.
+
+    ``RETENTION_DAYS`` applies to every history table and
+    ``RETENTION_<TABLE>_DAYS`` (e.g. ``RETENTION_EVENTS_DAYS``) overrides it per
+    table. Unset or 0 keeps the table forever.
+    """
+    default = int(os.getenv('RETENTION_DAYS', '0'))
+    policies = []
+    for table in RETENTION_TABLES:
+        days = int(os.getenv(f'RETENTION_{table.upper()}_DAYS', default))
+        if days > 0:
+            policies.append(RetentionPolicy(table, days))
+    return policies
+
+
+class RetentionEngine:
+    """Deletes old history in bounded batches instead of one long transaction.
+
+    For each table the newest expired rowid is found on a reader, then rows are
+    deleted in rowid windows of ``batch_size``, each in its own short write
+    transaction. Between batches the writer is released for ``pause`` seconds
+    so the write-behind queue and other writers are never stalled for long.
+    The time predicate is kept on every batch, so rows that are out of rowid
+    order are never deleted early.
+    """
+
+    def __init__(self, pool: ConnectionPool, batch_size: int = 5000, pause: float = 0.05):
+        if batch_size < 1:
+            raise ValueError("Retention batch size must be at least 1")
+        self.pool = pool
+        self.batch_size = batch_size
+        self.pause = pause
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    async def run(
+        self,
+        policies: List[RetentionPolicy],
+        progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, int]:
+        """Apply every policy; returns rows deleted per table"""
+        async with self._lock:
+            started = time.perf_counter()
+            now = datetime.utcnow()
+            deleted = {}
+            for policy in policies:
+                deleted[policy.table] = await self._prune(policy, policy.cutoff(now), progress)
+            if any(deleted.values()):
+                await self._compact()
+            logger.info(
+                f"Retention removed {sum(deleted.values())} rows in "
+                f"{time.perf_counter() - started:.1f}s: {deleted}"
+            )
+            return deleted
+
+    async def _prune(self, policy: RetentionPolicy, cutoff: int, progress: Optional[ProgressCallback]) -> int:
+        table, column = policy.table, policy.time_column
+        async with self.pool.reader() as db:
+            cursor = await db.execute(
+                f"SELECT MIN(rowid), MAX(rowid) FROM {table} WHERE {column} < ?",
+                (cutoff,)
+            )
+            low, high = await cursor.fetchone()
+        if low is None:
+            return 0
+
+        deleted = 0
+        start = low
+        while start <= high:
+            end = min(start + self.batch_size - 1, high)
+            async with self.pool.writer() as db:
+                cursor = await db.execute(
+                    f"DELETE FROM {table} WHERE rowid BETWEEN ? AND ? AND {column} < ?",
+                    (start, end, cutoff)
+                )
+                await db.commit()
+            deleted += cursor.rowcount
+            start = end + 1
+            if progress is not None:
+                await progress(table, deleted)
+            # Let queued tracking writes take the writer before the next batch
+            await asyncio.sleep(self.pause)
+        logger.debug(f"Retention pruned {deleted} rows from {table} (older than {cutoff})")
+        return deleted
+
+    async def _compact(self):
+        """Return free pages when auto_vacuum allows it and refresh planner statistics"""
+        async with self.pool.writer() as db:
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            if (await cursor.fetchone())[0] == 2:  # INCREMENTAL
+                await db.execute("PRAGMA incremental_vacuum")
+            await db.execute("PRAGMA optimize")
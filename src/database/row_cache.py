@@ -0,0 +1,120 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class RowCache:
+    """LRU of the last row written per key, used to drop writes that change nothing.
+
+    ``should_write`` is asked before a row is queued: an identical row seen
+    recently is skipped, anything else is remembered and let through. With
+    ``refresh_after`` an unchanged row is let through again once that many
+    seconds have passed, for rows carrying a timestamp (users.last_seen) that
+    is left out of the comparison. Rows are remembered when queued, so a
+    burst of identical events writes once; a write that then fails must be
+    ``invalidate``d, or later identical rows would be skipped.
+    """
+
+    def __init__(self, maxsize: int = 50000, refresh_after: Optional[float] = None):
+        if maxsize < 1:
+            raise ValueError("Row cache needs room for at least one row")
+        self.maxsize = maxsize
+        self.refresh_after = refresh_after
+        self._rows: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.applied = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def should_write(self, key: Hashable, row: tuple) -> bool:
+        now = time.monotonic()
+        cached = self._rows.get(key)
+        if cached is not None and cached[0] == row and (
+            self.refresh_after is None or now - cached[1] < self.refresh_after
+        ):
+            self._rows.move_to_end(key)
+            self.skipped += 1
+            return False
+        self._store(key, row, now)
+        self.applied += 1
+        return True
+
+    def remember(self, key: Hashable, row: tuple):
+        """Record a row written outside should_write (e.g. a bulk inventory)"""
+        self._store(key, row, time.monotonic())
+
+    def invalidate(self, key: Hashable):
+        """Forget a row changed by some other statement"""
+        self._rows.pop(key, None)
+
+    def _store(self, key: Hashable, row: tuple, now: float):
+        self._rows[key] = (row, now)
+        self._rows.move_to_end(key)
+        if len(self._rows) > self.maxsize:
+            self._rows.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.applied + self.skipped
+        return {
+            'size': len(self._rows),
+            'maxsize': self.maxsize,
+            'applied': self.applied,
+            'skipped': self.skipped,
+            'skip_rate': round(self.skipped / total, 3) if total else 0.0,
+        }
+
+
+class RoleCache:
+    """Content hash of every role as stored in the roles table, keyed by role id.
+
+    Roles are few and rarely change, so the whole table is held: it is loaded
+    at startup and kept current by the role listeners. ``should_write`` lets a
+    role row through only when its hash differs from the stored one, and
+    records it straight away; a write that then fails must ``forget`` the
+    role, since nothing else would ever write it again.
+    """
+
+    def __init__(self):
+        self._roles: Dict[int, Tuple[str, str]] = {}
+        self.applied = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    @staticmethod
+    def digest(row: tuple) -> str:
+        return hashlib.blake2b(repr(row).encode(), digest_size=16).hexdigest()
+
+    def load(self, rows: Iterable[tuple]):
+        """Replace the cache with rows read back from the roles table"""
+        self._roles = {row[0]: (self.digest(row), row[2]) for row in rows}
+
+    def name(self, role_id: int) -> Optional[str]:
+        """Stored name of a role, or None when it has never been written"""
+        cached = self._roles.get(role_id)
+        return cached[1] if cached else None
+
+    def should_write(self, row: tuple) -> bool:
+        digest = self.digest(row)
+        cached = self._roles.get(row[0])
+        if cached is not None and cached[0] == digest:
+            self.skipped += 1
+            return False
+        self._roles[row[0]] = (digest, row[2])
+        self.applied += 1
+        return True
+
+    def forget(self, role_id: int):
+        self._roles.pop(role_id, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.applied + self.skipped
+        return {
+            'size': len(self._roles),
+            'applied': self.applied,
+            'skipped': self.skipped,
+            'skip_rate': round(self.skipped / total, 3) if total else 0.0,
+        }
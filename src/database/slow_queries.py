@@ -0,0 +1,184 @@
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN QUERY PLAN has nothing to say about
+_UNEXPLAINED = ('PRAGMA', 'EXPLAIN', 'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'ATTACH', 'DETACH')
+
+
+def _normalize(sql: str) -> str:
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def _redact(parameters: Any) -> Any:
+    """Parameter types only; member ids, names and payloads never reach the log"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class SlowQueryLog:
+    """Ring buffer of SQLite statements slower than ``threshold_ms``.
+
+    Pooled connections time every statement on their worker thread, from
+    execute through the last fetch. The first time a statement crosses the
+    threshold it is logged with redacted parameters and its ``EXPLAIN QUERY
+    PLAN``; later fetches on the same cursor only update the recorded time.
+    A threshold of 0 disables the log.
+    """
+
+    def __init__(self, threshold_ms: float = 250, size: int = 100):
+        self.threshold_ms = threshold_ms
+        self.entries: deque = deque(maxlen=max(size, 1))
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'SlowQueryLog':
+        return cls(
+            threshold_ms=float(os.getenv('DATABASE_SLOW_QUERY_MS', '250')),
+            size=int(os.getenv('DATABASE_SLOW_QUERY_LOG_SIZE', '100')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def connection_factory(self):
+        """``factory`` argument for sqlite3/aiosqlite ``connect``"""
+        return functools.partial(TracedConnection, slow_queries=self)
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters: Any, elapsed_ms: float) -> Dict[str, Any]:
+        entry = {
+            'recorded_at': time.time(),
+            'elapsed_ms': round(elapsed_ms, 3),
+            'sql': _normalize(sql),
+            'parameters': _redact(parameters),
+            'plan': self._explain(conn, sql, parameters),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.recorded += 1
+        plan = '; '.join(line.strip() for line in entry['plan'] or [])
+        logger.warning(f"Slow query ({entry['elapsed_ms']:.1f}ms): {entry['sql'][:500]} | plan: {plan or 'n/a'}")
+        return entry
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, parameters: Any) -> Optional[List[str]]:
+        if sql.lstrip().upper().startswith(_UNEXPLAINED):
+            return None
+        try:
+            # A plain cursor, so the plan query is not traced itself
+            rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters or ()).fetchall()
+        except sqlite3.Error as e:
+            return [f"EXPLAIN failed: {e}"]
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append(f"{'  ' * depth[node]}{detail}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Recorded statements, newest first"""
+        with self._lock:
+            entries = list(reversed(self.entries))
+        return {
+            'threshold_ms': self.threshold_ms,
+            'recorded': self.recorded,
+            'entries': entries,
+        }
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that adds up the time spent executing and fetching its statement"""
+
+    _sql = ''
+    _parameters: Any = ()
+    _elapsed = 0.0
+    _entry: Optional[Dict[str, Any]] = None
+
+    def _start(self, sql: str, parameters: Any):
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = 0.0
+        self._entry = None
+
+    def _charge(self, started: float):
+        self._elapsed += time.perf_counter() - started
+        elapsed_ms = self._elapsed * 1000
+        slow_queries = self.connection.slow_queries
+        if elapsed_ms < slow_queries.threshold_ms:
+            return
+        if self._entry is None:
+            self._entry = slow_queries.record(self.connection, self._sql, self._parameters, elapsed_ms)
+        else:
+            self._entry['elapsed_ms'] = round(elapsed_ms, 3)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._charge(started)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Plans and redacted types come from the first parameter set
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters[0] if seq_of_parameters else ())
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._charge(started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._charge(started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._charge(started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._charge(started)
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements go through ``TracedCursor``"""
+
+    def __init__(self, *args, slow_queries: SlowQueryLog, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slow_queries = slow_queries
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,25 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+_EPOCH = datetime(1970, 1, 1)
+
+# SQL turning a stored timestamp string (CURRENT_TIMESTAMP, str(datetime) or
+# isoformat) into epoch milliseconds; format() it with the column name
+EPOCH_MS_SQL = "CAST(ROUND((julianday({}) - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def to_epoch_ms(value: Optional[datetime] = None) -> int:
+    """Epoch milliseconds for a naive UTC datetime, or for now"""
+    if value is None:
+        return int(time.time() * 1000)
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+
+def from_epoch_ms(value: Optional[int]) -> Optional[datetime]:
+    """Naive UTC datetime for epoch milliseconds; None stays None"""
+    if value is None:
+        return None
+    return _EPOCH + timedelta(milliseconds=value)
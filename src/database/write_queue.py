@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .instrumentation import start_background_task
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# One SQL statement and its parameters
+Statement = Tuple[str, Sequence[Any]]
+
+_STOP = object()
+
+
+class WriteQueueMetrics:
+    """Counters for the write-behind queue"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.max_depth = 0
+        self.backpressure_waits = 0
+
+    def snapshot(self, depth: int) -> Dict[str, Any]:
+        return {
+            'depth': depth,
+            'max_depth': self.max_depth,
+            'submitted': self.submitted,
+            'committed': self.committed,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dead_lettered': self.dead_lettered,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+            'max_batch_size': self.max_batch_size,
+            'avg_batch_size': round(self.committed / self.batches, 2) if self.batches else 0.0,
+            'backpressure_waits': self.backpressure_waits,
+        }
+
+
+class WriteBehindQueue:
+    """Group-commit queue for tracking writes.
+
+    Each submitted operation is a list of statements that must apply together.
+    A background task collects operations for up to ``flush_interval`` seconds
+    (or ``max_batch`` operations) and commits them in a single transaction, so
+    a burst of gateway events costs one fsync instead of one per event.
+    Operations are applied strictly in submission order.
+
+    Callers have returned by the time their operation commits, so failures
+    cannot be reported back to them. Every operation runs inside its own
+    savepoint; when one fails, the operations before it are committed, the
+    failed one is retried once in a transaction of its own, and only then
+    does the rest of the batch follow, so a later write never lands before
+    an earlier one. If the batch transaction itself fails, its first
+    operation is retried alone the same way. What still fails is counted in ``failed`` and,
+    with ``dead_letter_path``, appended there as a JSON line holding the
+    error and the statements with their parameters, to be replayed by hand;
+    without a path it is only logged and the write is lost. ``on_failure``
+    is then called with the operation's statements, so caches that assumed
+    the write would land can forget it.
+
+    ``submit()`` blocks once ``max_size`` operations are pending, which pushes
+    back on the event handlers instead of growing memory without bound.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_size: int = 10000,
+        flush_interval: float = 0.05,
+        max_batch: int = 500,
+        dead_letter_path: Optional[Path] = None,
+        on_failure: Optional[Callable[[List[Statement]], None]] = None,
+    ):
+        self.pool = pool
+        self.dead_letter_path = dead_letter_path
+        self.on_failure = on_failure
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = WriteQueueMetrics()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running:
+            self._task = start_background_task(self._run(), "database-write-queue")
+
+    async def submit(self, statements: List[Statement]):
+        """Queue one operation; waits while the queue is full"""
+        if not self.is_running:
+            raise RuntimeError("Write queue is not running")
+        if self._queue.full():
+            self.metrics.backpressure_waits += 1
+        await self._queue.put(statements)
+        self.metrics.submitted += 1
+        if self.depth > self.metrics.max_depth:
+            self.metrics.max_depth = self.depth
+
+    async def flush(self):
+        """Wait until every operation submitted so far is committed"""
+        if not self.is_running:
+            return
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(done)
+        await done
+
+    async def close(self):
+        """Commit everything still queued, then stop the flush task"""
+        if not self.is_running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Write queue drained ({self.metrics.committed} operations committed)")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            batch: List[Any] = []
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+                deadline = loop.time() + self.flush_interval
+                # A flush() marker ends the window early
+                while len(batch) < self.max_batch and not isinstance(batch[-1], asyncio.Future):
+                    if self._queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(self._queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        item = self._queue.get_nowait()
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+            try:
+                await self._apply([op for op in batch if not isinstance(op, asyncio.Future)])
+            except Exception as e:
+                # Keep the task alive; losing it would silently drop every later write
+                logger.exception(f"Write queue failed to apply a batch: {e}")
+            finally:
+                for op in batch:
+                    if isinstance(op, asyncio.Future) and not op.done():
+                        op.set_result(None)
+
+    async def _apply(self, pending: List[List[Statement]]):
+        while pending:
+            try:
+                committed, failed = await self._commit(pending)
+            except Exception as e:
+                logger.warning(f"Write queue batch of {len(pending)} operations failed, retrying the first alone: {e}")
+                committed, failed = 0, pending[0]
+            if failed is None:
+                return
+            await self._retry(failed)
+            pending = pending[committed + 1:]
+
+    async def _commit(self, operations: List[List[Statement]]) -> Tuple[int, Optional[List[Statement]]]:
+        """Commit operations in order up to the first one that fails.
+
+        Returns how many were committed and the failed operation (None when
+        all of them were). Nothing after a failed operation is applied.
+        """
+        failed = None
+        committed = 0
+        async with self.pool.writer() as db:
+            await db.execute("BEGIN")
+            for index, statements in enumerate(operations):
+                await db.execute(f"SAVEPOINT op_{index}")
+                try:
+                    for sql, params in statements:
+                        await db.execute(sql, params)
+                except Exception as e:
+                    await db.execute(f"ROLLBACK TO op_{index}")
+                    await db.execute(f"RELEASE op_{index}")
+                    logger.warning(f"Queued write failed, will retry: {e}")
+                    failed = statements
+                    break
+                await db.execute(f"RELEASE op_{index}")
+                committed += 1
+            await db.commit()
+        self.metrics.committed += committed
+        self.metrics.batches += 1
+        self.metrics.last_batch_size = committed
+        self.metrics.max_batch_size = max(self.metrics.max_batch_size, committed)
+        return committed, failed
+
+    async def _retry(self, statements: List[Statement]):
+        """Second attempt at one operation, alone in its transaction"""
+        self.metrics.retried += 1
+        try:
+            async with self.pool.writer() as db:
+                await db.execute("BEGIN")
+                for sql, params in statements:
+                    await db.execute(sql, params)
+                await db.commit()
+        except Exception as e:
+            self.metrics.failed += 1
+            logger.error(f"Dropped queued write after retry: {e}")
+            self._dead_letter(statements, e)
+            if self.on_failure is not None:
+                try:
+                    self.on_failure(statements)
+                except Exception as callback_error:
+                    logger.error(f"Write queue on_failure callback raised: {callback_error}")
+        else:
+            self.metrics.committed += 1
+
+    def _dead_letter(self, statements: List[Statement], error: Exception):
+        if self.dead_letter_path is None:
+            return
+        entry = {
+            'failed_at': time.time(),
+            'error': f"{type(error).__name__}: {error}",
+            # Datetimes as str() match what the sqlite3 adapter would have stored
+            'statements': [[sql, list(params)] for sql, params in statements],
+        }
+        try:
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, default=str) + '\n')
+            self.metrics.dead_lettered += 1
+        except OSError as e:
+            logger.error(f"Could not write to the dead-letter file {self.dead_letter_path}: {e}")
@@ -0,0 +1,60 @@
+"""Fixtures running each test against every storage backend.
+
+SQLite always runs, on a file in the test's temp directory. PostgreSQL runs
+when ``DATABASE_URL`` points at a server; every test gets a schema of its
+own, dropped afterwards, so the database's existing tables are not touched.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from src.database.database import Database
+
+POSTGRES_URL = os.getenv('DATABASE_URL', '')
+
+
+def _postgres_url(schema: str) -> str:
+    # asyncpg passes unknown DSN query parameters on as server settings
+    separator = '&' if '?' in POSTGRES_URL else '?'
+    return f"{POSTGRES_URL}{separator}search_path={schema}"
+
+
+async def _postgres_admin(sql: str):
+    import asyncpg
+    conn = await asyncpg.connect(POSTGRES_URL)
+    try:
+        await conn.execute(sql)
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def make_backend(request, tmp_path):
+    """Factory for an uninitialized backend of each kind"""
+    if request.param == 'sqlite':
+        return lambda: Database(str(tmp_path / 'tracking.db'))
+
+    if not POSTGRES_URL.startswith(('postgres://', 'postgresql://')):
+        pytest.skip("DATABASE_URL does not point at PostgreSQL")
+    from src.database.postgres import PostgresDatabase
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    asyncio.run(_postgres_admin(f"CREATE SCHEMA {schema}"))
+    request.addfinalizer(lambda: asyncio.run(_postgres_admin(f"DROP SCHEMA {schema} CASCADE")))
+    return lambda: PostgresDatabase(_postgres_url(schema))
+
+
+@pytest.fixture
+def run(make_backend):
+    """Run ``scenario(db)`` on a fresh, initialized backend and return its result"""
+    def run_scenario(scenario):
+        async def main():
+            db = make_backend()
+            await db.initialize()
+            try:
+                return await scenario(db)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run_scenario
@@ -0,0 +1,151 @@
+-- Schema of a tracking database created before the pooled-connection series (commit d2dc8f3),
+-- used to check that Database.initialize() upgrades an existing install.
+
+CREATE TABLE users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL,
+                discriminator TEXT,
+                display_name TEXT,
+                avatar_url TEXT,
+                created_at TIMESTAMP,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_bot BOOLEAN DEFAULT FALSE
+            );
+
+CREATE TABLE guild_members (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                joined_at TIMESTAMP,
+                nickname TEXT,
+                is_active BOOLEAN DEFAULT TRUE,
+                FOREIGN KEY (user_id) REFERENCES users (user_id),
+                UNIQUE(guild_id, user_id)
+            );
+
+CREATE TABLE username_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                old_username TEXT NOT NULL,
+                new_username TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            );
+
+CREATE TABLE nickname_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                old_nickname TEXT,
+                new_nickname TEXT,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            );
+
+CREATE TABLE roles (
+                role_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                color INTEGER NOT NULL DEFAULT 0,
+                position INTEGER DEFAULT 0,
+                permissions TEXT DEFAULT '0',
+                is_hoisted BOOLEAN DEFAULT FALSE,
+                is_mentionable BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+CREATE TABLE role_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                role_id INTEGER NOT NULL,
+                action TEXT NOT NULL, -- 'added', 'removed', or 'initial'
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id),
+                FOREIGN KEY (role_id) REFERENCES roles (role_id)
+            );
+
+CREATE TABLE join_leave_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                event_type TEXT NOT NULL, -- 'join' or 'leave'
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            );
+
+CREATE TABLE scheduled_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                role_ids TEXT,
+                interval_days INTEGER DEFAULT 0,
+                interval_hours INTEGER DEFAULT 0,
+                interval_minutes INTEGER DEFAULT 60,
+                next_run TIMESTAMP NOT NULL,
+                is_active BOOLEAN DEFAULT TRUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_by INTEGER,
+                last_sent TIMESTAMP,
+                embed_title TEXT,
+                embed_color INTEGER DEFAULT 3447003
+            );
+
+CREATE INDEX idx_users_username ON users (username);
+
+CREATE INDEX idx_guild_members_guild ON guild_members (guild_id);
+
+CREATE INDEX idx_username_changes_user ON username_changes (user_id);
+
+CREATE INDEX idx_nickname_changes_user ON nickname_changes (user_id);
+
+CREATE INDEX idx_role_changes_user ON role_changes (user_id);
+
+CREATE INDEX idx_role_changes_role ON role_changes (role_id);
+
+CREATE INDEX idx_roles_guild ON roles (guild_id);
+
+CREATE INDEX idx_join_leave_events_guild ON join_leave_events (guild_id);
+
+CREATE INDEX idx_scheduled_messages_guild ON scheduled_messages (guild_id);
+
+CREATE INDEX idx_scheduled_messages_next_run ON scheduled_messages (next_run);
+
+CREATE TABLE user_game_profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                game_name TEXT NOT NULL,
+                character_name TEXT NOT NULL,
+                server TEXT,
+                role_class TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            );
+
+CREATE INDEX idx_game_profiles_user ON user_game_profiles (user_id);
+
+CREATE TABLE news_posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                discord_message_id TEXT,
+                author_id INTEGER,
+                author_name TEXT,
+                posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+CREATE TABLE clan_achievements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                game_name TEXT NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT,
+                achieved_at DATE,
+                created_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+CREATE INDEX idx_achievements_game ON clan_achievements (game_name);
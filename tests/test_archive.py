@@ -0,0 +1,47 @@
+"""Reads that continue from the hot SQLite file into the monthly archive."""
+import asyncio
+import dataclasses
+
+from benchmarks.fakes import make_guild, make_members
+from src.database.database import Database
+
+DAY_MS = 86_400_000
+
+
+def test_recent_changes_page_into_the_archive(tmp_path):
+    guild = make_guild(1_000, 5)
+    members = make_members(guild, 6, 2)
+
+    async def main():
+        db = Database(str(tmp_path / 'tracking.db'))
+        await db.initialize()
+        try:
+            await db.inventory_guild(guild, members)
+            for index, member in enumerate(members):
+                await db.log_nickname_change(member, dataclasses.replace(member, nick=f"Page {index}"))
+            await db.flush()
+            async with db.writer() as conn:
+                # The first four changes happened months ago, spread over two months
+                await conn.execute("UPDATE events SET ts = ts - (100 + 40 * (id % 2)) * ? WHERE id IN "
+                                   "(SELECT id FROM events WHERE type = 'nickname' ORDER BY id LIMIT 4)", (DAY_MS,))
+                await conn.commit()
+            moved = await db.archive_history(days=30)
+
+            pages, before = [], None
+            while True:
+                page = await db.get_recent_changes(guild.id, limit=2, before=before)
+                if not page:
+                    break
+                pages.append(page)
+                before = tuple(int(part) for part in page[-1]['cursor'].split(','))
+            return moved, pages
+        finally:
+            await db.close()
+
+    moved, pages = asyncio.run(main())
+    assert moved['events'] == 4
+    changes = [change for page in pages for change in page]
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert sorted(change['new_value'] for change in changes) == sorted(f"Page {index}" for index in range(6))
+    cursors = [tuple(int(part) for part in change['cursor'].split(',')) for change in changes]
+    assert cursors == sorted(cursors, reverse=True)
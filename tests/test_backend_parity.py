@@ -0,0 +1,347 @@
+"""Tracking writes and dashboard reads, run against every storage backend.
+
+The expectations are the same for SQLite and PostgreSQL, so a change to
+one backend that the other does not mirror fails here.
+"""
+import dataclasses
+from datetime import date, datetime, timedelta
+
+from benchmarks.fakes import make_guild, make_members
+
+GUILD_ID = 1_000
+
+
+def _guild(members: int = 6, roles: int = 5):
+    guild = make_guild(GUILD_ID, roles)
+    return guild, make_members(guild, members, 2)
+
+
+def _role_ids(member) -> set:
+    return {role.id for role in member.roles if not role.is_default()}
+
+
+def test_inventory_writes_members_and_skips_unchanged(run):
+    guild, members = _guild()
+
+    async def scenario(db):
+        first = await db.inventory_guild(guild, members)
+        second = await db.inventory_guild(guild, members)
+        users = await db.get_guild_users(guild.id)
+        roles = await db.get_current_roles(members[0].id, guild.id)
+        return first, second, users, roles
+
+    first, second, users, roles = run(scenario)
+    assert first == {'roles': 5, 'members': 6, 'unchanged': 0, 'initial_roles': 12}
+    assert second == {'roles': 0, 'members': 0, 'unchanged': 6, 'initial_roles': 0}
+    assert {user['user_id'] for user in users} == {member.id for member in members}
+    assert {role['role_id'] for role in roles} == _role_ids(members[0])
+
+
+def test_inventory_rewrites_changed_member(run):
+    guild, members = _guild()
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        changed = list(members)
+        changed[1] = dataclasses.replace(members[1], roles=members[1].roles + [guild.roles[5]])
+        result = await db.inventory_guild(guild, changed)
+        roles = await db.get_current_roles(members[1].id, guild.id)
+        return result, roles
+
+    result, roles = run(scenario)
+    assert result['members'] == 1 and result['unchanged'] == 5
+    assert {role['role_id'] for role in roles} == _role_ids(members[1]) | {guild.roles[5].id}
+
+
+def test_log_nickname_change(run):
+    guild, members = _guild()
+    member = members[1]
+    renamed = dataclasses.replace(member, nick="Renamed")
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_nickname_change(member, renamed)
+        await db.flush()
+        return await db.get_user_stats(member.id), await db.get_recent_changes(guild.id, limit=10)
+
+    stats, changes = run(scenario)
+    assert stats['nickname_changes'] == 1
+    assert stats['role_changes'] == 0
+    assert [(c['type'], c['old_value'], c['new_value']) for c in changes] == [('nickname', None, "Renamed")]
+
+
+def test_log_role_change(run):
+    guild, members = _guild()
+    member = members[0]
+    removed = next(role for role in member.roles if not role.is_default())
+    added = next(role for role in guild.roles[1:] if role not in member.roles)
+    after = dataclasses.replace(member, roles=[role for role in member.roles if role is not removed] + [added])
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_role_change(member, after)
+        await db.flush()
+        return (
+            await db.get_user_stats(member.id),
+            await db.get_current_roles(member.id, guild.id),
+            await db.get_role_history(member.id, guild.id),
+            await db.get_recent_changes(guild.id, limit=10),
+        )
+
+    stats, roles, history, changes = run(scenario)
+    assert stats['role_changes'] == 2
+    assert {role['role_id'] for role in roles} == _role_ids(after)
+    assert {(entry['role_id'], entry['action']) for entry in history} >= {(added.id, 'added'), (removed.id, 'removed')}
+    assert sorted((c['role_name'], c['action']) for c in changes) == sorted(
+        [(added.name, 'added'), (removed.name, 'removed')]
+    )
+
+
+def test_log_username_change(run):
+    guild, members = _guild()
+    member = members[2]
+    renamed = dataclasses.replace(member, name="newname")
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_username_change(member, renamed)
+        await db.flush()
+        return (
+            await db.get_user_stats(member.id),
+            await db.get_user_profile(member.id),
+            await db.get_recent_changes(guild.id, limit=10),
+        )
+
+    stats, profile, changes = run(scenario)
+    assert stats['username_changes'] == 1
+    assert profile['username'] == "newname"
+    assert [(c['type'], c['old_value'], c['new_value']) for c in changes] == [('username', member.name, "newname")]
+
+
+def test_log_leave_and_join(run):
+    guild, members = _guild()
+    member = members[3]
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_user_leave(member)
+        await db.flush()
+        after_leave = {user['user_id'] for user in await db.get_guild_users(guild.id)}
+        await db.log_user_join(member)
+        await db.flush()
+        after_join = {user['user_id'] for user in await db.get_guild_users(guild.id)}
+        return after_leave, after_join, await db.get_server_stats(guild.id)
+
+    after_leave, after_join, stats = run(scenario)
+    assert member.id not in after_leave
+    assert member.id in after_join
+    assert stats['new_members_24h'] == 1
+    assert stats['left_members_24h'] == 1
+
+
+def test_log_role_update_renames_role(run):
+    guild, members = _guild()
+    role = guild.roles[2]
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_role_update(dataclasses.replace(role, name="Officer"))
+        await db.flush()
+        return await db.get_roles(guild.id, [role.id])
+
+    roles = run(scenario)
+    assert [r['name'] for r in roles] == ["Officer"]
+
+
+def test_server_stats_totals(run):
+    guild, members = _guild()
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        for index, member in enumerate(members[:3]):
+            await db.log_nickname_change(member, dataclasses.replace(member, nick=f"N{index}"))
+        await db.log_username_change(members[0], dataclasses.replace(members[0], name="renamed"))
+        await db.flush()
+        return await db.get_server_stats(guild.id)
+
+    stats = run(scenario)
+    assert stats['total_users'] == 6
+    assert stats['total_nickname_changes'] == 3
+    assert stats['total_username_changes'] == 1
+    assert stats['total_role_changes'] == 0
+    assert stats['name_changes_24h'] == 3
+
+
+def test_recent_changes_pages_by_cursor(run):
+    guild, members = _guild()
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        for index, member in enumerate(members):
+            await db.log_nickname_change(member, dataclasses.replace(member, nick=f"Page {index}"))
+        await db.flush()
+        first = await db.get_recent_changes(guild.id, limit=4)
+        cursor = tuple(int(part) for part in first[-1]['cursor'].split(','))
+        second = await db.get_recent_changes(guild.id, limit=4, before=cursor)
+        return first, second
+
+    first, second = run(scenario)
+    assert len(first) == 4 and len(second) == 2
+    values = [change['new_value'] for change in first + second]
+    assert sorted(values) == sorted(f"Page {index}" for index in range(6))
+    assert not {change['id'] for change in first} & {change['id'] for change in second}
+
+
+def test_users_stats_batch(run):
+    guild, members = _guild()
+    other = make_guild(GUILD_ID * 10, 5)
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        member = members[0]
+        await db.log_nickname_change(member, dataclasses.replace(member, nick="Here"))
+        elsewhere = dataclasses.replace(member, guild=other, nick="There")
+        await db.log_nickname_change(dataclasses.replace(elsewhere, nick=None), elsewhere)
+        await db.flush()
+        ids = [m.id for m in members[:3]] + [1]
+        return await db.get_users_stats(ids), await db.get_users_stats(ids, guild.id)
+
+    everywhere, here = run(scenario)
+    assert set(everywhere) == set(here) == {m.id for m in members[:3]}
+    assert everywhere[members[0].id]['nickname_changes'] == 2
+    assert here[members[0].id]['nickname_changes'] == 1
+    assert here[members[0].id]['username'] == members[0].name
+
+
+def test_activity_and_database_stats(run):
+    guild, members = _guild()
+    member = members[0]
+    added = next(role for role in guild.roles[1:] if role not in member.roles)
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_nickname_change(member, dataclasses.replace(member, nick="Zed"))
+        await db.log_role_change(member, dataclasses.replace(member, roles=member.roles + [added]))
+        await db.flush()
+        today = datetime.utcnow().date()
+        return (
+            await db.get_daily_activity(guild.id),
+            await db.get_weekly_activity(guild.id),
+            await db.get_database_stats(),
+            await db.get_server_stats(guild.id, today - timedelta(days=1), today),
+            await db.get_server_stats(guild.id, date(2000, 1, 1), date(2000, 1, 2)),
+        )
+
+    daily, weekly, totals, in_range, out_of_range = run(scenario)
+    assert daily == [{
+        'day': datetime.utcnow().date().isoformat(), 'username_changes': 0, 'nickname_changes': 1,
+        'role_changes': 1, 'joins': 0, 'leaves': 0,
+    }]
+    assert [day['name'] for day in weekly] == ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+    assert sum(day['changes'] for day in weekly) == 2
+    assert totals == {
+        'user_count': 6, 'username_changes': 0, 'nickname_changes': 1,
+        'role_changes': 1, 'join_leave_events': 0,
+    }
+    assert (in_range['total_nickname_changes'], in_range['total_role_changes']) == (1, 1)
+    assert (out_of_range['total_nickname_changes'], out_of_range['total_role_changes']) == (0, 0)
+    assert out_of_range['name_changes_24h'] == 1
+
+
+def test_member_reads(run):
+    guild, members = _guild()
+    member = members[0]
+    added = next(role for role in guild.roles[1:] if role not in member.roles)
+    after = dataclasses.replace(member, roles=member.roles + [added])
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.log_role_change(member, after)
+        await db.flush()
+        return (
+            await db.get_current_roles_bulk(guild.id, [members[0].id, members[1].id, 1]),
+            await db.search_users(members[1].name, guild.id),
+            await db.search_users('', guild.id, role_id=added.id),
+            await db.get_guild_users(guild.id, role_id=added.id),
+            await db.get_user_profile(1),
+            await db.get_user_stats(1),
+        )
+
+    bulk, by_name, by_role, holders, unknown_profile, unknown_stats = run(scenario)
+    assert set(bulk) == {members[0].id, members[1].id}
+    assert {role['role_id'] for role in bulk[member.id]} == _role_ids(after)
+    assert [user['user_id'] for user in by_name] == [members[1].id]
+    expected = {m.id for m in members if added.id in _role_ids(m)} | {member.id}
+    assert {user['user_id'] for user in by_role} == expected
+    assert {user['user_id'] for user in holders} == expected
+    assert unknown_profile is None
+    assert unknown_stats == {}
+
+
+def test_leaderboard_and_landing_stats(run):
+    guild, members = _guild()
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        return await db.get_leaderboard(guild.id, 3), await db.get_landing_stats(guild.id)
+
+    leaderboard, landing = run(scenario)
+    assert [entry['rank'] for entry in leaderboard] == [1, 2, 3]
+    scores = [entry['score'] for entry in leaderboard]
+    assert scores == sorted(scores, reverse=True)
+    assert landing['member_count'] == 6 and landing['role_count'] == 5
+
+
+def test_community_content(run):
+    guild, members = _guild()
+    member = members[0]
+
+    async def scenario(db):
+        await db.inventory_guild(guild, members)
+        await db.upsert_user_game_profile(member.id, 'Requiem', 'Hero', 'EU', 'Tank')
+        await db.upsert_user_game_profile(member.id, 'Requiem', 'Hero2')
+        profiles = await db.get_user_game_profiles(member.id)
+        await db.add_news_post('One', 'first')
+        await db.add_news_post('Two', 'second', author_id=member.id, author_name='author')
+        news = await db.get_news_posts()
+        latest = await db.get_news_posts(1)
+        kept = await db.add_clan_achievement('Requiem', 'Boss', 'down', '2024-01-01', member.id)
+        dropped = await db.add_clan_achievement('Other', 'Race')
+        for_game = await db.get_clan_achievements('Requiem')
+        await db.update_clan_achievement(kept, 'Requiem', 'Boss 2')
+        deleted = await db.delete_clan_achievement(dropped)
+        remaining = await db.get_clan_achievements()
+        return profiles, news, latest, for_game, deleted, remaining
+
+    profiles, news, latest, for_game, deleted, remaining = run(scenario)
+    assert [(p['game_name'], p['character_name'], p['server']) for p in profiles] == [('Requiem', 'Hero2', None)]
+    assert [post['title'] for post in news] == ['Two', 'One']
+    assert [(post['title'], post['author_name']) for post in latest] == [('Two', 'author')]
+    assert [(a['title'], a['description'], a['achieved_at']) for a in for_game] == [('Boss', 'down', '2024-01-01')]
+    assert deleted
+    assert [a['title'] for a in remaining] == ['Boss 2']
+
+
+def test_scheduled_messages(run):
+    async def scenario(db):
+        now = datetime.utcnow()
+        due = await db.add_scheduled_message(GUILD_ID, 'due', 55, 'hi', 0, 1, 0, [11, 12], now - timedelta(minutes=5), embed_title='T')
+        later = await db.add_scheduled_message(GUILD_ID, 'later', 55, 'yo', 1, 0, 0, [], now + timedelta(days=1))
+        listed = await db.get_scheduled_messages(GUILD_ID)
+        to_send = await db.get_messages_to_send()
+        await db.update_scheduled_message_next_run(due)
+        after_send = await db.get_messages_to_send()
+        paused = await db.toggle_scheduled_message(later, GUILD_ID)
+        missing = await db.toggle_scheduled_message(later + 100, GUILD_ID)
+        await db.update_scheduled_message(later, GUILD_ID, name='renamed', role_ids=[13])
+        updated = await db.get_scheduled_messages(GUILD_ID)
+        removed = await db.remove_scheduled_message(due, GUILD_ID), await db.remove_scheduled_message(due, GUILD_ID)
+        return listed, to_send, after_send, paused, missing, updated, removed
+
+    listed, to_send, after_send, paused, missing, updated, removed = run(scenario)
+    assert [(m['name'], m['role_ids'], m['embed_title']) for m in listed] == [('due', '11,12', 'T'), ('later', None, 'later')]
+    assert [m['name'] for m in to_send] == ['due']
+    assert after_send == []
+    assert paused is False and missing is None
+    assert [(m['name'], m['role_ids'], m['is_active']) for m in updated] == [('due', '11,12', True), ('renamed', '13', False)]
+    assert removed == (True, False)
@@ -0,0 +1,51 @@
+"""Per-method metrics recorded by ``@instrumented``."""
+import asyncio
+
+from src.database.instrumentation import QueryMetrics, instrumented, start_background_task
+
+
+@instrumented
+class Backend:
+    def __init__(self):
+        self.query_metrics = QueryMetrics()
+
+    async def outer(self):
+        return {'result': await self.inner()}
+
+    async def inner(self):
+        return [1, 2, 3]
+
+    async def name(self):
+        return "backend"
+
+    async def start(self):
+        # Like Database.initialize() starting the write queue
+        await start_background_task(self.inner(), "inner")
+
+
+def test_nested_calls_count_towards_the_outermost():
+    backend = Backend()
+    asyncio.run(backend.outer())
+    asyncio.run(backend.inner())
+    methods = backend.query_metrics.snapshot()['methods']
+    assert methods['outer']['calls'] == 1
+    assert methods['inner']['calls'] == 1
+
+
+def test_rows_count_collections():
+    backend = Backend()
+    asyncio.run(backend.outer())
+    asyncio.run(backend.inner())
+    asyncio.run(backend.name())
+    methods = backend.query_metrics.snapshot()['methods']
+    assert methods['outer']['rows'] == 1
+    assert methods['inner']['rows'] == 3
+    assert methods['name']['rows'] == 0
+
+
+def test_background_task_is_not_nested_in_its_starter():
+    backend = Backend()
+    asyncio.run(backend.start())
+    methods = backend.query_metrics.snapshot()['methods']
+    assert methods['start']['calls'] == 1
+    assert methods['inner']['calls'] == 1
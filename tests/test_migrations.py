@@ -0,0 +1,92 @@
+"""Upgrading a tracking database created by an earlier release."""
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from src.database.database import MIGRATIONS, Database
+
+BASELINE_SCHEMA = Path(__file__).parent / 'fixtures' / 'baseline_schema.sql'
+
+GUILD_ID = 1_000
+USER_ID = 10_000_000
+ROLE_ID = 1_001
+
+
+def _baseline_database(path: Path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(BASELINE_SCHEMA.read_text())
+        conn.execute(
+            "INSERT INTO users (user_id, username, display_name, last_seen) VALUES (?, 'old', 'Old', '2024-05-01 12:00:00')",
+            (USER_ID,)
+        )
+        conn.execute("INSERT INTO guild_members (guild_id, user_id, nickname) VALUES (?, ?, 'Nick')", (GUILD_ID, USER_ID))
+        conn.execute("INSERT INTO roles (role_id, guild_id, name) VALUES (?, ?, 'Member')", (ROLE_ID, GUILD_ID))
+        conn.executemany(
+            "INSERT INTO role_changes (guild_id, user_id, role_id, action, changed_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (GUILD_ID, USER_ID, ROLE_ID, 'initial', '2024-01-01 00:00:00'),
+                (GUILD_ID, USER_ID, ROLE_ID, 'removed', '2024-02-01 00:00:00'),
+                (GUILD_ID, USER_ID, ROLE_ID, 'added', '2024-03-01 00:00:00'),
+            ]
+        )
+        conn.execute(
+            "INSERT INTO nickname_changes (guild_id, user_id, old_nickname, new_nickname, changed_at)"
+            " VALUES (?, ?, NULL, 'Nick', '2024-04-01 00:00:00')",
+            (GUILD_ID, USER_ID)
+        )
+        conn.execute(
+            "INSERT INTO username_changes (user_id, old_username, new_username, changed_at)"
+            " VALUES (?, 'older', 'old', '2024-04-02 00:00:00')",
+            (USER_ID,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_baseline_database_upgrades(tmp_path):
+    path = tmp_path / 'tracking.db'
+    _baseline_database(path)
+
+    async def upgrade():
+        db = Database(str(path))
+        await db.initialize()
+        try:
+            async with db.reader() as conn:
+                cursor = await conn.execute("SELECT MAX(version) FROM schema_version")
+                version = (await cursor.fetchone())[0]
+                cursor = await conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'role_changes'")
+                indexes = {row[0] for row in await cursor.fetchall()}
+                cursor = await conn.execute("SELECT COUNT(*) FROM role_changes WHERE ts IS NULL")
+                missing_ts = (await cursor.fetchone())[0]
+            return (
+                version,
+                indexes,
+                missing_ts,
+                await db.get_user_stats(USER_ID),
+                await db.get_role_history(USER_ID, GUILD_ID),
+            )
+        finally:
+            await db.close()
+
+    version, indexes, missing_ts, stats, history = asyncio.run(upgrade())
+    assert version == MIGRATIONS[-1][0]
+    assert 'idx_role_changes_member_ts' in indexes
+    assert 'idx_role_changes_user' not in indexes
+    assert missing_ts == 0
+    assert (stats['username_changes'], stats['nickname_changes'], stats['role_changes']) == (1, 1, 2)
+    assert [entry['action'] for entry in history][:2] == ['added', 'removed']
+
+
+def test_upgraded_database_reopens(tmp_path):
+    path = tmp_path / 'tracking.db'
+    _baseline_database(path)
+
+    async def open_twice():
+        for _ in range(2):
+            db = Database(str(path))
+            await db.initialize()
+            await db.close()
+
+    asyncio.run(open_twice())
@@ -0,0 +1,74 @@
+"""Failure handling of the write-behind queue."""
+import asyncio
+
+from src.database.database import Database
+
+
+def _run_queue(tmp_path, scenario):
+    async def main():
+        db = Database(str(tmp_path / 'tracking.db'))
+        await db.initialize()
+        try:
+            async with db.writer() as conn:
+                await conn.execute("CREATE TABLE log (n INTEGER)")
+                calls = []
+
+                def flaky(n):
+                    # Fails the first time it is called, like a transient error
+                    calls.append(n)
+                    if len(calls) == 1:
+                        raise ValueError("transient")
+                    return n
+
+                await conn.create_function('flaky', 1, flaky)
+                await conn.commit()
+            await scenario(db.write_queue)
+            await db.flush()
+            async with db.reader() as conn:
+                cursor = await conn.execute("SELECT n FROM log ORDER BY rowid")
+                rows = [row[0] for row in await cursor.fetchall()]
+            return rows, db.write_queue.metrics.snapshot(0)
+        finally:
+            await db.close()
+    return asyncio.run(main())
+
+
+def test_retried_write_keeps_its_place(tmp_path):
+    async def scenario(queue):
+        await queue.submit([("INSERT INTO log VALUES (1)", ())])
+        await queue.submit([("INSERT INTO log VALUES (flaky(2))", ())])
+        await queue.submit([("INSERT INTO log VALUES (3)", ())])
+
+    rows, metrics = _run_queue(tmp_path, scenario)
+    assert rows == [1, 2, 3]
+    assert metrics['retried'] == 1
+    assert metrics['failed'] == 0
+
+
+def test_dropped_write_does_not_stop_the_queue(tmp_path):
+    async def scenario(queue):
+        await queue.submit([("INSERT INTO log VALUES (1)", ())])
+        await queue.submit([("INSERT INTO missing VALUES (2)", ())])
+        await queue.submit([("INSERT INTO log VALUES (3)", ())])
+
+    rows, metrics = _run_queue(tmp_path, scenario)
+    assert rows == [1, 3]
+    assert metrics['failed'] == 1
+    assert metrics['dead_lettered'] == 1
+    assert (tmp_path / 'dead_letter.jsonl').exists()
+
+
+def test_failing_callback_does_not_stop_the_queue(tmp_path):
+    def on_failure(statements):
+        raise RuntimeError("callback bug")
+
+    async def scenario(queue):
+        queue.on_failure = on_failure
+        await queue.submit([("INSERT INTO missing VALUES (1)", ())])
+        await queue.flush()
+        assert queue.is_running
+        await queue.submit([("INSERT INTO log VALUES (2)", ())])
+
+    rows, metrics = _run_queue(tmp_path, scenario)
+    assert rows == [2]
+    assert metrics['failed'] == 1